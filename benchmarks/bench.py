@@ -0,0 +1,225 @@
+""" Бенчмарки этапов обработки CSV.
+
+Каждый этап выполняется в отдельном процессе. Время этапа - лучшее
+из repeat повторов; подготовка входных данных (чтение файла для этапов
+фильтрации, сортировки и агрегации) во время не входит. memory - пик
+памяти, выделенной Python (tracemalloc) во время самого этапа, без
+данных подготовки; peak_rss - пиковый RSS процесса вместе с подготовкой.
+
+    python -m benchmarks.bench --rows 1000000 --output results.json
+    python -m benchmarks.bench --rows 1000000 --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from csv import DictReader
+from multiprocessing import Pool
+
+from src.aggregators import parse_aggregate
+from src.columnar import ColumnTable
+from src.csv_processing import FileValuesProcessor
+from src.grouping import HashAggregator, parse_group_by
+from src.predicates import filter_table, parse_where
+from src.profiling import peak_rss
+from src.sorting import parse_order_by, sort_rows
+
+from .datagen import generate_csv
+
+WHERE = "price>=5000 AND rating>3"
+ORDER_BY = "price=desc,name=asc"
+AGGREGATE = "price=avg,max;rating=min"
+GROUP_BY = "brand"
+
+
+def read_rows(file: str) -> list[dict]:
+    with open(file, encoding="utf-8", newline="") as f:
+        return list(DictReader(f))
+
+
+def _stream_query(file: str) -> None:
+    processor = FileValuesProcessor()
+    for _ in processor.iter_file_csv(file, WHERE, AGGREGATE):
+        pass
+
+
+def _columnar_query(table: ColumnTable) -> None:
+    indices = filter_table(parse_where(WHERE), table)
+    table.aggregate(indices, parse_aggregate(AGGREGATE))
+
+
+# этап: (подготовка входных данных по пути файла, измеряемая функция)
+STAGES = {
+    "parse": (lambda file: file, read_rows),
+    "parse_columnar": (lambda file: file, ColumnTable.read_csv),
+    "filter": (read_rows, lambda rows: list(
+        FileValuesProcessor.filter_rows(rows, WHERE))),
+    "sort": (read_rows, lambda rows: list(sort_rows(rows, ORDER_BY))),
+    "top_k": (read_rows, lambda rows: list(sort_rows(rows, ORDER_BY,
+                                                     limit=100))),
+    "aggregate": (read_rows, lambda rows: FileValuesProcessor.aggregate_rows(
+        rows, AGGREGATE)),
+    "group_by": (read_rows, lambda rows: list(HashAggregator(
+        parse_group_by(GROUP_BY), parse_aggregate(AGGREGATE)
+    ).add_rows(rows).results())),
+    "columnar_filter": (ColumnTable.read_csv, lambda table: filter_table(
+        parse_where(WHERE), table)),
+    "columnar_sort": (ColumnTable.read_csv, lambda table: table.sort_indices(
+        range(len(table)), parse_order_by(ORDER_BY))),
+    "columnar_query": (ColumnTable.read_csv, _columnar_query),
+    "stream_query": (lambda file: file, _stream_query),
+}
+
+
+def _stage_memory(function, data) -> int:
+    """ Пик памяти, выделенной Python во время одного выполнения этапа.
+
+    tracemalloc замедляет выполнение, поэтому память измеряется
+    отдельным запуском, не входящим во время.
+    """
+
+    tracemalloc.start()
+    try:
+        function(data)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_stage(stage: str, file: str, repeat: int = 3) -> dict:
+    """ Время (лучшее из repeat), память этапа и пиковый RSS процесса"""
+
+    setup, function = STAGES[stage]
+    data = setup(file)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(data)
+        timings.append(time.perf_counter() - start)
+    return {"seconds": min(timings), "memory": _stage_memory(function, data),
+            "peak_rss": peak_rss()}
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))
+                              ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(file: str, stages: list[str] = None,
+                   repeat: int = 3) -> dict:
+    """ Результаты этапов; каждый этап - в новом процессе"""
+
+    results = {}
+    for stage in stages or STAGES:
+        if stage not in STAGES:
+            raise ValueError(f"Неизвестный этап бенчмарка: {stage}. "
+                             f"Допустимые значения: {', '.join(STAGES)}.")
+        with Pool(1, maxtasksperchild=1) as pool:
+            results[stage] = pool.apply(run_stage, (stage, file, repeat))
+    with open(file, encoding="utf-8") as f:
+        rows = sum(1 for _ in f) - 1
+    return {"commit": _commit(), "python": platform.python_version(),
+            "file_size": os.path.getsize(file), "rows": rows,
+            "repeat": repeat, "stages": results}
+
+
+def compare_results(baseline: dict, current: dict,
+                    threshold: float = 0.1) -> list[tuple]:
+    """ Сравнение результатов по общим этапам.
+
+    Возвращает строки (этап, метрика, было, стало, изменение, регрессия);
+    регрессия - рост времени или памяти больше чем на threshold.
+    """
+
+    report = []
+    for stage, result in current["stages"].items():
+        previous = baseline["stages"].get(stage)
+        if previous is None:
+            continue
+        for metric in ("seconds", "memory", "peak_rss"):
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            report.append((stage, metric, old, new, change,
+                           change > threshold))
+    return report
+
+
+def _print_results(results: dict) -> None:
+    print(f"Строк: {results['rows']}, размер файла: "
+          f"{results['file_size']} байт, коммит: {results['commit']}")
+    print(f"{'этап':<16} {'время':>12} {'память этапа':>14} "
+          f"{'пиковый RSS':>12}")
+    for stage, result in results["stages"].items():
+        rss = result["peak_rss"]
+        rss = "-" if rss is None else f"{rss / 2 ** 20:.1f} МБ"
+        memory = f"{result['memory'] / 2 ** 20:.1f} МБ"
+        print(f"{stage:<16} {result['seconds']:>10.4f} с {memory:>14} "
+              f"{rss:>12}")
+
+
+def _print_comparison(report: list[tuple]) -> None:
+    for stage, metric, old, new, change, regression in report:
+        mark = "  РЕГРЕССИЯ" if regression else ""
+        if metric == "seconds":
+            old, new = f"{old:.4f} с", f"{new:.4f} с"
+        else:
+            old, new = f"{old / 2 ** 20:.1f} МБ", f"{new / 2 ** 20:.1f} МБ"
+        print(f"{stage:<16} {metric:<9} {old:>12} -> {new:>12} "
+              f"{change:+8.1%}{mark}")
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки обработки CSV")
+    parser.add_argument("--file", help="CSV-файл; по умолчанию создаётся "
+                                       "синтетический файл на --rows строк")
+    parser.add_argument("--rows", type=int, default=100_000,
+                        help="Число строк синтетического файла")
+    parser.add_argument("--columns", type=int, default=4,
+                        help="Число колонок синтетического файла")
+    parser.add_argument("--cardinality", type=int, default=100,
+                        help="Число различных брендов синтетического файла")
+    parser.add_argument("--stages", help="Этапы через запятую: "
+                                         f"{', '.join(STAGES)}")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Число повторов каждого этапа")
+    parser.add_argument("--output", help="Файл JSON для результатов")
+    parser.add_argument("--compare", help="Файл JSON с результатами для "
+                                          "сравнения")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Допустимый рост времени и памяти, доля")
+    args = parser.parse_args(argv)
+    stages = args.stages.split(",") if args.stages else None
+
+    with tempfile.TemporaryDirectory(prefix="workmate-bench-") as directory:
+        file = args.file
+        if file is None:
+            file = os.path.join(directory, "products.csv")
+            generate_csv(file, args.rows, args.columns, args.cardinality)
+        results = run_benchmarks(file, stages, args.repeat)
+    _print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report = compare_results(json.load(f), results, args.threshold)
+        _print_comparison(report)
+        if any(regression for *_, regression in report):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+""" Детерминированный генератор больших CSV-файлов для бенчмарков.
+
+    python -m benchmarks.datagen --rows 1000000 --output /tmp/products.csv
+"""
+import argparse
+import random
+
+# колонки как в products.csv, дополнительные колонки - числовые metric_N
+BASE_COLUMNS = ('name', 'brand', 'price', 'rating')
+
+
+def generate_csv(path: str,
+                 rows: int,
+                 columns: int = 4,
+                 cardinality: int = 100,
+                 seed: int = 0) -> None:
+    """ Запись CSV-файла из rows строк.
+
+    cardinality - число различных брендов, columns - общее число колонок
+    (не меньше 4). При одинаковых параметрах и seed файл совпадает
+    побайтно.
+    """
+
+    if rows < 0 or columns < len(BASE_COLUMNS) or cardinality < 1:
+        raise ValueError("Неверные параметры генерации: rows >= 0, "
+                         f"columns >= {len(BASE_COLUMNS)}, cardinality >= 1.")
+    rng = random.Random(seed)
+    extra = [f"metric_{number}"
+             for number in range(1, columns - len(BASE_COLUMNS) + 1)]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(BASE_COLUMNS + tuple(extra)) + "\n")
+        lines = []
+        for row in range(rows):
+            values = [f"product {row}",
+                      f"brand_{rng.randrange(cardinality)}",
+                      str(rng.randint(1, 10_000)),
+                      # без ".0": такие значения колоночная таблица
+                      # хранит отдельно текстом
+                      f"{rng.randint(1, 4)}.{rng.randint(1, 9)}"]
+            values.extend(f"{rng.randrange(1000)}."
+                          f"{rng.randint(1, 999):03d}".rstrip("0")
+                          for _ in extra)
+            lines.append(",".join(values))
+            if len(lines) == 10_000:
+                f.write("\n".join(lines) + "\n")
+                lines.clear()
+        if lines:
+            f.write("\n".join(lines) + "\n")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Генерация CSV-файла для бенчмарков")
+    parser.add_argument("--output", required=True, help="Путь CSV-файла")
+    parser.add_argument("--rows", type=int, default=100_000,
+                        help="Число строк")
+    parser.add_argument("--columns", type=int, default=4,
+                        help="Число колонок, не меньше 4")
+    parser.add_argument("--cardinality", type=int, default=100,
+                        help="Число различных брендов")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Начальное значение генератора")
+    args = parser.parse_args()
+    generate_csv(args.output, args.rows, args.columns, args.cardinality,
+                 args.seed)
@@ -0,0 +1,310 @@
+from itertools import islice
+from math import sqrt
+from operator import itemgetter
+from random import Random
+from typing import Iterable, Sequence
+
+# функции агрегации, которые вычисляются по накопленному состоянию колонки;
+# кроме них поддерживаются перцентили вида p90, p99
+AGGREGATE_FUNCTIONS = ('count', 'sum', 'avg', 'min', 'max', 'var', 'std',
+                       'median')
+
+
+def is_percentile(function: str) -> bool:
+    """ Проверка, является ли функция перцентилем вида p0..p100"""
+
+    return (function.startswith('p') and function[1:].isdigit()
+            and 0 <= int(function[1:]) <= 100)
+
+
+def parse_aggregate(aggregate: str) -> list[tuple[str, list[str]]]:
+    """ Разбор условия агрегации вида "price=avg,max;rating=min"
+    в список пар (колонка, функции)"""
+
+    specs = []
+    for part in aggregate.split(';'):
+        part = part.strip()
+        if not part:
+            continue
+        if '=' not in part:
+            raise ValueError("Неверный оператор агрегации: используйте '='.")
+        column, _, functions = part.partition('=')
+        column = column.strip()
+        functions = [function.strip().lower()
+                     for function in functions.split(',')]
+        for function in functions:
+            if function not in AGGREGATE_FUNCTIONS and not is_percentile(
+                    function):
+                raise ValueError(
+                    "Недопустимое название функции агрегации."
+                    " Допустимые значения: "
+                    f"{', '.join(AGGREGATE_FUNCTIONS)}, p0..p100.")
+        specs.append((column, functions))
+    if not specs:
+        raise ValueError("Неверный оператор агрегации: используйте '='.")
+    return specs
+
+
+class QuantileSketch:
+    """ Приближённые перцентили по равномерной выборке (reservoir sampling).
+
+    Пока значений не больше capacity, выборка содержит их все
+    и перцентили считаются точно.
+    """
+
+    __slots__ = ('capacity', 'count', 'sample', '_random')
+
+    def __init__(self, capacity: int = 2048, seed: int = 0):
+        self.capacity = capacity
+        self.count = 0
+        self.sample = []
+        self._random = Random(seed)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if len(self.sample) < self.capacity:
+            self.sample.append(value)
+        else:
+            index = self._random.randrange(self.count)
+            if index < self.capacity:
+                self.sample[index] = value
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """ Объединение с выборкой, собранной по другой части данных"""
+
+        total = self.count + other.count
+        if len(self.sample) + len(other.sample) <= self.capacity:
+            self.sample.extend(other.sample)
+        elif total:
+            # каждая выборка представлена пропорционально своему числу строк
+            own = round(self.capacity * self.count / total)
+            own = min(own, len(self.sample))
+            rest = min(self.capacity - own, len(other.sample))
+            self.sample = (self._random.sample(self.sample, own)
+                           + self._random.sample(other.sample, rest))
+        self.count = total
+
+    def quantile(self, q: float) -> float:
+        """ Перцентиль с линейной интерполяцией между соседними значениями"""
+
+        ordered = sorted(self.sample)
+        position = q * (len(ordered) - 1)
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (
+                position - lower)
+
+
+class RunningStats:
+    """ Накопленное состояние одной колонки: count, sum, min, max,
+    при необходимости моменты для дисперсии и выборка для перцентилей.
+
+    Обновляется только то, что нужно запрошенным функциям: min и max -
+    для min/max, среднее и дисперсия по Уэлфорду - для var/std, выборка -
+    для перцентилей. Все функции агрегации вычисляются по состоянию
+    без повторного прохода по данным.
+    """
+
+    __slots__ = ('count', 'total', 'min', 'max', 'mean', 'm2', 'range',
+                 'moments', 'sketch')
+
+    def __init__(self, track_quantiles: bool = False,
+                 track_moments: bool = False, track_range: bool = True):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.range = track_range
+        self.moments = track_moments
+        self.sketch = QuantileSketch() if track_quantiles else None
+
+    @property
+    def needs_values(self) -> bool:
+        """ Нужны ли функциям сами значения, а не только число и сумма"""
+
+        return self.range or self.moments or self.sketch is not None
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if self.range:
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+        if self.moments:
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+        if self.sketch is not None:
+            self.sketch.add(value)
+
+    def add_sum(self, values: Iterable[float], count: int) -> None:
+        """ Добавление count значений, когда нужны только число и сумма:
+        значения не сохраняются"""
+
+        self.count += count
+        self.total = sum(values, self.total)
+
+    def add_values(self, values: Sequence[float]) -> None:
+        """ Добавление пачки значений"""
+
+        if not values:
+            return
+        if self.moments:
+            # среднее и сумма квадратов отклонений пачки, объединяемые
+            # с накопленными как при слиянии состояний
+            mean = sum(values) / len(values)
+            self._merge_moments(len(values), mean,
+                                sum((value - mean) ** 2 for value in values))
+        self.count += len(values)
+        # сумма с начальным значением складывает по порядку, как и
+        # сложение по одному значению
+        self.total = sum(values, self.total)
+        if self.range:
+            low, high = min(values), max(values)
+            if self.min is None or low < self.min:
+                self.min = low
+            if self.max is None or high > self.max:
+                self.max = high
+        if self.sketch is not None:
+            for value in values:
+                self.sketch.add(value)
+
+    def _merge_moments(self, count: int, mean: float, m2: float) -> None:
+        """ Объединение среднего и суммы квадратов отклонений (Чан)"""
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.mean += delta * count / total
+
+    def merge(self, other: 'RunningStats') -> None:
+        """ Объединение состояний, накопленных по разным частям данных"""
+
+        if not other.count:
+            return
+        if self.moments:
+            self._merge_moments(other.count, other.mean, other.m2)
+        if not self.count:
+            self.min, self.max = other.min, other.max
+        elif self.range:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch.merge(other.sketch)
+
+    def result(self, function: str) -> float:
+        """ Значение функции агрегации по накопленному состоянию"""
+
+        if function == 'count':
+            return self.count
+        if not self.count:
+            raise ValueError("Нет данных для агрегации.")
+        if function == 'sum':
+            return self.total
+        if function == 'avg':
+            return self.total / self.count
+        if function == 'min':
+            return self.min
+        if function == 'max':
+            return self.max
+        if function == 'var':
+            # выборочная дисперсия, как statistics.variance
+            return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+        if function == 'std':
+            return sqrt(self.result('var'))
+        if function == 'median':
+            return self.sketch.quantile(0.5)
+        return self.sketch.quantile(int(function[1:]) / 100)
+
+
+class AggregateSet:
+    """ Набор агрегатов по нескольким колонкам, вычисляемый за один проход.
+
+    Каждая строка передаётся один раз, значение каждой колонки
+    преобразуется в число тоже один раз, сколько бы функций по ней
+    ни было запрошено. add_rows обрабатывает строки пачками
+    по batch_size: числа пачки добавляются в состояние колонки
+    встроенными sum, min и max.
+    """
+
+    def __init__(self, specs: list[tuple[str, list[str]]],
+                 batch_size: int = 1024):
+        self.specs = specs
+        self.batch_size = batch_size
+        self.rows = 0
+        functions = {}
+        for column, names in specs:
+            functions.setdefault(column, set()).update(names)
+        self.stats = {
+            column: RunningStats(
+                track_quantiles=any(function == 'median'
+                                    or is_percentile(function)
+                                    for function in names),
+                track_moments=bool(names & {'var', 'std'}),
+                track_range=bool(names & {'min', 'max'}))
+            for column, names in functions.items()}
+
+    @classmethod
+    def from_string(cls, aggregate: str) -> 'AggregateSet':
+        return cls(parse_aggregate(aggregate))
+
+    def add_row(self, row: dict) -> None:
+        self.rows += 1
+        for column, stats in self.stats.items():
+            # проверка можно ли преобразовать строку в число
+            try:
+                value = float(row[column])
+            except (ValueError, TypeError):
+                raise ValueError("Агрегация требует числовых значений.")
+            stats.add(value)
+
+    def add_rows(self, rows: Iterable[dict]) -> 'AggregateSet':
+        """ Добавление строк пачками: значения колонки каждой пачки
+        выбираются и преобразуются в числа без цикла на Python"""
+
+        rows = iter(rows)
+        getters = [(itemgetter(column), stats)
+                   for column, stats in self.stats.items()]
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return self
+            for getter, stats in getters:
+                numbers = map(float, map(getter, batch))
+                try:
+                    if stats.needs_values:
+                        stats.add_values(list(numbers))
+                    else:
+                        stats.add_sum(numbers, len(batch))
+                except (ValueError, TypeError):
+                    raise ValueError("Агрегация требует числовых значений.")
+            self.rows += len(batch)
+
+    def merge(self, other: 'AggregateSet') -> None:
+        self.rows += other.rows
+        for column, stats in self.stats.items():
+            stats.merge(other.stats[column])
+
+    def result(self) -> dict:
+        """ Результат агрегации.
+
+        Для одной функции по одной колонке ключ - название функции
+        ({'avg': 4.5}), иначе - "колонка_функция" ({'price_avg': ...}).
+        """
+
+        if not self.rows:
+            raise ValueError("Нет данных для агрегации.")
+        single = len(self.specs) == 1 and len(self.specs[0][1]) == 1
+        result = {}
+        for column, functions in self.specs:
+            stats = self.stats[column]
+            for function in functions:
+                key = function if single else f"{column}_{function}"
+                result[key] = stats.result(function)
+        return result
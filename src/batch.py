@@ -0,0 +1,207 @@
+import argparse
+import shlex
+from csv import DictReader
+from typing import Iterable
+
+from .aggregators import AggregateSet, parse_aggregate
+from .grouping import HashAggregator, parse_group_by
+from .output import paginate
+from .predicates import parse_where
+from .sorting import parse_order_by, sort_rows
+
+
+class BatchQuery:
+    """ Один запрос пакета, получающий строки общего просмотра файла.
+
+    Запрос накапливает только своё состояние: агрегаты, группы или
+    строки результата. Для сортировки с limit хранится не больше
+    2 * (offset + limit) строк: при переполнении буфер урезается до top-K.
+    """
+
+    def __init__(self,
+                 where: str = None,
+                 aggregate: str = None,
+                 order_by: str = None,
+                 group_by: str = None,
+                 limit: int = None,
+                 offset: int = 0,
+                 max_groups: int = 100_000,
+                 name: str = None):
+        if group_by and not aggregate:
+            raise ValueError("Группировка требует условия агрегации.")
+        # проверка смещения и ограничения до просмотра файла
+        paginate([], offset, limit)
+        self.where = where
+        self.aggregate = aggregate
+        self.order_by = order_by
+        self.group_by = group_by
+        self.limit = limit
+        self.offset = offset
+        self.name = name
+        self.node = parse_where(where) if where else None
+        self.columns = set(self.node.columns) if self.node else set()
+        specs = parse_aggregate(aggregate) if aggregate else None
+        if order_by:
+            self.columns.update(column for column, _ in
+                                parse_order_by(order_by))
+        if group_by:
+            columns = parse_group_by(group_by)
+            self.columns.update(columns)
+            self.state = HashAggregator(columns, specs, max_groups=max_groups)
+        elif aggregate:
+            self.state = AggregateSet(specs)
+        else:
+            self.state = []
+        if specs:
+            self.columns.update(column for column, _ in specs)
+        # строки, которые нужно получить до разбиения на страницы
+        self.fetch = None if limit is None else offset + limit
+        self.matched = 0
+        # ошибка при просмотре файла, например нечисловое значение
+        # в агрегации; она не прерывает остальные запросы пакета
+        self.error = None
+
+    def __str__(self) -> str:
+        if self.name:
+            return self.name
+        options = [('where', self.where), ('aggregate', self.aggregate),
+                   ('order_by', self.order_by), ('group_by', self.group_by),
+                   ('limit', self.limit), ('offset', self.offset or None)]
+        return ' '.join(f"--{option} {shlex.quote(str(value))}"
+                        for option, value in options if value is not None)
+
+    @property
+    def done(self) -> bool:
+        """ Запрос больше не нуждается в строках файла"""
+
+        return self.error is not None or (isinstance(self.state, list) and not self.order_by
+                and self.fetch is not None and len(self.state) >= self.fetch)
+
+    def add_row(self, row: dict) -> None:
+        self.matched += 1
+        if not isinstance(self.state, list):
+            self.state.add_row(row)
+            return
+        if self.done:
+            return
+        self.state.append(row)
+        if self.order_by and self.fetch is not None \
+                and len(self.state) > 2 * self.fetch:
+            self.state = list(sort_rows(self.state, self.order_by,
+                                        limit=self.fetch))
+
+    def result(self) -> list[dict]:
+        """ Строки результата запроса"""
+
+        if self.error is not None:
+            raise self.error
+        if self.where and not self.matched and self.fetch != 0:
+            raise ValueError(
+                "Не найдено записей, соответствующих условиям фильтрации.")
+        if isinstance(self.state, HashAggregator):
+            rows = self.state.results()
+        elif isinstance(self.state, AggregateSet):
+            if self.order_by:
+                parse_order_by(self.order_by)
+            return list(paginate([self.state.result()], self.offset,
+                                 self.limit))
+        else:
+            rows = self.state
+        if self.order_by:
+            rows = sort_rows(rows, self.order_by, limit=self.fetch)
+        return list(paginate(rows, self.offset, self.limit))
+
+
+class _ArgumentParser(argparse.ArgumentParser):
+    def error(self, message: str):
+        raise ValueError(f"Неверный запрос пакета: {message}")
+
+
+def parse_batch(lines: Iterable[str]) -> list[BatchQuery]:
+    """ Запросы пакета из строк с параметрами командной строки.
+
+    Каждая непустая строка - один запрос, например
+    --where "price>500" --aggregate price=avg; строки, начинающиеся
+    с #, пропускаются.
+    """
+
+    parser = _ArgumentParser(add_help=False)
+    for option in ('--where', '--aggregate', '--order_by', '--group_by',
+                   '--name'):
+        parser.add_argument(option)
+    for option in ('--limit', '--offset', '--max_groups'):
+        parser.add_argument(option, type=int)
+    queries = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        options = {key: value for key, value in
+                   vars(parser.parse_args(shlex.split(line))).items()
+                   if value is not None}
+        queries.append(BatchQuery(**options))
+    return queries
+
+
+def run_batch(file: str, queries: list) -> list[BatchQuery]:
+    """ Выполнение пакета запросов за один просмотр файла.
+
+    Запросы передаются объектами BatchQuery или словарями параметров.
+    Файл читается один раз; одинаковые условия фильтрации разных запросов
+    проверяются один раз на строку, и строка передаётся каждому запросу,
+    условию которого она удовлетворяет. Результат каждого запроса
+    возвращает BatchQuery.result(). Ошибка в условии или состоянии
+    одного запроса не прерывает просмотр: запрос больше не получает
+    строк, а result() возбуждает эту ошибку.
+    """
+
+    queries = [query if isinstance(query, BatchQuery) else BatchQuery(**query)
+               for query in queries]
+    # запросы группируются по нормализованному условию фильтрации
+    routes = {}
+    for query in queries:
+        key = str(query.node) if query.node is not None else None
+        if key not in routes:
+            predicate = query.node.compile() if query.node is not None \
+                else None
+            routes[key] = (predicate, [])
+        routes[key][1].append(query)
+    routes = list(routes.values())
+
+    # чтение можно прервать, только если все запросы ограничены limit
+    stoppable = all(query.fetch is not None and not query.order_by
+                    and isinstance(query.state, list) for query in queries)
+
+    with open(file, mode="r", encoding="utf-8", newline="") as f:
+        reader = DictReader(f)
+        fieldnames = set(reader.fieldnames or ())
+        for query in queries:
+            missing = query.columns - fieldnames
+            if missing:
+                raise KeyError(sorted(missing)[0])
+        for row in reader:
+            failed = False
+            for predicate, targets in routes:
+                try:
+                    if predicate is not None and not predicate(row):
+                        continue
+                except (ValueError, TypeError) as error:
+                    for query in targets:
+                        query.error = error
+                    failed = True
+                    continue
+                for query in targets:
+                    try:
+                        query.add_row(row)
+                    except (ValueError, TypeError) as error:
+                        query.error = error
+                        failed = True
+            if failed:
+                routes = [(predicate, [query for query in targets
+                                       if query.error is None])
+                          for predicate, targets in routes]
+                routes = [route for route in routes if route[1]]
+            if stoppable and all(query.done for query in queries):
+                # у всех запросов уже есть нужные строки
+                break
+    return queries
@@ -0,0 +1,73 @@
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+from urllib.parse import urlsplit
+
+from .output import OUTPUT_FORMATS, write_rows
+
+
+def query(request: dict, server: str) -> list[dict]:
+    """ Выполнение запроса на сервере запросов.
+
+    server - путь Unix-сокета или адрес вида http://127.0.0.1:8765.
+    Ошибка запроса возвращается сервером и поднимается как ValueError.
+    """
+
+    if server.startswith("http://"):
+        address = urlsplit(server)
+        connection = http.client.HTTPConnection(address.hostname,
+                                                address.port or 80)
+        try:
+            connection.request("POST", "/query", json.dumps(request),
+                               {"Content-Type": "application/json"})
+            response = json.loads(connection.getresponse().read())
+        finally:
+            connection.close()
+    else:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(server)
+            with connection.makefile("rwb") as stream:
+                stream.write(json.dumps(request).encode("utf-8") + b"\n")
+                stream.flush()
+                response = json.loads(stream.readline())
+    if not response.get("ok"):
+        raise ValueError(response.get("error"))
+    return response["rows"]
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Клиент сервера запросов к CSV-файлам")
+    parser.add_argument("--server", required=True,
+                        help="Путь Unix-сокета или http://127.0.0.1:ПОРТ")
+    parser.add_argument("--file", required=True, help="Путь к CSV-файлу")
+    parser.add_argument("--where", help="Условие фильтрации")
+    parser.add_argument("--aggregate", help="Условие агрегации")
+    parser.add_argument("--order_by", help="Условие сортировки")
+    parser.add_argument("--group_by", help="Колонки группировки")
+    parser.add_argument("--max_groups", type=int, default=100_000,
+                        help="Число групп в памяти до сброса на диск")
+    parser.add_argument("--limit", type=int, help="Число строк результата")
+    parser.add_argument("--offset", type=int, default=0,
+                        help="Число пропускаемых строк результата")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default='grid',
+                        help="Формат вывода")
+    args = parser.parse_args(argv)
+    # путь передаётся абсолютным: у сервера может быть другой рабочий каталог
+    request = {"file": os.path.abspath(args.file), "where": args.where,
+               "aggregate": args.aggregate, "order_by": args.order_by,
+               "group_by": args.group_by, "max_groups": args.max_groups,
+               "limit": args.limit, "offset": args.offset}
+    try:
+        write_rows(query(request, args.server), args.format)
+    except ValueError as e:
+        print(e)
+    except OSError as e:
+        print(f"Не удалось подключиться к серверу: {e}")
+
+
+if __name__ == '__main__':
+    main()
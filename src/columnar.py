@@ -0,0 +1,462 @@
+import heapq
+import sys
+from array import array
+from collections.abc import Sequence
+from csv import reader
+from itertools import compress, islice
+from math import isfinite, isnan
+from operator import ne
+from typing import Iterable, Iterator
+
+from .aggregators import AggregateSet
+from .sorting import value_key
+
+# целые числа, которые точно представимы в double
+_MAX_EXACT_INT = 2 ** 53
+# число строк CSV, которые разбираются и раскладываются по колонкам за раз
+_CHUNK_ROWS = 2 ** 14
+# размер объекта int, не входящего в кеш малых чисел
+_INT_SIZE = sys.getsizeof(2 ** 20)
+
+
+def format_number(value: float) -> str:
+    """ Текстовое представление числа из числовой колонки"""
+
+    if value.is_integer() and abs(value) < _MAX_EXACT_INT:
+        return str(int(value))
+    return repr(value)
+
+
+def parse_number(text: str):
+    """ Число из строки или None, если строка не число или не
+    восстанавливается из числа без потерь (например "4.80" или "007")"""
+
+    try:
+        value = float(text)
+    except (ValueError, TypeError):
+        return None
+    if not isfinite(value) or format_number(value) != text:
+        return None
+    return value
+
+
+def to_number(text: str):
+    """ Конечное число из строки, как его понимает float, или None"""
+
+    try:
+        value = float(text)
+    except (ValueError, TypeError):
+        return None
+    return value if isfinite(value) else None
+
+
+class NumericColumn:
+    """ Числовая колонка: значения хранятся в array('d').
+
+    Ячейки, текст которых не восстанавливается из числа ("10.50", "20.0")
+    или не является числом ("N/A", пустая строка), хранятся в texts
+    по номеру строки; вместо нечислового значения в values записывается
+    NaN. Если таких ячеек становится больше max_texts(), колонку
+    нужно сделать строковой.
+    """
+
+    kind = 'number'
+
+    def __init__(self, values: Iterable[float] = ()):
+        self.values = array('d', values)
+        self.texts = {}
+
+    @classmethod
+    def from_buffer(cls, values, texts: dict = None) -> 'NumericColumn':
+        """ Колонка поверх готового буфера значений без копирования,
+        например memoryview отображённого в память файла"""
+
+        column = cls()
+        column.values = values
+        column.texts = texts or {}
+        return column
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @staticmethod
+    def max_texts(rows: int) -> int:
+        """ Сколько ячеек колонки из rows строк можно хранить текстом"""
+
+        return rows // 8 + 16
+
+    def append(self, text: str) -> bool:
+        """ Добавляет значение; False, если строка не число и ячеек
+        с текстом уже слишком много"""
+
+        value = parse_number(text)
+        if value is None:
+            if text is None or len(self.texts) >= self.max_texts(
+                    len(self.values)):
+                return False
+            value = to_number(text)
+            self.texts[len(self.values)] = text
+            self.values.append(float('nan') if value is None else value)
+            return True
+        self.values.append(value)
+        return True
+
+    def extend(self, texts: Sequence[str]) -> bool:
+        """ Добавляет значения; False, если колонку нужно сделать
+        строковой, тогда часть значений может быть уже добавлена.
+
+        Значения преобразуются и сверяются с текстом без вызова
+        Python-функции на каждую ячейку: целые - через int и str,
+        дробные - через float и repr. Точная проверка format_number
+        выполняется только для несовпавших ячеек.
+        """
+
+        try:
+            integers = list(map(int, texts))
+            if integers and not (-_MAX_EXACT_INT < min(integers)
+                                 and max(integers) < _MAX_EXACT_INT):
+                raise ValueError
+        except (ValueError, TypeError):
+            integers = None
+        try:
+            if integers is not None:
+                values = array('d', integers)
+                formatted = map(str, integers)
+            else:
+                values = array('d', map(float, texts))
+                formatted = map(repr, values)
+        except (ValueError, TypeError):
+            return all(map(self.append, texts))
+        start = len(self.values)
+        for offset in compress(range(len(values)),
+                               map(ne, formatted, texts)):
+            value, text = values[offset], texts[offset]
+            if isfinite(value) and format_number(value) == text:
+                continue
+            if len(self.texts) >= self.max_texts(start + offset):
+                self.values.extend(values[:offset])
+                return False
+            self.texts[start + offset] = text
+            if not isfinite(value):
+                values[offset] = float('nan')
+        self.values.extend(values)
+        return True
+
+    def text(self, index: int) -> str:
+        if self.texts:
+            text = self.texts.get(index)
+            if text is not None:
+                return text
+        return format_number(self.values[index])
+
+    def non_numbers(self) -> set:
+        """ Номера строк с нечисловым текстом"""
+
+        return {index for index in self.texts if isnan(self.values[index])}
+
+    def sort_values(self):
+        """ Значения для сортировки: сами числа или, если в колонке есть
+        нечисловой текст, ранги ключей value_key, как в потоковом режиме
+        (числа по величине, затем строки)"""
+
+        if not self.non_numbers():
+            return self.values
+        keys = [value_key(self.text(index)) for index in range(len(self))]
+        ranks = {key: rank for rank, key in enumerate(sorted(set(keys)))}
+        return [ranks[key] for key in keys]
+
+    @property
+    def nbytes(self) -> int:
+        """ Оценка занимаемой памяти вместе с объектами текстов"""
+
+        return (self.values.itemsize * len(self.values)
+                + sys.getsizeof(self.texts)
+                + (_INT_SIZE * len(self.texts)
+                   + sum(map(sys.getsizeof, self.texts.values()))))
+
+
+class StringColumn:
+    """ Строковая колонка со словарным кодированием: каждое уникальное
+    значение хранится один раз, строки ссылаются на него кодом"""
+
+    kind = 'str'
+
+    def __init__(self, texts: Iterable[str] = ()):
+        self.codes = array('I')
+        self.dictionary = []
+        self._index = {}
+        for text in texts:
+            self.append(text)
+
+    @classmethod
+    def from_buffer(cls, codes, dictionary: list[str]) -> 'StringColumn':
+        """ Колонка поверх готового буфера кодов без копирования"""
+
+        column = cls()
+        column.codes = codes
+        column.dictionary = dictionary
+        column._index = {text: code for code, text in enumerate(dictionary)}
+        return column
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def append(self, text: str) -> bool:
+        code = self._index.get(text)
+        if code is None:
+            code = self._index[text] = len(self.dictionary)
+            self.dictionary.append(text)
+        self.codes.append(code)
+        return True
+
+    def extend(self, texts: Iterable[str]) -> bool:
+        for text in texts:
+            self.append(text)
+        return True
+
+    def code(self, text: str):
+        """ Код значения или None, если такого значения в колонке нет"""
+
+        return self._index.get(text)
+
+    def text(self, index: int) -> str:
+        return self.dictionary[self.codes[index]]
+
+    def ranks(self) -> list[int]:
+        """ Порядковый номер каждого кода при сортировке значений"""
+
+        ranks = [0] * len(self.dictionary)
+        order = sorted(range(len(self.dictionary)),
+                       key=lambda code: value_key(self.dictionary[code]))
+        for rank, code in enumerate(order):
+            ranks[code] = rank
+        return ranks
+
+    @property
+    def nbytes(self) -> int:
+        """ Оценка занимаемой памяти: коды, объекты строк словаря,
+        список словаря, обратный словарь и его коды-ключи"""
+
+        return (self.codes.itemsize * len(self.codes)
+                + sys.getsizeof(self.dictionary)
+                + sum(map(sys.getsizeof, self.dictionary))
+                + sys.getsizeof(self._index)
+                # коды больше 256 - отдельные объекты int
+                + _INT_SIZE * max(0, len(self.dictionary) - 257))
+
+
+class RowView(Sequence):
+    """ Ленивое представление выбранных строк таблицы в виде словарей.
+
+    Словари создаются только при обращении к строке, например при выводе
+    результата.
+    """
+
+    def __init__(self, table: 'ColumnTable', indices: Sequence[int]):
+        self.table = table
+        self.indices = indices
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return RowView(self.table, self.indices[item])
+        return self.table.row(self.indices[item])
+
+    def __iter__(self) -> Iterator[dict]:
+        return self.table.rows(self.indices)
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+
+class ColumnTable:
+    """ Типизированное колоночное представление CSV.
+
+    Тип колонок определяется по первым sample_size строкам: колонка
+    числовая, если все её значения - числа, иначе строковая. Отдельные
+    нечисловые значения, встреченные позже, хранятся текстом в числовой
+    колонке; если их становится много, колонка становится строковой.
+    Ячейки числовой колонки восстанавливаются в тот же текст, что был
+    в файле, поэтому row() возвращает те же словари, что и DictReader.
+    """
+
+    def __init__(self, fieldnames: list[str], columns: dict):
+        self.fieldnames = fieldnames
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict], fieldnames: list[str] = None,
+                  sample_size: int = 1000) -> 'ColumnTable':
+        rows = iter(rows)
+        sample = list(islice(rows, sample_size))
+        if fieldnames is None:
+            fieldnames = list(sample[0]) if sample else []
+        columns = {}
+        for name in fieldnames:
+            if sample and all(to_number(row[name]) is not None
+                              for row in sample):
+                columns[name] = NumericColumn()
+            else:
+                columns[name] = StringColumn()
+        table = cls(fieldnames, columns)
+        for row in sample:
+            table.append(row)
+        for row in rows:
+            table.append(row)
+        return table
+
+    @classmethod
+    def read_csv(cls, file: str, sample_size: int = 1000) -> 'ColumnTable':
+        """ Таблица из CSV-файла.
+
+        Строки разбираются csv.reader без словарей и раскладываются
+        по колонкам порциями по _CHUNK_ROWS строк; пустые и неполные
+        строки обрабатываются так же, как в DictReader.
+        """
+
+        with open(file, mode="r", encoding="utf-8", newline="") as f:
+            rows = reader(f)
+            fieldnames = next(rows, [])
+            width = len(fieldnames)
+            table = None
+            while True:
+                chunk = list(islice(rows, _CHUNK_ROWS))
+                complete = [row if len(row) == width
+                            else (row + [None] * width)[:width]
+                            for row in chunk if row]
+                if table is None:
+                    sample = [dict(zip(fieldnames, row))
+                              for row in complete[:sample_size]]
+                    table = cls.from_rows(sample, fieldnames, sample_size)
+                    complete = complete[sample_size:]
+                table.extend(complete)
+                if len(chunk) < _CHUNK_ROWS:
+                    break
+            return table
+
+    def append(self, row: dict) -> None:
+        for name, column in self.columns.items():
+            text = row[name]
+            if not column.append(text):
+                self._demote(name).append(text)
+
+    def extend(self, rows: list) -> None:
+        """ Добавление строк-списков значений в порядке fieldnames"""
+
+        if not rows:
+            return
+        for name, texts in zip(self.fieldnames, zip(*rows)):
+            column = self.columns[name]
+            done = len(column)
+            if not column.extend(texts):
+                column = self._demote(name)
+                column.extend(texts[len(column) - done:])
+
+    def _demote(self, name: str) -> 'StringColumn':
+        """ Значение не число: колонка становится строковой"""
+
+        column = self.columns[name]
+        column = self.columns[name] = StringColumn(
+            column.text(index) for index in range(len(column)))
+        return column
+
+    def __len__(self) -> int:
+        if not self.fieldnames:
+            return 0
+        return len(self.columns[self.fieldnames[0]])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def column(self, name: str):
+        return self.columns[name]
+
+    def row(self, index: int) -> dict:
+        return {name: column.text(index)
+                for name, column in self.columns.items()}
+
+    def rows(self, indices: Iterable[int] = None) -> Iterator[dict]:
+        if indices is None:
+            indices = range(len(self))
+        return (self.row(index) for index in indices)
+
+    def numeric(self, name: str) -> array:
+        """ Значения числовой колонки"""
+
+        column = self.columns[name]
+        if column.kind != 'number':
+            raise ValueError(f"Колонка '{name}' не числовая.")
+        return column.values
+
+    def sort_indices(self, indices: Iterable[int],
+                     keys: list[tuple[str, bool]],
+                     limit: int = None) -> list[int]:
+        """ Сортировка номеров строк по одной или нескольким колонкам.
+
+        Ключ строится из чисел колонки или рангов значений словаря,
+        колонки по убыванию берутся с обратным знаком. С limit выбираются
+        первые limit строк через кучу.
+        """
+
+        parts = []
+        for name, descending in keys:
+            data = self.columns[name]
+            if data.kind == 'number':
+                values = data.sort_values()
+            else:
+                ranks = data.ranks()
+                values = [ranks[code] for code in data.codes]
+            parts.append((values, -1 if descending else 1))
+        if len(parts) == 1:
+            values, sign = parts[0]
+            if sign == 1:
+                key = values.__getitem__
+            else:
+                def key(index):
+                    return -values[index]
+        else:
+            def key(index):
+                return tuple(sign * values[index] for values, sign in parts)
+        if limit is not None:
+            return heapq.nsmallest(limit, indices, key=key)
+        return sorted(indices, key=key)
+
+    def aggregate(self, indices: Sequence[int],
+                  specs: list[tuple[str, list[str]]]) -> dict:
+        """ Агрегация по колонкам без преобразования строк.
+
+        Числовые колонки читаются напрямую, у строковых значения словаря
+        разбираются в числа один раз. Ошибка возникает, только если
+        среди выбранных строк есть нечисловое значение.
+        """
+
+        aggregate_set = AggregateSet(specs)
+        every_row = len(indices) == len(self)
+        for name, stats in aggregate_set.stats.items():
+            column = self.columns[name]
+            if column.kind == 'number':
+                values = column.values
+                invalid = column.non_numbers()
+                if invalid and not invalid.isdisjoint(indices):
+                    raise ValueError("Агрегация требует числовых значений.")
+                if not every_row:
+                    values = list(map(values.__getitem__, indices))
+            else:
+                numbers = [to_number(text) for text in column.dictionary]
+                codes = column.codes
+                if not every_row:
+                    codes = map(codes.__getitem__, indices)
+                values = [numbers[code] for code in codes]
+                if None in values:
+                    raise ValueError("Агрегация требует числовых значений.")
+            # sum, min и max по выбранным значениям вместо обновления
+            # состояния по одному значению
+            if stats.needs_values:
+                stats.add_values(values)
+            else:
+                stats.add_sum(values, len(indices))
+        aggregate_set.rows = len(indices)
+        return aggregate_set.result()
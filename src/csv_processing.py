@@ -1,11 +1,42 @@
 import argparse
+import os
+import sys
 from csv import DictReader
-from tabulate import tabulate
+from itertools import islice
+from typing import Iterable, Iterator
+
+if not __package__:
+    # запуск скриптом из каталога src: python csv_processing.py ...
+    # Относительные импорты работают, если модуль знает свой пакет
+    # (PEP 366), поэтому корень репозитория добавляется в sys.path.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+    __package__ = "src"
+    __import__(__package__)
+
+from .aggregators import AggregateSet, parse_aggregate
+from .batch import parse_batch, run_batch
+from .columnar import ColumnTable, RowView
+from .grouping import HashAggregator, parse_group_by
+from .incremental import IncrementalQuery
+from .index import TableIndex
+from .memo import DiskResultCache, query_key, rows_nbytes
+from .mmap_reader import mmap_rows
+from .output import OUTPUT_FORMATS, paginate, write_rows
+from .parallel import can_split, parallel_query
+from .predicates import compile_where, filter_table, parse_where
+from .profiling import PROFILE_FORMATS, Profiler, measure, track
+from .sidecar import default_cache_dir, load_index, load_table, sidecar_path
+from .sorting import parse_order_by, sort_rows
 
 
 class FileValuesProcessor:
-    def __init__(self):
+    def __init__(self, result_cache=None, profiler=None):
         self.filtered_data = []
+        # кеш результатов запросов: ResultCache или DiskResultCache
+        self.result_cache = result_cache
+        # profiling.Profiler для замеров этапов запросов
+        self.profiler = profiler
 
 
     @staticmethod
@@ -19,57 +50,371 @@ class FileValuesProcessor:
                       file: str,
                       where: str = None,
                       aggregate: str = None,
-                      order_by: str = None) -> None:
-
-        """Читает данные из файла и передаёт их в функции для обработки"""
-        with open(file, mode="r", encoding="utf-8", newline="") as f:
-            reader = DictReader(f)
-            list_reader = list(reader)
-            if not where and not aggregate and not order_by:
-                print(tabulate(list_reader, headers="keys", tablefmt="grid"))
+                      order_by: str = None,
+                      *,
+                      group_by: str = None,
+                      max_groups: int = 100_000,
+                      engine: str = 'stream',
+                      limit: int = None,
+                      sort_buffer: int = None,
+                      jobs: int = None,
+                      backend: str = 'csv',
+                      cache: bool = False,
+                      cache_dir: str = None,
+                      index: bool = False,
+                      offset: int = 0) -> None:
+
+        """Читает данные из файла и передаёт их в функции для обработки.
+
+        Без условий файл выводится таблицей построчно, иначе результат
+        запроса сохраняется в filtered_data. Параметры описаны
+        в iter_file_csv.
+        """
+        rows = self.iter_file_csv(
+            file, where, aggregate, order_by, group_by=group_by,
+            max_groups=max_groups, engine=engine, limit=limit,
+            sort_buffer=sort_buffer, jobs=jobs, backend=backend, cache=cache,
+            cache_dir=cache_dir, index=index, offset=offset)
+        if (not where and not aggregate and not order_by and limit is None
+                and not offset):
+            write_rows(rows)
+            return
+        self.filtered_data = list(rows)
+
+    def iter_file_csv(self,
+                      file: str,
+                      where: str = None,
+                      aggregate: str = None,
+                      order_by: str = None,
+                      *,
+                      group_by: str = None,
+                      max_groups: int = 100_000,
+                      engine: str = 'stream',
+                      limit: int = None,
+                      sort_buffer: int = None,
+                      jobs: int = None,
+                      backend: str = 'csv',
+                      cache: bool = False,
+                      cache_dir: str = None,
+                      index: bool = False,
+                      offset: int = 0) -> Iterator[dict]:
+
+        """Выполняет запрос к файлу и отдаёт строки результата по мере
+        их получения.
+
+        Строки читаются потоково: DictReader -> фильтрация -> агрегация.
+        Запросы с --where и --aggregate выполняются за один проход с
+        постоянным расходом памяти, в память попадают только строки,
+        которые нужно отсортировать.
+        С group_by агрегаты считаются для всех групп за тот же один проход.
+
+        С limit и offset отдаётся страница результата: limit строк после
+        первых offset. Вместе с order_by выполняется top-K через кучу,
+        без order_by чтение файла прекращается после нужных строк.
+        С sort_buffer полная сортировка выполняется внешним слиянием
+        с не более чем sort_buffer строками в памяти.
+
+        С engine='columnar' файл загружается в типизированную колоночную
+        таблицу (ColumnTable) и операции выполняются по колонкам. Загрузка
+        таблицы в несколько раз медленнее потокового чтения, поэтому
+        колоночный режим окупается с cache=True или в сервере запросов,
+        где таблица загружается один раз на много запросов.
+
+        С jobs > 1 файл делится на части по границам строк, которые
+        обрабатываются параллельно в нескольких процессах. Файл с кавычками
+        в данных читается последовательно: граница части могла бы попасть
+        внутрь значения в кавычках с переводом строки.
+
+        С backend='mmap' файл отображается в память и разбирается по байтам:
+        декодируются только колонки, нужные запросу, а строки, не прошедшие
+        фильтр, отбрасываются до создания словаря.
+
+        С cache=True запрос выполняется колоночно по бинарному кешу файла
+        (sidecar), который создаётся при первом обращении и пересобирается
+        при изменении файла.
+
+        С index=True и cache=True для колонок условия фильтрации строятся
+        индексы: отсортированный индекс для чисел, номера строк по значениям
+        для строк. Индекс каждой колонки сохраняется в кеше отдельно
+        и читается, только когда запрос фильтрует по этой колонке. Без
+        cache index не используется: индекс пришлось бы строить заново
+        при каждом запуске, а это дольше полного просмотра.
+
+        Если у обработчика задан result_cache, результаты запросов
+        с where, aggregate или order_by запоминаются по отпечатку файла
+        и нормализованному запросу; повторный запрос к неизменённому
+        файлу возвращается из кеша без чтения файла. Результат больше
+        max_bytes кеша не запоминается: как только он превышает лимит,
+        строки перестают копиться.
+
+        Если у обработчика задан profiler, для каждого этапа запроса
+        (чтение, фильтрация, агрегация, сортировка) замеряются время,
+        число строк, прочитанные байты и пиковая память.
+        """
+        if group_by and not aggregate:
+            raise ValueError("Группировка требует условия агрегации.")
+        if engine not in ('stream', 'columnar'):
+            raise ValueError(
+                "Недопустимый режим выполнения. Допустимые значения: "
+                "stream, columnar.")
+        if backend not in ('csv', 'mmap'):
+            raise ValueError(
+                "Недопустимый способ чтения файла. Допустимые значения: "
+                "csv, mmap.")
+        if self.profiler is not None:
+            self.profiler.reset()
+        options = dict(group_by=group_by, max_groups=max_groups,
+                       engine=engine, limit=limit, sort_buffer=sort_buffer,
+                       jobs=jobs, backend=backend, cache=cache,
+                       cache_dir=cache_dir, index=index, offset=offset)
+        if self.result_cache is None or not (where or aggregate or order_by):
+            yield from self.run_query(file, where, aggregate, order_by,
+                                      **options)
+            return
+        key = query_key(file, where, aggregate, order_by, group_by, limit,
+                        offset)
+        rows = self.result_cache.get(key)
+        if rows is not None:
+            yield from track(self.profiler, "result_cache", lambda: rows)
+            return
+        rows = []
+        size = 0
+        for row in self.run_query(file, where, aggregate, order_by,
+                                  **options):
+            if rows is not None:
+                copy = dict(row)
+                size += rows_nbytes((copy,))
+                rows.append(copy)
+                # результат больше лимита кеша не копится в памяти
+                if size > self.result_cache.max_bytes:
+                    rows = None
+            yield row
+        # файл, изменённый во время чтения, не попадает в кеш
+        if rows is not None and query_key(file, where, aggregate, order_by,
+                                          group_by, limit, offset) == key:
+            self.result_cache.put(key, rows)
+
+    def run_query(self,
+                  file: str,
+                  where: str = None,
+                  aggregate: str = None,
+                  order_by: str = None,
+                  *,
+                  group_by: str = None,
+                  max_groups: int = 100_000,
+                  engine: str = 'stream',
+                  limit: int = None,
+                  sort_buffer: int = None,
+                  jobs: int = None,
+                  backend: str = 'csv',
+                  cache: bool = False,
+                  cache_dir: str = None,
+                  index: bool = False,
+                  offset: int = 0) -> Iterator[dict]:
+
+        """Выполняет запрос к файлу без кеша результатов"""
+
+        profiler = self.profiler
+        # строки, которые нужно получить до разбиения на страницы
+        fetch = None if limit is None else offset + limit
+        steps = self.step_names(aggregate, order_by, group_by, fetch)
+
+        if cache or engine == 'columnar':
+            source = sidecar_path(file, cache_dir) if cache else file
+            with measure(profiler, "load", consumes=False,
+                         bytes_read=lambda: os.path.getsize(source)):
+                table = (load_table(file, cache_dir) if cache
+                         else ColumnTable.read_csv(file))
+                table_index = (load_index(file, table, cache_dir)
+                               if index and cache else None)
+            rows = track(profiler, "+".join(["query"] + steps),
+                         lambda: self.query_table(
+                             table, where, aggregate, order_by,
+                             group_by=group_by, max_groups=max_groups,
+                             limit=fetch, index=table_index))
+        elif (jobs is not None and jobs > 1
+              and (where or aggregate or order_by) and can_split(file)):
+            rows = track(profiler, "parallel_scan",
+                         lambda: parallel_query(file, jobs, where, aggregate,
+                                                order_by, group_by,
+                                                max_groups, fetch),
+                         lambda: os.path.getsize(file))
+        elif backend == 'mmap':
+            rows = track(profiler, "mmap_read+filter" if where else
+                         "mmap_read",
+                         lambda: mmap_rows(file, where, self.query_columns(
+                             aggregate, group_by)),
+                         lambda: os.path.getsize(file))
             if where:
-                self.filter_data(list_reader=list_reader, where=where)
+                rows = self.require_rows(rows)
+            if steps:
+                source = rows
+                rows = track(profiler, "+".join(steps),
+                             lambda: self.process_rows(
+                                 source, aggregate, order_by,
+                                 group_by=group_by, max_groups=max_groups,
+                                 limit=fetch, sort_buffer=sort_buffer))
+        else:
+            with open(file, mode="r", encoding="utf-8", newline="") as f:
+                rows = reader = track(profiler, "read",
+                                      lambda: DictReader(f),
+                                      lambda: f.buffer.tell())
+                if where:
+                    rows = self.require_rows(track(
+                        profiler, "filter",
+                        lambda: self.filter_rows(reader, where=where)))
+                if steps:
+                    source = rows
+                    rows = track(profiler, "+".join(steps),
+                                 lambda: self.process_rows(
+                                     source, aggregate, order_by,
+                                     group_by=group_by, max_groups=max_groups,
+                                     limit=fetch, sort_buffer=sort_buffer))
+                try:
+                    yield from paginate(rows, offset, limit)
+                finally:
+                    if profiler is not None:
+                        # счётчик байтов читается, пока файл открыт
+                        reader.close()
+            return
+        yield from paginate(rows, offset, limit)
+
+    @staticmethod
+    def step_names(aggregate: str = None, order_by: str = None,
+                   group_by: str = None, limit: int = None) -> list[str]:
+        """ Названия шагов обработки строк после фильтрации для отчёта
+        профилирования"""
+
+        if group_by:
+            steps = ["group_by"]
+        elif aggregate:
+            return ["aggregate"]
+        else:
+            steps = []
+        if order_by:
+            steps.append("top_k" if limit is not None else "sort")
+        elif limit is not None:
+            steps.append("limit")
+        return steps
+
+    @staticmethod
+    def query_columns(aggregate: str = None, group_by: str = None):
+        """ Колонки, которые нужны запросу после фильтрации,
+        или None, если нужны все колонки строки"""
+
+        if not aggregate:
+            return None
+        columns = {column for column, _ in parse_aggregate(aggregate)}
+        if group_by:
+            columns.update(parse_group_by(group_by))
+        return columns
+
+    def process_rows(self,
+                     rows: Iterable[dict],
+                     aggregate: str = None,
+                     order_by: str = None,
+                     *,
+                     group_by: str = None,
+                     max_groups: int = 100_000,
+                     limit: int = None,
+                     sort_buffer: int = None) -> Iterable[dict]:
+
+        """Группировка, агрегация и сортировка уже отфильтрованных строк"""
+
+        if group_by:
+            grouping = HashAggregator(parse_group_by(group_by),
+                                      parse_aggregate(aggregate),
+                                      max_groups=max_groups)
+            rows = grouping.add_rows(rows).results()
+        elif aggregate:
             if order_by:
-                self.order_by_data(list_reader, order_by=order_by)
-            if aggregate:
-                self.aggregate_data(list_reader, aggregate=aggregate)
+                # порядок строк не влияет на результат агрегации,
+                # поэтому сортировку только проверяем, но не выполняем
+                parse_order_by(order_by)
+            return [self.aggregate_rows(rows, aggregate=aggregate)]
+        if order_by:
+            return sort_rows(rows, order_by, limit=limit,
+                             max_rows_in_memory=sort_buffer)
+        if limit is not None:
+            return islice(rows, limit)
+        return rows
 
-    def filter_data(self, list_reader: list[dict],
-                    where: str) -> None:
+    def query_table(self,
+                    table: ColumnTable,
+                    where: str = None,
+                    aggregate: str = None,
+                    order_by: str = None,
+                    *,
+                    group_by: str = None,
+                    max_groups: int = 100_000,
+                    limit: int = None,
+                    index: TableIndex = None) -> Iterable[dict]:
 
-        """ Фильтрация """
+        """Выполняет запрос над колоночной таблицей.
 
-        if '=' in where:
-            # разбиение входящих данных (условия фильтрации) на две части
-            column, value = self.parse_condition(where, '=')
-            self.filtered_data = [row for row in list_reader if
-                                  (row[column]) == value]
-        elif '>' in where:
-            # разбиение входящих данных (условия фильтрации) на две части
-            column, value = self.parse_condition(where, '>')
-            # проверка можно ли преобразовать строку в число
-            try:
-                value = float(value)
-            except (ValueError, TypeError):
+        Фильтрация вычисляется маской по колонкам целиком, сортировка
+        работает с номерами строк, агрегация читает числа прямо
+        из колонок. Словари строк создаются лениво, только для вывода
+        результата. Если передан индекс таблицы, фильтрация просматривает
+        только подходящие блоки или строки из индекса.
+        """
+        indices = range(len(table))
+        if where:
+            node = parse_where(where)
+            indices = (index.filter(node) if index is not None
+                       else filter_table(node, table))
+            if not indices:
                 raise ValueError(
-                    "Фильтрация по условию больше требует числовых значений.")
-            self.filtered_data = [row for row in list_reader if
-                                  float(row[column]) > value]
-        elif '<' in where:
-            # разбиение входящих данных (условия фильтрации) на две части
-            column, value = self.parse_condition(where, '<')
-            # проверка можно ли преобразовать строку в число
-            try:
-                value = float(value)
-            except (ValueError, TypeError):
-                raise ValueError(
-                    "Фильтрация по условию меньше требует числовых значений..")
+                    "Не найдено записей, соответствующих условиям фильтрации.")
+        if group_by:
+            grouping = HashAggregator(parse_group_by(group_by),
+                                      parse_aggregate(aggregate),
+                                      max_groups=max_groups)
+            rows = grouping.add_rows(table.rows(indices)).results()
+            if order_by:
+                rows = sort_rows(rows, order_by, limit=limit)
+            return islice(rows, limit)
+        if aggregate:
+            if order_by:
+                parse_order_by(order_by)
+            return [table.aggregate(indices, parse_aggregate(aggregate))]
+        if order_by:
+            indices = table.sort_indices(indices, parse_order_by(order_by),
+                                         limit=limit)
+        return RowView(table, indices[:limit])
 
-            self.filtered_data = [row for row in list_reader if
-                                  float(row[column]) < value]
-        else:
+    @staticmethod
+    def require_rows(rows: Iterable[dict]) -> Iterator[dict]:
+        """ Пробрасывает строки дальше и сообщает, если не нашлось ни одной"""
+
+        found = False
+        for row in rows:
+            found = True
+            yield row
+        if not found:
             raise ValueError(
-                "Недопустимый оператор в фильтрации. Допустимые операторы: '=', '<', '>'.")
+                "Не найдено записей, соответствующих условиям фильтрации.")
+
+    @staticmethod
+    def filter_rows(rows: Iterable[dict],
+                    where: str) -> Iterator[dict]:
+
+        """ Потоковая фильтрация: условие разбирается и компилируется
+        один раз, строки проверяются по мере чтения.
+
+        Поддерживаются операторы =, !=, >, >=, <, <=, IN, BETWEEN
+        и их сочетания через AND, OR, NOT и скобки:
+        "brand IN (apple, samsung) AND price>=500".
+        """
+
+        return filter(compile_where(where), rows)
+
+    def filter_data(self, list_reader: list[dict],
+                    where: str) -> None:
+
+        """ Фильтрация """
+
+        self.filtered_data = list(self.filter_rows(list_reader, where))
 
         if not self.filtered_data:
             raise ValueError(
@@ -78,140 +423,35 @@ class FileValuesProcessor:
     def order_by_data(self, list_reader: list[dict],
                       order_by: str) -> None:
 
-        """Сортировка"""
-
-        if "=" in order_by:
-            # разбиение входящих данных (условия сортировки) на две части
-            column, value = self.parse_condition(order_by, '=')
-            # Данные для проверки, является ли значение
-            # в условии сортировки числовым значением
-            data = list_reader[0]
-            # проверка является ли колонка числом
-            has_digit = any(char.isdigit() for char in data[column])
-            if value == 'desc':
-                if has_digit:
-                    # при наличии фильтрации берём для обработки отфильтрованные данные
-                    if self.filtered_data:
-                        # если колонка фильтрации является числом преобразуем его в float
-                        # для дальнейшей обработки
-                        self.filtered_data = sorted(self.filtered_data,
-                                                    key=lambda x: float(
-                                                        x[column]),
-                                                    reverse=True)
-                    # если нет данных берем данные из файла
-                    else:
-                        self.filtered_data = sorted(list_reader,
-                                                    key=lambda x: float(
-                                                        x[column]),
-                                                    reverse=True)
-                else:
-                    # если колонка строка, при наличии фильтрации берём для
-                    # обработки отфильтрованные данные
-                    if self.filtered_data:
-                        self.filtered_data = sorted(self.filtered_data,
-                                                    key=lambda x:
-                                                    x[column],
-                                                    reverse=True)
-                    # если нет отфильтрованных берем данные из файла
-                    else:
-                        self.filtered_data = sorted(list_reader,
-                                                    key=lambda x:
-                                                    x[column],
-                                                    reverse=True)
-            # применяем ту же логику для порядка сортировки asc
-            elif value == "asc":
-                if has_digit:
-                    if self.filtered_data:
-                        self.filtered_data = sorted(self.filtered_data,
-                                                    key=lambda x: float(
-                                                        x[column]),
-                                                    reverse=False)
-                    else:
-                        self.filtered_data = sorted(list_reader,
-                                                    key=lambda x: float(
-                                                        x[column]),
-                                                    reverse=False)
-                else:
-                    if self.filtered_data:
-
-                        self.filtered_data = sorted(self.filtered_data,
-                                                    key=lambda x:
-                                                    x[column], reverse=False)
-                    else:
-                        self.filtered_data = sorted(list_reader,
-                                                    key=lambda x: x[column],
-                                                    reverse=False)
-
-            else:
-                raise ValueError(
-                    "Недопустимая функция сортировки. Используйте 'asc' для"
-                    " сортировки по возрастанию или 'desc' для сортировки по убыванию.")
+        """Сортировка по одной или нескольким колонкам: "price=desc,name=asc"
+        """
 
-        else:
-            raise ValueError("Неверный оператор сортировки: используйте '='.")
+        # при наличии фильтрации берём для обработки отфильтрованные данные,
+        # если нет отфильтрованных берем данные из файла
+        data = self.filtered_data or list_reader
+        self.filtered_data = list(sort_rows(data, order_by))
+
+    @staticmethod
+    def aggregate_rows(rows: Iterable[dict],
+                       aggregate: str) -> dict:
+
+        """ Потоковая агрегация за один проход по строкам.
+
+        Поддерживает несколько колонок и функций в одном условии:
+        "price=avg,max;rating=min".
+        """
+
+        return AggregateSet.from_string(aggregate).add_rows(rows).result()
 
     def aggregate_data(self, list_reader: list[dict],
                        aggregate: str) -> None:
 
         """ Агрегация"""
 
-        if '=' in aggregate:
-            # разбиение входящих данных (условия агрегации) на две части
-            column, value = self.parse_condition(aggregate, '=')
-            # Данные для проверки, является ли значение
-            # в условии сортировки числовым значением
-            data = list_reader[0]
-            # проверка можно ли преобразовать строку в число
-            try:
-                float(data[column])
-            except (ValueError, TypeError):
-                raise ValueError("Агрегация требует числовых значений.")
-
-            if value == 'avg':
-                # при наличии фильтрации берём для обработки отфильтрованные данные
-                if self.filtered_data:
-                    avg_value = sum(float(row[column]) for row in
-                                    self.filtered_data) / len(
-                        self.filtered_data)
-                    self.filtered_data.append({value: avg_value})
-
-                else:
-                    # если нет отфильтрованных берем данные из файла
-                    avg_value = sum(
-                        float(row[column]) for row in
-                        list_reader) / len(
-                        list_reader)
-                    self.filtered_data.append({value: avg_value})
-            elif value == 'max':
-                # при наличии фильтрации берём для обработки отфильтрованные данные
-                if self.filtered_data:
-                    max_value = max(
-                        float(row[column]) for row in
-                        self.filtered_data)
-                    self.filtered_data.append({value: max_value})
-                else:
-                    # если нет отфильтрованных берем данные из файла
-                    max_value = max(
-                        float(row[column]) for row in list_reader)
-                    self.filtered_data.append({value: max_value})
-            elif value == 'min':
-                # при наличии фильтрации берём для обработки отфильтрованные данные
-                if self.filtered_data:
-                    min_value = min(
-                        float(row[column]) for row in
-                        self.filtered_data)
-                    self.filtered_data.append({value: min_value})
-                else:
-                    # если нет отфильтрованных берем данные из файла
-                    min_value = min(
-                        float(row[column]) for row in list_reader)
-                    self.filtered_data.append({value: min_value})
-            else:
-                raise ValueError(
-                    "Недопустимое название функции агрегации."
-                    " Допустимые значения: avg, min, max.")
-        else:
-            raise ValueError("Неверный оператор агрегации: используйте '='.")
+        # при наличии фильтрации берём для обработки отфильтрованные данные,
+        # если нет отфильтрованных берем данные из файла
+        data = self.filtered_data or list_reader
+        self.filtered_data.append(self.aggregate_rows(data, aggregate))
 
 
 if __name__ == '__main__':
@@ -221,23 +461,145 @@ if __name__ == '__main__':
         description="Фильтрация и агрегация данных products.csv файла")
     # передаем именованные параметры
     parser.add_argument("--file", help="Путь файла csv")
-    parser.add_argument("--where", help="Данные для фильтрации")
-    parser.add_argument("--aggregate", help="Данные для агрегации")
-    parser.add_argument("--order_by", help="Данные для сортировки")
+    parser.add_argument(
+        "--where",
+        help="Данные для фильтрации, например "
+             "\"brand IN (apple, samsung) AND price>=500\"")
+    parser.add_argument(
+        "--aggregate",
+        help="Данные для агрегации, например \"price=avg,max;rating=min\"")
+    parser.add_argument(
+        "--order_by",
+        help="Данные для сортировки, например \"price=desc,name=asc\"")
+    parser.add_argument("--limit", type=int,
+                        help="Число строк результата; с --order_by "
+                             "выбираются top-K строк без полной сортировки")
+    parser.add_argument("--sort_buffer", type=int,
+                        help="Число строк в памяти при внешней сортировке "
+                             "файлов, не помещающихся в память")
+    parser.add_argument("--group_by",
+                        help="Колонки группировки для агрегации, например brand")
+    parser.add_argument("--max_groups", type=int, default=100_000,
+                        help="Число групп в памяти, после которого состояние "
+                             "группировки сбрасывается на диск")
+    parser.add_argument("--engine", choices=("stream", "columnar"),
+                        default="stream",
+                        help="Режим выполнения: потоковый или колоночный. "
+                             "Загрузка колоночной таблицы медленнее "
+                             "потокового чтения, поэтому columnar быстрее "
+                             "только с --cache, когда таблица читается "
+                             "из кеша")
+    parser.add_argument("--jobs", type=int,
+                        help="Число процессов для параллельной обработки "
+                             "файла")
+    parser.add_argument("--reader", choices=("csv", "mmap"), default="csv",
+                        help="Способ чтения файла: csv.DictReader или разбор "
+                             "отображённого в память файла по байтам")
+    parser.add_argument("--cache", action="store_true",
+                        help="Использовать бинарный колоночный кеш файла")
+    parser.add_argument("--cache_dir",
+                        help="Каталог кеша, по умолчанию ~/.cache/workmate")
+    parser.add_argument("--index", action="store_true",
+                        help="С --cache использовать индексы колонок "
+                             "для быстрой фильтрации; индексы строятся "
+                             "при первом запросе и сохраняются в кеше")
+    parser.add_argument("--offset", type=int, default=0,
+                        help="Число строк результата, пропускаемых перед "
+                             "выводом (вместе с --limit - постраничный вывод)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="grid",
+                        help="Формат вывода: таблица, CSV или JSON Lines")
+    parser.add_argument("--batch",
+                        help="Файл пакета запросов (по одному на строку, "
+                             "например --where \"price>500\" --aggregate "
+                             "price=avg), выполняемых за один просмотр файла")
+    parser.add_argument("--memo", action="store_true",
+                        help="Запоминать результаты запросов в кеше "
+                             "<cache_dir>/results и возвращать их, пока файл "
+                             "не изменился")
+    parser.add_argument("--memo_size", type=int, default=64,
+                        help="Объём кеша результатов, МБ")
+    parser.add_argument("--memo_stats", action="store_true",
+                        help="Показать счётчики кеша результатов")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Обрабатывать только строки, дописанные в файл "
+                             "после прошлого запуска (контрольная точка "
+                             "в <cache_dir>/incremental)")
+    parser.add_argument("--follow", action="store_true",
+                        help="Следить за ростом файла и выводить результат "
+                             "после каждой порции новых строк")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="Период проверки файла с --follow, секунды")
+    parser.add_argument("--profile", "--explain_analyze", nargs="?",
+                        const="table", choices=PROFILE_FORMATS,
+                        help="Вывести в stderr замеры этапов запроса: "
+                             "таблицей (по умолчанию) или в JSON")
+    parser.add_argument("--trace_memory", action="store_true",
+                        help="С --profile считать память этапов через "
+                             "tracemalloc (точнее, но медленнее)")
     args = parser.parse_args()
+    if args.memo or args.memo_stats:
+        values_processor.result_cache = DiskResultCache(
+            os.path.join(args.cache_dir or default_cache_dir(), "results"),
+            args.memo_size * 2 ** 20)
+    if args.memo_stats:
+        stats = values_processor.result_cache.stats()
+        print(f"Кеш результатов: попаданий {stats['hits']}, "
+              f"промахов {stats['misses']}, записей {stats['entries']}, "
+              f"{stats['bytes']} байт.")
+        sys.exit()
     try:
-        values_processor.read_file_csv(args.file, args.where, args.aggregate,
-                                       args.order_by)
-        if args.aggregate:
-            # если выполняется агрегация, используем только данные,
-            # относящиеся к результатам агрегации
-            data = [values_processor.filtered_data[-1]]
-
-            print(tabulate(data, headers="keys", tablefmt="grid"))
-        elif values_processor.filtered_data:
-            print(tabulate(values_processor.filtered_data, headers="keys",
-
-                           tablefmt="grid"))
+        if args.batch:
+            with open(args.batch, encoding="utf-8") as f:
+                queries = parse_batch(f)
+            for number, query in enumerate(run_batch(args.file, queries), 1):
+                print(f"-- [{number}] {query}")
+                try:
+                    write_rows(query.result(), args.format)
+                except (ValueError, TypeError) as e:
+                    print(e)
+                print()
+            sys.exit()
+        if args.incremental or args.follow:
+            tracker = IncrementalQuery(
+                args.file,
+                os.path.join(args.cache_dir, "incremental")
+                if args.cache_dir else None,
+                where=args.where, aggregate=args.aggregate,
+                order_by=args.order_by, group_by=args.group_by,
+                limit=args.limit, offset=args.offset,
+                max_groups=args.max_groups)
+            if not args.follow:
+                tracker.update()
+                tracker.save()
+                write_rows(tracker.result(), args.format)
+                sys.exit()
+            try:
+                for _ in tracker.follow(args.interval):
+                    try:
+                        write_rows(tracker.result(include_tail=False),
+                                   args.format)
+                    except ValueError as e:
+                        print(e)
+                    sys.stdout.flush()
+            except KeyboardInterrupt:
+                pass
+            sys.exit()
+        if args.profile:
+            values_processor.profiler = Profiler(args.trace_memory)
+        # строки результата выводятся по мере получения, не накапливаясь
+        rows = values_processor.iter_file_csv(
+            args.file, args.where, args.aggregate, args.order_by,
+            group_by=args.group_by, max_groups=args.max_groups,
+            engine=args.engine, limit=args.limit,
+            sort_buffer=args.sort_buffer, jobs=args.jobs,
+            backend=args.reader, cache=args.cache, cache_dir=args.cache_dir,
+            index=args.index, offset=args.offset)
+        with measure(values_processor.profiler, "render"):
+            write_rows(rows, args.format)
+        if args.profile:
+            values_processor.profiler.stop()
+            print(values_processor.profiler.format(args.profile),
+                  file=sys.stderr)
     except ValueError as e:
         print(e)
     except KeyError as e:
@@ -248,3 +610,6 @@ if __name__ == '__main__':
     except FileNotFoundError as e:
         print(
             f"Файл не найден по пути '{e}'. Проверьте правильность указанного пути.")
+    except BrokenPipeError:
+        # читатель вывода закрылся раньше времени, например head
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
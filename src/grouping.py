@@ -0,0 +1,159 @@
+import os
+import pickle
+from tempfile import TemporaryDirectory
+from typing import Iterable, Iterator
+
+from .aggregators import AggregateSet
+
+
+def parse_group_by(group_by: str) -> list[str]:
+    """ Разбор списка колонок группировки: "brand" или "brand,name" """
+
+    columns = [column.strip() for column in group_by.split(',')]
+    if not all(columns):
+        raise ValueError(
+            "Неверное условие группировки: перечислите колонки через ','.")
+    return columns
+
+
+class HashAggregator:
+    """ Группировка с хеш-агрегацией за один проход по строкам.
+
+    Состояние агрегатов каждой группы хранится в словаре по ключу группы.
+    Когда число групп превышает max_groups, накопленные состояния
+    сбрасываются на диск в partitions файлов по хешу ключа и словарь
+    очищается. В конце каждая партиция объединяется отдельно, поэтому
+    в памяти одновременно находится лишь её часть групп.
+
+    По умолчанию партиции пишутся во временный каталог, который удаляется
+    после чтения результата. С spill_dir партиции пишутся в этот каталог
+    и не удаляются: так параллельный обработчик части файла передаёт
+    сброшенные группы в merge_spilled другого HashAggregator.
+    """
+
+    def __init__(self,
+                 group_by: list[str],
+                 specs: list[tuple[str, list[str]]],
+                 max_groups: int = 100_000,
+                 partitions: int = 16,
+                 spill_dir: str = None):
+        if max_groups < 1:
+            raise ValueError("Лимит групп должен быть положительным числом.")
+        self.group_by = group_by
+        self.specs = specs
+        self.max_groups = max_groups
+        self.partitions = partitions
+        self.spill_dir = spill_dir
+        self.groups = {}
+        self.spills = 0
+        self._spill_dir = None
+
+    def add_row(self, row: dict) -> None:
+        key = tuple(row[column] for column in self.group_by)
+        state = self.groups.get(key)
+        if state is None:
+            if len(self.groups) >= self.max_groups:
+                self._spill()
+            state = self.groups[key] = AggregateSet(self.specs)
+        state.add_row(row)
+
+    def add_rows(self, rows: Iterable[dict]) -> 'HashAggregator':
+        for row in rows:
+            self.add_row(row)
+        return self
+
+    def _directory(self) -> str:
+        if self.spill_dir is not None:
+            return self.spill_dir
+        return self._spill_dir.name
+
+    def _partition_path(self, partition: int) -> str:
+        return f"{self._directory()}/partition-{partition}.pickle"
+
+    def _spill(self) -> None:
+        """ Сброс накопленных групп на диск по партициям"""
+
+        if self.spill_dir is not None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        elif self._spill_dir is None:
+            self._spill_dir = TemporaryDirectory(prefix="workmate-groups-")
+        buckets = {}
+        for key, state in self.groups.items():
+            buckets.setdefault(hash(key) % self.partitions, []).append(
+                (key, state))
+        for partition, items in buckets.items():
+            with open(self._partition_path(partition), "ab") as f:
+                pickle.dump(items, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.groups = {}
+        self.spills += 1
+
+    def _group_row(self, key: tuple, state: AggregateSet) -> dict:
+        row = dict(zip(self.group_by, key))
+        row.update(state.result())
+        return row
+
+    @staticmethod
+    def _partition_items(path: str) -> Iterator[tuple]:
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            while True:
+                try:
+                    yield from pickle.load(f)
+                except EOFError:
+                    return
+
+    def _load_partition(self, partition: int) -> dict:
+        groups = {}
+        for key, state in self._partition_items(
+                self._partition_path(partition)):
+            if key in groups:
+                groups[key].merge(state)
+            else:
+                groups[key] = state
+        return groups
+
+    def merge_state(self, key: tuple, state: AggregateSet) -> None:
+        """ Добавление состояния группы, накопленного в другом месте,
+        например в параллельном обработчике части файла"""
+
+        current = self.groups.get(key)
+        if current is not None:
+            current.merge(state)
+            return
+        if len(self.groups) >= self.max_groups:
+            self._spill()
+        self.groups[key] = state
+
+    def merge_spilled(self, directory: str) -> None:
+        """ Добавление групп, которые другой HashAggregator сбросил
+        в каталог spill_dir. Группы читаются по одной порции сброса,
+        поэтому весь каталог в память не загружается."""
+
+        for name in sorted(os.listdir(directory)):
+            for key, state in self._partition_items(
+                    os.path.join(directory, name)):
+                self.merge_state(key, state)
+
+    def states(self) -> Iterator[tuple]:
+        """ Итоговые пары (ключ группы, состояние агрегатов)"""
+
+        if not self.spills:
+            yield from self.groups.items()
+            return
+        self._spill()
+        try:
+            for partition in range(self.partitions):
+                yield from self._load_partition(partition).items()
+        finally:
+            if self._spill_dir is not None:
+                self._spill_dir.cleanup()
+                self._spill_dir = None
+
+    def results(self) -> Iterator[dict]:
+        """ Строки результата: колонки группировки и значения агрегатов"""
+
+        for key, state in self.states():
+            yield self._group_row(key, state)
@@ -0,0 +1,184 @@
+import copy
+import hashlib
+import json
+import os
+import pickle
+import time
+from csv import reader
+from typing import Iterator
+
+from .batch import BatchQuery
+from .grouping import HashAggregator
+from .memo import normalize_query
+from .parallel import read_header
+from .sidecar import default_cache_dir
+
+# число первых байтов файла, по которым проверяется, что файл
+# только дописывался, а не был перезаписан
+SIGNATURE_BYTES = 64 * 2 ** 10
+
+
+def checkpoint_path(file: str, query: dict, directory: str = None) -> str:
+    """ Путь контрольной точки запроса к файлу"""
+
+    options = {key: value for key, value in query.items()
+               if key in ('where', 'aggregate', 'order_by', 'group_by',
+                          'limit', 'offset')}
+    payload = json.dumps([os.path.abspath(file), normalize_query(**options)],
+                         ensure_ascii=False, sort_keys=True)
+    name = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return os.path.join(directory or os.path.join(default_cache_dir(),
+                                                  "incremental"),
+                        f"{name}.ckpt")
+
+
+class IncrementalQuery:
+    """ Запрос к CSV-файлу, который только дописывается в конец.
+
+    Контрольная точка хранит смещение последней обработанной строки
+    и состояние запроса (BatchQuery): агрегаты, группы или строки
+    результата. При следующем запуске обрабатываются только строки,
+    дописанные после смещения. Если файл стал короче или его начало
+    изменилось, запрос выполняется заново с начала файла.
+
+    Строка без перевода строки в конце файла может быть ещё не дописана:
+    она учитывается в результате, но не в контрольной точке.
+    Значения с переводом строки внутри кавычек не поддерживаются.
+    """
+
+    def __init__(self, file: str, directory: str = None,
+                 max_rows: int = 10_000, **query):
+        self.file = file
+        self.spec = query
+        self.max_rows = max_rows
+        self.path = checkpoint_path(file, query, directory)
+        self._reset()
+        self._load()
+
+    def _reset(self) -> None:
+        self.query = BatchQuery(**self.spec)
+        self.predicate = self.query.node.compile() \
+            if self.query.node is not None else None
+        self.fieldnames = None
+        self.offset = 0
+        self.signature = None
+        self.tail = b""
+
+    def _signature(self, length: int) -> str:
+        with open(self.file, "rb") as f:
+            return hashlib.sha1(f.read(min(length, SIGNATURE_BYTES))
+                                ).hexdigest()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, EOFError, ImportError, pickle.UnpicklingError,
+                ValueError, AttributeError):
+            return
+        self.fieldnames = state["fieldnames"]
+        self.offset = state["offset"]
+        self.signature = state["signature"]
+        self.query = state["query"]
+
+    @property
+    def spilled(self) -> bool:
+        """ Группы запроса сброшены во временный каталог на диске"""
+
+        state = self.query.state
+        return isinstance(state, HashAggregator) \
+            and state._spill_dir is not None
+
+    @property
+    def savable(self) -> bool:
+        """ Состояние запроса достаточно мало для контрольной точки"""
+
+        if isinstance(self.query.state, list):
+            return len(self.query.state) <= self.max_rows
+        return not self.spilled
+
+    def save(self) -> bool:
+        """ Запись контрольной точки; False, если состояние слишком велико"""
+
+        if not self.savable or self.fieldnames is None:
+            return False
+        state = {"fieldnames": self.fieldnames, "offset": self.offset,
+                 "signature": self.signature, "query": self.query}
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.path)
+        except OSError:
+            return False
+        return True
+
+    def _row(self, line: bytes):
+        values = next(reader([line.decode("utf-8")]), None)
+        if not values:
+            return None
+        return dict(zip(self.fieldnames, values))
+
+    def update(self) -> int:
+        """ Обработка строк, дописанных после контрольной точки.
+
+        Возвращает число обработанных строк.
+        """
+
+        size = os.path.getsize(self.file)
+        if size < self.offset or (self.offset and self._signature(
+                self.offset) != self.signature):
+            self._reset()
+        if self.fieldnames is None:
+            self.fieldnames, self.offset = read_header(self.file)
+            missing = self.query.columns - set(self.fieldnames)
+            if missing:
+                raise KeyError(sorted(missing)[0])
+        count = 0
+        position = self.offset
+        self.tail = b""
+        with open(self.file, "rb") as f:
+            f.seek(position)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    self.tail = line
+                    break
+                position += len(line)
+                row = self._row(line)
+                if row is None:
+                    continue
+                count += 1
+                if self.predicate is None or self.predicate(row):
+                    self.query.add_row(row)
+        self.offset = position
+        self.signature = self._signature(position)
+        return count
+
+    def result(self, include_tail: bool = True) -> list[dict]:
+        """ Строки результата запроса по обработанной части файла"""
+
+        row = self._row(self.tail) if include_tail and self.tail else None
+        if row is None or self.spilled or (
+                self.predicate is not None and not self.predicate(row)):
+            return self.query.result()
+        query = copy.deepcopy(self.query)
+        query.add_row(row)
+        return query.result()
+
+    def follow(self, interval: float = 1.0) -> Iterator[int]:
+        """ Слежение за ростом файла.
+
+        После каждой порции новых строк сохраняет контрольную точку и
+        отдаёт число обработанных строк; файл проверяется каждые
+        interval секунд.
+        """
+
+        first = True
+        while True:
+            count = self.update()
+            if count or first:
+                self.save()
+                yield count
+                first = False
+            time.sleep(interval)
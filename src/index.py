@@ -0,0 +1,233 @@
+import heapq
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import accumulate
+
+from .predicates import And, Between, Comparison, InList, Or, filter_table
+
+
+def _merge_ids(parts: list) -> array:
+    """ Объединение отсортированных списков номеров строк"""
+
+    if len(parts) == 1:
+        return array('q', parts[0])
+    return array('q', heapq.merge(*parts))
+
+
+def _intersect_ids(left: array, right: array) -> array:
+    if len(left) > len(right):
+        left, right = right, left
+    allowed = set(right)
+    return array('q', (index for index in left if index in allowed))
+
+
+class SortedIndex:
+    """ Номера строк, упорядоченные по значению числовой колонки"""
+
+    kind = 'sorted'
+
+    def __init__(self, ids: array, values: array):
+        self.ids = ids
+        self.values = values
+
+    @classmethod
+    def build(cls, values) -> 'SortedIndex':
+        # строки с NaN (нечисловым текстом) в индекс не входят
+        ids = array('q', sorted(
+            (index for index in range(len(values))
+             if values[index] == values[index]),
+            key=values.__getitem__))
+        return cls(ids, array('d', map(values.__getitem__, ids)))
+
+    def arrays(self) -> dict:
+        """ Массивы индекса для сохранения без сериализации объектов"""
+
+        return {"ids": self.ids, "values": self.values}
+
+    def range(self, low: float, high: float, include_low: bool = True,
+              include_high: bool = True) -> array:
+        """ Номера строк со значениями в диапазоне, в порядке строк файла"""
+
+        start = (bisect_left if include_low else bisect_right)(self.values,
+                                                               low)
+        end = (bisect_right if include_high else bisect_left)(self.values,
+                                                              high)
+        return array('q', sorted(self.ids[start:end]))
+
+
+class PostingIndex:
+    """ Номера строк по кодам значений строковой колонки в виде CSR:
+    номера строк со значением code - ids[offsets[code]:offsets[code + 1]].
+
+    Два массива вместо списка на каждое значение: индекс колонки
+    с уникальными значениями не создаёт объект на каждую строку.
+    """
+
+    kind = 'postings'
+
+    def __init__(self, offsets: array, ids: array):
+        self.offsets = offsets
+        self.ids = ids
+
+    @classmethod
+    def build(cls, codes, size: int) -> 'PostingIndex':
+        """ Индекс по кодам строк; size - размер словаря колонки"""
+
+        # устойчивая сортировка оставляет номера строк каждого кода
+        # в порядке файла
+        ids = array('q', sorted(range(len(codes)), key=codes.__getitem__))
+        counts = Counter(codes)
+        offsets = array('q', accumulate(
+            (counts.get(code, 0) for code in range(size)), initial=0))
+        return cls(offsets, ids)
+
+    def arrays(self) -> dict:
+        return {"offsets": self.offsets, "ids": self.ids}
+
+    def __getitem__(self, code: int) -> array:
+        return self.ids[self.offsets[code]:self.offsets[code + 1]]
+
+
+# классы индексов по полю kind при чтении из кеша
+INDEX_KINDS = {cls.kind: cls for cls in (SortedIndex, PostingIndex)}
+
+
+class TableIndex:
+    """ Индексы колоночной таблицы для фильтрации без полного просмотра.
+
+    Индекс колонки строится лениво, при первом условии на эту колонку:
+    для числовых колонок - отсортированный индекс, диапазонные условия
+    решаются двоичным поиском; для строковых - номера строк по кодам
+    значений (PostingIndex). Если передан cache (объект с методами
+    load(name) и save(name, index)), индексы колонок читаются из него
+    и сохраняются в него по отдельности. Условия, которые индекс
+    не покрывает, проверяются полным просмотром или только на
+    строках-кандидатах.
+    """
+
+    def __init__(self, table, cache=None):
+        self.table = table
+        self.cache = cache
+        self.indexes = {}
+
+    @property
+    def nbytes(self) -> int:
+        """ Память построенных индексов колонок"""
+
+        return sum(sys.getsizeof(data) for index in self.indexes.values()
+                   for data in index.arrays().values())
+
+    def column_index(self, name: str):
+        """ SortedIndex числовой колонки или PostingIndex строковой"""
+
+        index = self.indexes.get(name)
+        if index is not None:
+            return index
+        column = self.table.column(name)
+        if self.cache is not None:
+            index = self.cache.load(name)
+        if index is None:
+            if column.kind == 'number':
+                index = SortedIndex.build(column.values)
+            else:
+                index = PostingIndex.build(column.codes,
+                                           len(column.dictionary))
+            if self.cache is not None:
+                self.cache.save(name, index)
+        self.indexes[name] = index
+        return index
+
+    @staticmethod
+    def _bounds(condition):
+        """ Диапазон (low, high, include_low, include_high) условия
+        над числами или None, если условие не диапазонное"""
+
+        inf = float('inf')
+        if isinstance(condition, Between):
+            return condition.low, condition.high, True, True
+        if not isinstance(condition, Comparison) or condition.number is None:
+            return None
+        number = condition.number
+        return {
+            '=': (number, number, True, True),
+            '>': (number, inf, False, True),
+            '>=': (number, inf, True, True),
+            '<': (-inf, number, True, False),
+            '<=': (-inf, number, True, True),
+        }.get(condition.operator)
+
+    def _numeric_ids(self, condition):
+        name = condition.column
+        if isinstance(condition, InList) and not condition.negated:
+            if len(condition.numbers) < len(set(condition.values)):
+                # нечисловые значения списка ищутся среди текстовых ячеек
+                return None
+            ranges = [(number, number, True, True)
+                      for number in sorted(condition.numbers)]
+        else:
+            bounds = self._bounds(condition)
+            if bounds is None:
+                return None
+            ranges = [bounds]
+        index = self.column_index(name)
+        return _merge_ids([index.range(*bounds) for bounds in ranges])
+
+    def _string_ids(self, condition) -> array:
+        column = self.table.column(condition.column)
+        postings = self.column_index(condition.column)
+        if isinstance(condition, Comparison) and condition.operator == '=' \
+                and condition.number is None:
+            code = column.code(condition.value)
+            return array('q') if code is None else postings[code]
+        codes = [code for code, allowed in enumerate(
+            condition._matches_texts(column.dictionary)) if allowed]
+        return _merge_ids([postings[code] for code in codes]) if codes \
+            else array('q')
+
+    def candidates(self, node):
+        """ Номера строк-кандидатов и признак точности результата.
+
+        (None, False) - индекс не помогает и нужен полный просмотр;
+        (ids, True) - ids точно совпадают с результатом условия;
+        (ids, False) - результат содержится в ids, но строки нужно проверить.
+        """
+
+        if isinstance(node, Or):
+            parts = [self.candidates(operand) for operand in node.operands]
+            if any(ids is None for ids, _ in parts):
+                return None, False
+            union = set()
+            for ids, _ in parts:
+                union.update(ids)
+            return (array('q', sorted(union)),
+                    all(exact for _, exact in parts))
+        if isinstance(node, And):
+            result, exact = None, True
+            for operand in node.operands:
+                ids, operand_exact = self.candidates(operand)
+                if ids is None:
+                    exact = False
+                    continue
+                exact = exact and operand_exact
+                result = ids if result is None else _intersect_ids(result, ids)
+            return result, exact and result is not None
+        if not hasattr(node, 'matches'):
+            return None, False
+        if self.table.column(node.column).kind != 'number':
+            return self._string_ids(node), True
+        ids = self._numeric_ids(node)
+        return (None, False) if ids is None else (ids, True)
+
+    def filter(self, node) -> array:
+        """ Номера строк, удовлетворяющих условию, в порядке файла"""
+
+        ids, exact = self.candidates(node)
+        if ids is None:
+            return filter_table(node, self.table)
+        if exact:
+            return ids
+        predicate = node.compile()
+        return array('q', (index for index in ids
+                           if predicate(self.table.row(index))))
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterable
+
+from .aggregators import parse_aggregate
+from .grouping import parse_group_by
+from .predicates import parse_where
+from .sorting import parse_order_by
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def normalize_query(where: str = None,
+                    aggregate: str = None,
+                    order_by: str = None,
+                    group_by: str = None,
+                    limit: int = None,
+                    offset: int = 0) -> dict:
+    """ Запрос в нормализованном виде.
+
+    Условия приводятся к разобранному виду, поэтому "price>10000"
+    и "price > 10000" дают одинаковый результат.
+    """
+
+    return {
+        "where": str(parse_where(where)) if where else None,
+        "aggregate": parse_aggregate(aggregate) if aggregate else None,
+        "order_by": parse_order_by(order_by) if order_by else None,
+        "group_by": parse_group_by(group_by) if group_by else None,
+        "limit": limit,
+        "offset": offset,
+    }
+
+
+def query_key(file: str,
+              where: str = None,
+              aggregate: str = None,
+              order_by: str = None,
+              group_by: str = None,
+              limit: int = None,
+              offset: int = 0) -> str:
+    """ Ключ результата запроса: отпечаток файла (абсолютный путь, размер
+    и mtime) и нормализованный запрос"""
+
+    stat = os.stat(file)
+    query = normalize_query(where, aggregate, order_by, group_by, limit,
+                            offset)
+    query.update(source=os.path.abspath(file), size=stat.st_size,
+                 mtime_ns=stat.st_mtime_ns)
+    payload = json.dumps(query, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def rows_nbytes(rows: Iterable[dict]) -> int:
+    """ Оценка памяти, занимаемой строками результата (ключи строк
+    общие для всех строк и не учитываются)"""
+
+    return sum(sys.getsizeof(row) + sum(map(sys.getsizeof, row.values()))
+               for row in rows)
+
+
+class ResultCache:
+    """ LRU-кеш результатов запросов в памяти на max_entries записей
+    и не более max_bytes байт (по оценке rows_nbytes). Результат
+    больше max_bytes не сохраняется."""
+
+    def __init__(self, max_entries: int = 128,
+                 max_bytes: int = 64 * 2 ** 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        """ Строки результата или None, если результата нет в кеше"""
+
+        rows = self.entries.get(key)
+        if rows is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        # копии строк, чтобы изменения вызывающего кода не портили кеш
+        return [dict(row) for row in rows]
+
+    def put(self, key: str, rows: list[dict]) -> None:
+        size = rows_nbytes(rows)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.nbytes -= self.sizes[key]
+        self.entries[key] = rows
+        self.entries.move_to_end(key)
+        self.sizes[key] = size
+        self.nbytes += size
+        while (len(self.entries) > self.max_entries
+               or self.nbytes > self.max_bytes):
+            old, _ = self.entries.popitem(last=False)
+            self.nbytes -= self.sizes.pop(old)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(self.entries)}
+
+
+class DiskResultCache:
+    """ Кеш результатов запросов в каталоге, общий для запусков CLI.
+
+    Каждый результат хранится в отдельном файле <ключ>.pickle. При
+    превышении max_bytes удаляются файлы, к которым дольше всего
+    не обращались (время обращения - mtime файла, он обновляется при
+    попадании). Счётчики попаданий и промахов хранятся в stats.json;
+    он обновляется под блокировкой stats.lock (где доступен fcntl)
+    и перезаписывается атомарно, поэтому одновременные запуски
+    не теряют обновлений и не читают файл наполовину записанным.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    @contextmanager
+    def _stats_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, "stats.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _counters(self) -> dict:
+        try:
+            with open(os.path.join(self.directory, "stats.json"),
+                      encoding="utf-8") as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            stats = {}
+        return {"hits": stats.get("hits", 0),
+                "misses": stats.get("misses", 0)}
+
+    def _count(self, counter: str) -> None:
+        path = os.path.join(self.directory, "stats.json")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with self._stats_lock():
+                stats = self._counters()
+                stats[counter] += 1
+                temporary = f"{path}.{os.getpid()}.tmp"
+                with open(temporary, "w", encoding="utf-8") as f:
+                    json.dump(stats, f)
+                os.replace(temporary, path)
+        except OSError:
+            pass
+
+    def _entries(self) -> list[tuple]:
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(".pickle"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, name))
+        return entries
+
+    def get(self, key: str):
+        """ Строки результата или None, если результата нет в кеше"""
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                rows = pickle.load(f)
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            self._count("misses")
+            return None
+        self._count("hits")
+        return rows
+
+    def put(self, key: str, rows: list[dict]) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as f:
+                pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        except OSError:
+            # кеш необязателен: без записи результат всё равно получен
+            return
+        entries = sorted(self._entries())
+        size = sum(entry[1] for entry in entries)
+        # последний записанный результат остаётся, даже если превышает лимит
+        for _, entry_size, name in entries:
+            if size <= self.max_bytes or name == os.path.basename(path):
+                continue
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            size -= entry_size
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        return dict(self._counters(), entries=len(entries),
+                    bytes=sum(entry[1] for entry in entries))
@@ -0,0 +1,109 @@
+import mmap
+import os
+from csv import reader
+from typing import Iterable, Iterator
+
+from .predicates import parse_where
+
+
+def _decode(fields: list, index: int):
+    """ Значение поля по номеру; байты декодируются только здесь"""
+
+    if index >= len(fields):
+        return None
+    value = fields[index]
+    return value if isinstance(value, str) else value.decode("utf-8")
+
+
+def _lines(data: mmap.mmap, position: int) -> Iterator[bytes]:
+    """ Строки данных как байты без перевода строки.
+
+    Если в строке нечётное число кавычек, значение продолжается
+    на следующей строке, и строки объединяются.
+    """
+
+    size = len(data)
+    while position < size:
+        end = data.find(b"\n", position)
+        if end == -1:
+            end = size
+        line = data[position:end]
+        position = end + 1
+        while line.count(b'"') % 2 and position < size:
+            end = data.find(b"\n", position)
+            if end == -1:
+                end = size
+            line += b"\n" + data[position:end]
+            position = end + 1
+        if line.endswith(b"\r"):
+            line = line[:-1]
+        yield line
+
+
+def _scan(data: mmap.mmap, where: str = None,
+          columns: Iterable[str] = None) -> Iterator[dict]:
+    header_end = data.find(b"\n")
+    if header_end == -1:
+        header_end = len(data)
+    fieldnames = next(reader([data[:header_end].decode("utf-8").rstrip("\r")]))
+    index = {name: position for position, name in enumerate(fieldnames)}
+
+    if columns is None:
+        output = fieldnames
+    else:
+        columns = set(columns)
+        output = [name for name in fieldnames if name in columns]
+        missing = columns - set(output)
+        if missing:
+            raise KeyError(missing.pop())
+    output = [(name, index[name]) for name in output]
+    predicate = None
+    if where:
+        node = parse_where(where)
+        for name in node.columns:
+            if name not in index:
+                raise KeyError(name)
+        predicate = node.compile()
+        where_columns = [(name, index[name]) for name in node.columns]
+    needed = [position for _, position in output]
+    if predicate is not None:
+        needed += [position for _, position in where_columns]
+    max_split = max(needed, default=0) + 1
+
+    for line in _lines(data, header_end + 1):
+        if not line:
+            continue
+        if b'"' in line:
+            # поля в кавычках разбираются модулем csv
+            fields = next(reader([line.decode("utf-8")]))
+        else:
+            # границы полей ищутся по байтам, строка целиком не декодируется
+            fields = line.split(b",", max_split)
+        if predicate is not None:
+            values = {name: _decode(fields, position)
+                      for name, position in where_columns}
+            if not predicate(values):
+                continue
+            yield {name: values[name] if name in values
+                   else _decode(fields, position)
+                   for name, position in output}
+        else:
+            yield {name: _decode(fields, position)
+                   for name, position in output}
+
+
+def mmap_rows(file: str, where: str = None,
+              columns: Iterable[str] = None) -> Iterator[dict]:
+    """ Чтение CSV через mmap без декодирования всего файла.
+
+    Границы полей ищутся в байтах отображённого в память файла.
+    Декодируются только колонки условия where и колонки columns
+    (все колонки, если columns не указан). Строки, не прошедшие фильтр,
+    отбрасываются до создания словаря.
+    """
+
+    with open(file, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield from _scan(data, where, columns)
@@ -0,0 +1,201 @@
+import csv
+import json
+import sys
+from itertools import chain, islice
+from typing import Iterable, TextIO
+
+OUTPUT_FORMATS = ('grid', 'csv', 'jsonl')
+
+
+def paginate(rows: Iterable[dict], offset: int = 0,
+             limit: int = None) -> Iterable[dict]:
+    """ Страница результата: limit строк, начиная с offset"""
+
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ValueError("Смещение и ограничение числа строк не могут быть "
+                         "отрицательными.")
+    if not offset and limit is None:
+        return rows
+    return islice(rows, offset, None if limit is None else offset + limit)
+
+
+# типы значений колонки от менее общего к более общему: колонка получает
+# самый общий тип своих значений, как в tabulate
+_TYPES = (type(None), bool, int, float, str)
+# запас ширины колонки сверх заголовка, как MIN_PADDING в tabulate
+_HEADER_PADDING = 2
+
+
+def _value_type(value) -> type:
+    if value is None or (isinstance(value, str) and not value):
+        return type(None)
+    if isinstance(value, bool) or value in ('True', 'False'):
+        return bool
+    if isinstance(value, int) or (isinstance(value, str)
+                                  and _convertible(int, value)):
+        return int
+    if isinstance(value, float):
+        return float
+    if isinstance(value, str) and _convertible(float, value):
+        # бесконечность и NaN числа только в коротком написании
+        number = float(value)
+        if number == number and abs(number) != float('inf') \
+                or value.lower() in ('inf', '-inf', 'nan'):
+            return float
+    return str
+
+
+def _convertible(kind: type, value: str) -> bool:
+    try:
+        kind(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _column_type(values: Iterable) -> type:
+    return _TYPES[max((_TYPES.index(_value_type(value))
+                       for value in values), default=0)]
+
+
+def _cell(value, kind: type) -> str:
+    if value is None:
+        return ''
+    if kind is float and value != '':
+        try:
+            return format(float(value), 'g')
+        except (TypeError, ValueError):
+            pass
+    return str(value)
+
+
+def _decimals(cell: str) -> int:
+    """ Число знаков после десятичной точки (или после e у экспоненты);
+    -1 для целых чисел и не чисел"""
+
+    if _value_type(cell) is not float:
+        return -1
+    position = cell.rfind('.')
+    if position < 0:
+        position = cell.lower().rfind('e')
+    return len(cell) - position - 1 if position >= 0 else -1
+
+
+class GridWriter:
+    """ Построчный вывод таблицы в формате grid, как у tabulate.
+
+    Типы, ширина и выравнивание колонок определяются по первым sample_size
+    строкам, после чего строки выводятся по мере поступления и в памяти
+    не накапливаются. Числа выравниваются по десятичной точке, дробные
+    колонки выводятся в формате 'g'. Значение длиннее ширины колонки
+    расширяет только свою строку таблицы.
+    """
+
+    def __init__(self, stream: TextIO, sample_size: int = 100):
+        self.stream = stream
+        self.sample_size = sample_size
+
+    def _cells(self, row: dict) -> list[str]:
+        cells = []
+        for header, kind, decimals in zip(self.headers, self.types,
+                                          self.decimals):
+            cell = _cell(row.get(header), kind)
+            if decimals is not None:
+                cell += ' ' * (decimals - _decimals(cell))
+            elif kind is not int:
+                cell = cell.strip()
+            cells.append(cell)
+        return cells
+
+    def _line(self, cells: list[str]) -> str:
+        parts = []
+        for cell, width, numeric in zip(cells, self.widths, self.numeric):
+            parts.append(cell.rjust(width) if numeric else cell.ljust(width))
+        return '| ' + ' | '.join(parts) + ' |\n'
+
+    def _border(self, char: str) -> str:
+        return '+' + '+'.join(char * (width + 2)
+                              for width in self.widths) + '+\n'
+
+    def write(self, rows: Iterable[dict]) -> int:
+        rows = iter(rows)
+        sample = list(islice(rows, self.sample_size))
+        if not sample:
+            return 0
+        self.headers = headers = list(sample[0])
+        self.types = [_column_type(row.get(header) for row in sample)
+                      for header in headers]
+        self.numeric = [kind in (int, float) for kind in self.types]
+        # знаков после точки у чисел выборки: остальные дополняются
+        # пробелами справа, чтобы точки стояли друг под другом
+        self.decimals = [
+            max(_decimals(_cell(row.get(header), kind)) for row in sample)
+            if kind is float else None
+            for header, kind in zip(headers, self.types)]
+        cells = [self._cells(row) for row in sample]
+        self.widths = [max([len(header) + _HEADER_PADDING]
+                           + [len(line[column]) for line in cells])
+                       for column, header in enumerate(headers)]
+        separator = self._border('-')
+        write = self.stream.write
+        write(separator)
+        write(self._line(headers))
+        write(self._border('='))
+        count = 0
+        for line in chain(cells, map(self._cells, rows)):
+            write(self._line(line))
+            write(separator)
+            count += 1
+        return count
+
+
+class CsvWriter:
+    """ Построчный вывод в CSV"""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def write(self, rows: Iterable[dict]) -> int:
+        writer = None
+        count = 0
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(self.stream, fieldnames=list(row),
+                                        lineterminator='\n')
+                writer.writeheader()
+            writer.writerow(row)
+            count += 1
+        return count
+
+
+class JsonLinesWriter:
+    """ Построчный вывод в JSON Lines: один объект на строку"""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def write(self, rows: Iterable[dict]) -> int:
+        count = 0
+        for row in rows:
+            self.stream.write(json.dumps(row, ensure_ascii=False))
+            self.stream.write('\n')
+            count += 1
+        return count
+
+
+def write_rows(rows: Iterable[dict], output_format: str = 'grid',
+               stream: TextIO = None, sample_size: int = 100) -> int:
+    """ Вывод строк в выбранном формате по мере их поступления.
+
+    Возвращает число выведенных строк.
+    """
+
+    stream = stream or sys.stdout
+    if output_format == 'grid':
+        return GridWriter(stream, sample_size).write(rows)
+    if output_format == 'csv':
+        return CsvWriter(stream).write(rows)
+    if output_format == 'jsonl':
+        return JsonLinesWriter(stream).write(rows)
+    raise ValueError("Недопустимый формат вывода. Допустимые значения: "
+                     f"{', '.join(OUTPUT_FORMATS)}.")
@@ -0,0 +1,196 @@
+import heapq
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from csv import DictReader, reader
+from itertools import islice
+from tempfile import TemporaryDirectory
+from typing import Iterator
+
+from .aggregators import AggregateSet, parse_aggregate
+from .grouping import HashAggregator, parse_group_by
+from .predicates import compile_where
+from .sorting import make_sort_key, parse_order_by, sort_rows
+
+# частей файла на одного обработчика: небольшие части выравнивают
+# нагрузку, если строки распределены по файлу неравномерно
+CHUNKS_PER_JOB = 4
+
+
+def read_header(file: str) -> tuple[list[str], int]:
+    """ Названия колонок и смещение первого байта после заголовка"""
+
+    with open(file, "rb") as f:
+        line = f.readline()
+        fieldnames = next(reader([line.decode("utf-8")]), [])
+        return fieldnames, f.tell()
+
+
+def split_ranges(file: str, chunks: int) -> list[tuple[int, int]]:
+    """ Разбиение данных файла на диапазоны байтов по границам строк.
+
+    Граница диапазона сдвигается на начало следующей строки, поэтому каждая
+    строка попадает ровно в один диапазон. Для файлов, где значение
+    в кавычках может содержать перевод строки, граница может попасть
+    внутрь значения: такие файлы отсеивает can_split.
+    """
+
+    _, start = read_header(file)
+    size = os.path.getsize(file)
+    if size <= start:
+        return []
+    step = max((size - start) // chunks, 1)
+    boundaries = [start]
+    with open(file, "rb") as f:
+        for boundary in range(start + step, size, step):
+            if boundary <= boundaries[-1]:
+                continue
+            f.seek(boundary - 1)
+            f.readline()
+            if f.tell() >= size:
+                break
+            if f.tell() > boundaries[-1]:
+                boundaries.append(f.tell())
+    boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def can_split(file: str) -> bool:
+    """ Можно ли делить данные файла на диапазоны по переводам строк.
+
+    Перевод строки может оказаться внутри значения только в кавычках,
+    поэтому файл без кавычек после заголовка делится безопасно. Поиск
+    по отображению файла в память идёт со скоростью memchr и заодно
+    загружает файл в кеш страниц для обработчиков.
+    """
+
+    _, start = read_header(file)
+    if os.path.getsize(file) <= start:
+        return True
+    with open(file, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return data.find(b'"', start) == -1
+
+
+def _read_lines(file: str, start: int, end: int) -> Iterator[str]:
+    with open(file, "rb") as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            line = f.readline()
+            if not line:
+                return
+            position += len(line)
+            yield line.decode("utf-8")
+
+
+def scan_range(file: str,
+               fieldnames: list[str],
+               start: int,
+               end: int,
+               where: str = None,
+               aggregate: str = None,
+               order_by: str = None,
+               group_by: str = None,
+               limit: int = None,
+               max_groups: int = 100_000,
+               spill_dir: str = None):
+    """ Обработка одного диапазона файла в отдельном процессе.
+
+    Возвращает частичный результат: состояние агрегатов, состояния групп,
+    отсортированную порцию строк или отфильтрованные строки. Для группировки
+    это пара из каталога, куда сброшены группы сверх max_groups (None,
+    если сброса не было), и списка групп, оставшихся в памяти.
+    """
+
+    rows = DictReader(_read_lines(file, start, end), fieldnames=fieldnames)
+    if where:
+        rows = filter(compile_where(where), rows)
+    if group_by:
+        grouping = HashAggregator(parse_group_by(group_by),
+                                  parse_aggregate(aggregate),
+                                  max_groups=max_groups, spill_dir=spill_dir)
+        grouping.add_rows(rows)
+        return (spill_dir if grouping.spills else None,
+                list(grouping.groups.items()))
+    if aggregate:
+        return AggregateSet.from_string(aggregate).add_rows(rows)
+    if order_by:
+        return list(sort_rows(rows, order_by, limit=limit))
+    return list(islice(rows, limit))
+
+
+def parallel_query(file: str,
+                   jobs: int,
+                   where: str = None,
+                   aggregate: str = None,
+                   order_by: str = None,
+                   group_by: str = None,
+                   max_groups: int = 100_000,
+                   limit: int = None) -> list[dict]:
+    """ Выполнение запроса несколькими процессами.
+
+    Файл делится на диапазоны байтов, каждый диапазон разбирается,
+    фильтруется и частично агрегируется в ProcessPoolExecutor, затем
+    частичные результаты объединяются: строки склеиваются в порядке файла,
+    состояния агрегатов и групп сливаются, отсортированные порции
+    объединяются слиянием. При группировке каждый процесс держит в памяти
+    не более max_groups групп и сбрасывает остальные на диск, а сброшенные
+    группы сливаются в итог по одной порции.
+    """
+
+    if jobs < 1:
+        raise ValueError("Число процессов должно быть положительным.")
+    # условия проверяются до запуска процессов
+    if where:
+        compile_where(where)
+    specs = parse_aggregate(aggregate) if aggregate else None
+    if order_by:
+        key, reverse = make_sort_key(parse_order_by(order_by))
+    fieldnames, _ = read_header(file)
+    ranges = split_ranges(file, jobs * CHUNKS_PER_JOB)
+    with TemporaryDirectory(prefix="workmate-ranges-") as spill_root:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(scan_range, file, fieldnames, start,
+                                       end, where, aggregate,
+                                       None if aggregate else order_by,
+                                       group_by, limit, max_groups,
+                                       os.path.join(spill_root, str(number)))
+                       for number, (start, end) in enumerate(ranges)]
+            if group_by:
+                # состояния групп сливаются по мере готовности частей
+                # и сразу освобождаются, чтобы в памяти не копились
+                # группы всех частей
+                grouping = HashAggregator(parse_group_by(group_by), specs,
+                                          max_groups=max_groups)
+                while futures:
+                    spilled, states = futures.pop(0).result()
+                    for group_key, state in states:
+                        grouping.merge_state(group_key, state)
+                    if spilled is not None:
+                        grouping.merge_spilled(spilled)
+            else:
+                partials = [future.result() for future in futures]
+
+    if group_by:
+        rows = grouping.results()
+        if order_by:
+            rows = sort_rows(rows, order_by, limit=limit)
+        result = list(islice(rows, limit))
+    elif aggregate:
+        total = AggregateSet(specs)
+        for partial in partials:
+            total.merge(partial)
+        if where and not total.rows:
+            raise ValueError(
+                "Не найдено записей, соответствующих условиям фильтрации.")
+        return [total.result()]
+    elif order_by:
+        result = list(islice(heapq.merge(*partials, key=key, reverse=reverse),
+                             limit))
+    else:
+        result = [row for partial in partials for row in partial][:limit]
+    if where and not result and limit != 0:
+        raise ValueError(
+            "Не найдено записей, соответствующих условиям фильтрации.")
+    return result
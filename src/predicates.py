@@ -0,0 +1,454 @@
+import operator
+import re
+from abc import ABC, abstractmethod
+from array import array
+from itertools import compress
+from typing import Callable, Iterable
+
+# операторы сравнения: функция и признак того, что нужны числа
+_COMPARISONS = {
+    '=': (operator.eq, False),
+    '!=': (operator.ne, False),
+    '>': (operator.gt, True),
+    '>=': (operator.ge, True),
+    '<': (operator.lt, True),
+    '<=': (operator.le, True),
+}
+_KEYWORDS = {'AND', 'OR', 'NOT', 'IN', 'BETWEEN'}
+
+
+def _token_pattern(separators: str):
+    return re.compile(r"""
+    \s*(?:
+        (?P<op>!=|>=|<=|=|>|<)
+      | (?P<punct>[()%s])
+      | '(?P<squote>(?:[^']|'')*)'
+      | "(?P<dquote>(?:[^"]|"")*)"
+      | (?P<word>(?:[^\s()<>=!%s'"]|!(?!=))+)
+    )""" % (separators, separators), re.VERBOSE)
+
+
+# вне списка IN запятая - часть значения: "tag=a,b"
+_TOKEN = _token_pattern('')
+# внутри списка IN запятая разделяет значения
+_LIST_TOKEN = _token_pattern(',')
+# простое условие без пробелов, кавычек и скобок разбирается как раньше:
+# колонка до первого оператора, значение - весь остаток
+_BARE = re.compile(r"([^\s()'\"!<>=]+)(!=|>=|<=|=|>|<)([^\s()'\"]+)")
+# ключевое слово отделяется пробелами, скобками или границей строки,
+# иначе это часть значения: "state=OR"
+_DELIMITERS = frozenset(' \t\r\n()')
+
+
+def _number(text: str):
+    # в неполной строке DictReader подставляет None вместо значения
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _quote(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _and_masks(masks: list, size: int) -> bytearray:
+    result = int.from_bytes(masks[0], 'little')
+    for mask in masks[1:]:
+        result &= int.from_bytes(mask, 'little')
+    return bytearray(result.to_bytes(size, 'little'))
+
+
+def _or_masks(masks: list, size: int) -> bytearray:
+    result = 0
+    for mask in masks:
+        result |= int.from_bytes(mask, 'little')
+    return bytearray(result.to_bytes(size, 'little'))
+
+
+class Condition(ABC):
+    """ Условие над одной колонкой.
+
+    matches() проверяет текст ячейки, matches_number() - значение числовой
+    колонки. В колоночном режиме строковая колонка проверяется один раз
+    на каждое значение словаря, а не на каждую строку.
+    """
+
+    column = None
+
+    @property
+    def columns(self) -> set:
+        return {self.column}
+
+    @abstractmethod
+    def matches(self, text: str) -> bool:
+        """ Проверка текста ячейки"""
+
+    @abstractmethod
+    def matches_number(self, value: float) -> bool:
+        """ Проверка значения числовой колонки"""
+
+    def compile(self) -> Callable[[dict], bool]:
+        column, matches = self.column, self.matches
+        return lambda row: matches(row[column])
+
+    def _matches_texts(self, texts: Iterable[str],
+                       strict: bool = True) -> list[bool]:
+        """ Проверка текстовых значений колонки целиком.
+
+        В колоночном режиме проверяются все значения, а не только строки,
+        прошедшие остальные условия, поэтому отдельный нечисловой текст
+        в сравнении с числом просто не подходит. С strict=True ошибка
+        возникает, если ни одно значение не удалось сравнить.
+        """
+
+        results = []
+        error = None
+        for text in texts:
+            try:
+                results.append(self.matches(text))
+            except ValueError as e:
+                error = e
+                results.append(None)
+        if strict and error is not None and all(
+                result is None for result in results):
+            raise error
+        return [bool(result) for result in results]
+
+    def mask(self, table) -> bytearray:
+        data = table.column(self.column)
+        if data.kind == 'number':
+            mask = bytearray(map(self.matches_number, data.values))
+            # ячейки, хранящиеся текстом, проверяются как в потоковом режиме
+            texts = data.texts
+            for index, allowed in zip(texts, self._matches_texts(
+                    texts.values(), strict=False)):
+                mask[index] = allowed
+            return mask
+        allowed = self._matches_texts(data.dictionary)
+        return bytearray(map(allowed.__getitem__, data.codes))
+
+
+class Comparison(Condition):
+    """ Сравнение колонки со значением: =, !=, >, >=, <, <="""
+
+    def __init__(self, column: str, operator: str, value: str):
+        compare, numeric = _COMPARISONS[operator]
+        self.column = column
+        self.operator = operator
+        self.value = value
+        self.number = _number(value)
+        if numeric and self.number is None:
+            raise ValueError(
+                f"Фильтрация по условию {operator} требует числовых значений.")
+        self._compare = compare
+
+    def __str__(self) -> str:
+        return f"{self.column}{self.operator}{_quote(self.value)}"
+
+    def matches(self, text: str) -> bool:
+        if self.operator in ('=', '!='):
+            # равенство текста, а для чисел - равенство значений
+            equal = text == self.value or (
+                    self.number is not None and _number(text) == self.number)
+            return equal if self.operator == '=' else not equal
+        return self._compare(float(text), self.number)
+
+    def matches_number(self, value: float) -> bool:
+        if self.number is None:
+            return self.operator == '!='
+        return self._compare(value, self.number)
+
+    def compile(self) -> Callable[[dict], bool]:
+        column, value, number = self.column, self.value, self.number
+        if self.operator == '=' and number is None:
+            return lambda row: row[column] == value
+        if self.operator == '!=' and number is None:
+            return lambda row: row[column] != value
+        if self.operator in ('=', '!='):
+            return super().compile()
+        compare = self._compare
+        return lambda row: compare(float(row[column]), number)
+
+
+class InList(Condition):
+    """ Принадлежность списку значений: column IN (a, b, c)"""
+
+    def __init__(self, column: str, values: Iterable[str],
+                 negated: bool = False):
+        self.column = column
+        self.values = tuple(values)
+        self.negated = negated
+        self._texts = frozenset(self.values)
+        self.numbers = frozenset(number for number in map(_number, self.values)
+                                 if number is not None)
+
+    def __str__(self) -> str:
+        values = ', '.join(map(_quote, self.values))
+        keyword = 'NOT IN' if self.negated else 'IN'
+        return f"{self.column} {keyword} ({values})"
+
+    def matches(self, text: str) -> bool:
+        found = text in self._texts or (
+                bool(self.numbers) and _number(text) in self.numbers)
+        return found != self.negated
+
+    def matches_number(self, value: float) -> bool:
+        return (value in self.numbers) != self.negated
+
+
+class Between(Condition):
+    """ Диапазон включительно: column BETWEEN low AND high"""
+
+    def __init__(self, column: str, low: str, high: str):
+        self.column = column
+        self.low = _number(low)
+        self.high = _number(high)
+        if self.low is None or self.high is None:
+            raise ValueError(
+                "Фильтрация по условию BETWEEN требует числовых значений.")
+
+    def __str__(self) -> str:
+        return f"{self.column} BETWEEN {self.low!r} AND {self.high!r}"
+
+    def matches(self, text: str) -> bool:
+        return self.low <= float(text) <= self.high
+
+    def matches_number(self, value: float) -> bool:
+        return self.low <= value <= self.high
+
+
+class And:
+    def __init__(self, operands: list):
+        self.operands = operands
+
+    def __str__(self) -> str:
+        return '(' + ' AND '.join(map(str, self.operands)) + ')'
+
+    @property
+    def columns(self) -> set:
+        return set().union(*(operand.columns for operand in self.operands))
+
+    def compile(self) -> Callable[[dict], bool]:
+        predicates = [operand.compile() for operand in self.operands]
+        if len(predicates) == 2:
+            first, second = predicates
+            return lambda row: first(row) and second(row)
+        return lambda row: all(predicate(row) for predicate in predicates)
+
+    def mask(self, table) -> bytearray:
+        return _and_masks([operand.mask(table) for operand in self.operands],
+                          len(table))
+
+
+class Or(And):
+    def __str__(self) -> str:
+        return '(' + ' OR '.join(map(str, self.operands)) + ')'
+
+    def compile(self) -> Callable[[dict], bool]:
+        predicates = [operand.compile() for operand in self.operands]
+        if len(predicates) == 2:
+            first, second = predicates
+            return lambda row: first(row) or second(row)
+        return lambda row: any(predicate(row) for predicate in predicates)
+
+    def mask(self, table) -> bytearray:
+        return _or_masks([operand.mask(table) for operand in self.operands],
+                         len(table))
+
+
+class Not:
+    def __init__(self, operand):
+        self.operand = operand
+
+    def __str__(self) -> str:
+        return f"NOT {self.operand}"
+
+    @property
+    def columns(self) -> set:
+        return self.operand.columns
+
+    def compile(self) -> Callable[[dict], bool]:
+        predicate = self.operand.compile()
+        return lambda row: not predicate(row)
+
+    def mask(self, table) -> bytearray:
+        size = len(table)
+        ones = int.from_bytes(b'\x01' * size, 'little')
+        value = int.from_bytes(self.operand.mask(table), 'little') ^ ones
+        return bytearray(value.to_bytes(size, 'little'))
+
+
+class _Parser:
+    """ Разбор выражения фильтрации рекурсивным спуском.
+
+    expr      := and ('OR' and)*
+    and       := not ('AND' not)*
+    not       := 'NOT' not | '(' expr ')' | condition
+    condition := name op value
+               | name ['NOT'] 'IN' '(' value (',' value)* ')'
+               | name 'BETWEEN' value 'AND' value
+
+    Имена и значения без кавычек могут содержать пробелы
+    ("name=iphone 15 pro"), запятые вне списка IN и '!' ("name=Yahoo!").
+    Слова AND, OR, NOT, IN и BETWEEN - ключевые, только если они отделены
+    пробелами или скобками. Значения со скобками, операторами,
+    отдельными ключевыми словами или запятыми в списке IN записываются
+    в кавычках.
+    """
+
+    def __init__(self, where: str):
+        self.where = where
+        self.tokens = self._tokenize(where)
+        self.position = 0
+
+    @staticmethod
+    def _delimited(where: str, start: int, end: int) -> bool:
+        return ((start == 0 or where[start - 1] in _DELIMITERS)
+                and (end == len(where) or where[end] in _DELIMITERS))
+
+    @classmethod
+    def _tokenize(cls, where: str) -> list[tuple]:
+        tokens = []
+        position = 0
+        where = where.rstrip()
+        in_list = False
+        while position < len(where):
+            match = (_LIST_TOKEN if in_list else _TOKEN).match(where,
+                                                               position)
+            if not match or match.end() == position:
+                raise ValueError(
+                    f"Недопустимый символ в фильтрации: "
+                    f"'{where[position:].strip()[:1]}'.")
+            kind = match.lastgroup
+            text = match.group(kind)
+            start, end = match.span(kind)
+            if kind in ('squote', 'dquote'):
+                quote = "'" if kind == 'squote' else '"'
+                text = text.replace(quote * 2, quote)
+                kind = 'string'
+            elif kind == 'word' and text.upper() in _KEYWORDS \
+                    and cls._delimited(where, start, end):
+                kind = 'keyword'
+                text = text.upper()
+            elif kind == 'punct':
+                if text == '(' and tokens and tokens[-1][:2] == (
+                        'keyword', 'IN'):
+                    in_list = True
+                elif text == ')':
+                    in_list = False
+            tokens.append((kind, text, start, end))
+            position = match.end()
+        return tokens
+
+    def _peek(self, kind: str = None, text: str = None) -> bool:
+        if self.position >= len(self.tokens):
+            return False
+        token_kind, token_text = self.tokens[self.position][:2]
+        return ((kind is None or token_kind == kind)
+                and (text is None or token_text == text))
+
+    def _accept(self, kind: str, text: str = None) -> bool:
+        if self._peek(kind, text):
+            self.position += 1
+            return True
+        return False
+
+    def _expect(self, kind: str, text: str) -> None:
+        if not self._accept(kind, text):
+            raise ValueError(f"Ожидается '{text}' в условии фильтрации.")
+
+    def _phrase(self) -> str:
+        """ Имя колонки или значение: строка в кавычках или слова подряд"""
+
+        if self._peek('string'):
+            self.position += 1
+            return self.tokens[self.position - 1][1]
+        start = self.position
+        while self._peek('word'):
+            self.position += 1
+        if start == self.position:
+            raise ValueError(
+                "Ожидается колонка или значение в условии фильтрации.")
+        return self.where[self.tokens[start][2]:self.tokens[self.position - 1][3]]
+
+    def parse(self):
+        bare = _BARE.fullmatch(self.where.strip())
+        if bare:
+            return Comparison(*bare.groups())
+        if not self.tokens:
+            raise ValueError("Пустое условие фильтрации.")
+        node = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(
+                f"Неожиданный фрагмент в условии фильтрации: "
+                f"'{self.where[self.tokens[self.position][2]:]}'.")
+        return node
+
+    def _or(self):
+        operands = [self._and()]
+        while self._accept('keyword', 'OR'):
+            operands.append(self._and())
+        return operands[0] if len(operands) == 1 else Or(operands)
+
+    def _and(self):
+        operands = [self._not()]
+        while self._accept('keyword', 'AND'):
+            operands.append(self._not())
+        return operands[0] if len(operands) == 1 else And(operands)
+
+    def _not(self):
+        if self._accept('keyword', 'NOT'):
+            return Not(self._not())
+        if self._accept('punct', '('):
+            node = self._or()
+            self._expect('punct', ')')
+            return node
+        return self._condition()
+
+    def _condition(self):
+        column = self._phrase()
+        if self._peek('op'):
+            operator_ = self.tokens[self.position][1]
+            self.position += 1
+            return Comparison(column, operator_, self._phrase())
+        negated = self._accept('keyword', 'NOT')
+        if self._accept('keyword', 'IN'):
+            self._expect('punct', '(')
+            values = [self._phrase()]
+            while self._accept('punct', ','):
+                values.append(self._phrase())
+            self._expect('punct', ')')
+            return InList(column, values, negated)
+        if not negated and self._accept('keyword', 'BETWEEN'):
+            low = self._phrase()
+            self._expect('keyword', 'AND')
+            return Between(column, low, self._phrase())
+        raise ValueError(
+            "Недопустимый оператор в фильтрации. Допустимые операторы: "
+            "'=', '!=', '<', '<=', '>', '>=', IN, BETWEEN.")
+
+
+def parse_where(where: str):
+    """ Разбор условия фильтрации в дерево условий"""
+
+    return _Parser(where).parse()
+
+
+def compile_where(where: str) -> Callable[[dict], bool]:
+    """ Функция проверки строки-словаря по условию фильтрации"""
+
+    return parse_where(where).compile()
+
+
+def filter_table(node, table, indices: Iterable[int] = None) -> array:
+    """ Номера строк колоночной таблицы, удовлетворяющих условию.
+
+    Условие вычисляется маской по колонкам целиком; если передан indices,
+    результат ограничивается этими строками.
+    """
+
+    mask = node.mask(table)
+    if indices is None:
+        return array('q', compress(range(len(table)), mask))
+    return array('q', (index for index in indices if mask[index]))
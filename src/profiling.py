@@ -0,0 +1,261 @@
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterable, Iterator
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PROFILE_FORMATS = ('table', 'json')
+
+
+def peak_rss():
+    """ Пиковый RSS процесса в байтах или None, если он недоступен"""
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # в macOS ru_maxrss в байтах, в Linux - в килобайтах
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Stage:
+    """ Счётчики одного этапа выполнения запроса.
+
+    seconds - всё время внутри этапа, включая вложенные этапы, из которых
+    он читает строки; self_seconds - только время собственного кода.
+    """
+
+    __slots__ = ('name', 'source', 'chained', 'seconds', 'self_seconds',
+                 'rows_out', 'bytes_read', 'peak_memory', '_entered',
+                 '_resumed')
+
+    def __init__(self, name: str, source: 'Stage' = None,
+                 chained: bool = True):
+        self.name = name
+        self.source = source
+        # следующий этап читает строки этого этапа
+        self.chained = chained
+        self.seconds = 0.0
+        self.self_seconds = 0.0
+        self.rows_out = 0
+        self.bytes_read = None
+        self.peak_memory = None
+
+    @property
+    def rows_in(self):
+        return None if self.source is None else self.source.rows_out
+
+    def as_dict(self) -> dict:
+        return {"stage": self.name, "seconds": self.self_seconds,
+                "total_seconds": self.seconds, "rows_in": self.rows_in,
+                "rows_out": self.rows_out, "bytes_read": self.bytes_read,
+                "peak_memory": self.peak_memory}
+
+
+class Profiler:
+    """ Замеры этапов запроса: время, строки на входе и выходе,
+    прочитанные байты и пиковая память.
+
+    Этапы соединены в цепочку: каждый читает строки из предыдущего.
+    Время вложенного этапа не входит в собственное время внешнего.
+    Пиковая память - пиковый RSS процесса к концу этапа. С trace_memory=True
+    это максимум памяти, выделенной Python (tracemalloc), пока выполнялся
+    код этапа: точнее по этапам, но tracemalloc замедляет выполнение
+    в разы. Без профилировщика запрос выполняется без обёрток
+    и дополнительных затрат.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages = []
+        # этапы, код которых выполняется сейчас, от внешнего к вложенному
+        self._active = []
+        self._tracing = False
+        self._started_tracing = False
+
+    def reset(self) -> None:
+        """ Начало замеров нового запроса"""
+
+        self.stages = []
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._tracing = self.trace_memory
+
+    def stop(self) -> None:
+        """ Остановка отслеживания памяти, начатого профилировщиком"""
+
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._tracing = False
+
+    def _source(self):
+        if self.stages and self.stages[-1].chained:
+            return self.stages[-1]
+        return None
+
+    def _stage(self, name: str) -> Stage:
+        stage = Stage(name, self._source())
+        self.stages.append(stage)
+        return stage
+
+    @staticmethod
+    def _finish(stage: Stage) -> None:
+        """ Без tracemalloc пик памяти этапа - пиковый RSS процесса
+        к концу этапа"""
+
+        if stage.peak_memory is None:
+            stage.peak_memory = peak_rss()
+
+    def _memory(self, stage: Stage) -> None:
+        if not self._tracing:
+            return
+        # пик с момента последнего сброса относится к этапу, код которого
+        # выполнялся до этого момента
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        if stage.peak_memory is None or peak > stage.peak_memory:
+            stage.peak_memory = peak
+
+    def _enter(self, stage: Stage) -> None:
+        now = time.perf_counter()
+        if self._active:
+            # время внешнего этапа приостанавливается на время вложенного
+            outer = self._active[-1]
+            outer.self_seconds += now - outer._resumed
+            self._memory(outer)
+        stage._entered = stage._resumed = now
+        self._active.append(stage)
+
+    def _exit(self, stage: Stage) -> None:
+        now = time.perf_counter()
+        stage.self_seconds += now - stage._resumed
+        stage.seconds += now - stage._entered
+        self._memory(stage)
+        self._active.pop()
+        if self._active:
+            self._active[-1]._resumed = now
+
+    def track(self, name: str, produce: Callable[[], Iterable],
+              bytes_read: Callable[[], int] = None) -> Iterator:
+        """ Строки этапа с замерами.
+
+        produce вызывается при запросе первой строки, поэтому работа,
+        которую он выполняет сразу (агрегация, сортировка), тоже
+        учитывается в этапе. bytes_read - функция, возвращающая число
+        прочитанных байтов к концу этапа.
+        """
+
+        stage = self._stage(name)
+        return self._rows(stage, produce, bytes_read)
+
+    def _rows(self, stage: Stage, produce: Callable[[], Iterable],
+              bytes_read: Callable[[], int] = None) -> Iterator:
+        try:
+            self._enter(stage)
+            try:
+                rows = iter(produce())
+            finally:
+                self._exit(stage)
+            while True:
+                self._enter(stage)
+                try:
+                    row = next(rows)
+                except StopIteration:
+                    return
+                finally:
+                    self._exit(stage)
+                stage.rows_out += 1
+                yield row
+        finally:
+            self._finish(stage)
+            if bytes_read is not None:
+                try:
+                    stage.bytes_read = bytes_read()
+                except (OSError, ValueError):
+                    pass
+
+    @contextmanager
+    def measure(self, name: str, consumes: bool = True,
+                bytes_read: Callable[[], int] = None) -> Iterator[Stage]:
+        """ Замер этапа, который выполняется не построчно.
+
+        С consumes=True этап потребляет строки последнего этапа, например
+        вывод результата; иначе это подготовка, например загрузка таблицы,
+        и следующий этап не считается его потребителем.
+        """
+
+        stage = Stage(name, chained=consumes)
+        self._enter(stage)
+        try:
+            yield stage
+        finally:
+            self._exit(stage)
+            self._finish(stage)
+            if consumes:
+                # этапы запроса создаются лениво, уже внутри замера,
+                # поэтому источник известен только в конце
+                stage.source = self._source()
+                if stage.source is not None:
+                    stage.rows_out = stage.source.rows_out
+            if bytes_read is not None:
+                stage.bytes_read = bytes_read()
+            self.stages.append(stage)
+
+    def report(self) -> list[dict]:
+        return [stage.as_dict() for stage in self.stages]
+
+    def format(self, profile_format: str = 'table') -> str:
+        """ Отчёт таблицей или в JSON"""
+
+        if profile_format == 'json':
+            return json.dumps(self.report(), ensure_ascii=False)
+        if profile_format != 'table':
+            raise ValueError("Недопустимый формат отчёта. Допустимые "
+                             f"значения: {', '.join(PROFILE_FORMATS)}.")
+        headers = ("этап", "время, с", "всего, с", "строк на входе",
+                   "строк на выходе", "прочитано байт", "пик памяти")
+        lines = [[stage.name, f"{stage.self_seconds:.4f}",
+                  f"{stage.seconds:.4f}",
+                  "" if stage.rows_in is None else str(stage.rows_in),
+                  str(stage.rows_out),
+                  "" if stage.bytes_read is None else str(stage.bytes_read),
+                  "" if stage.peak_memory is None
+                  else f"{stage.peak_memory / 2 ** 20:.2f} МБ"]
+                 for stage in self.stages]
+        widths = [max([len(header)] + [len(line[column]) for line in lines])
+                  for column, header in enumerate(headers)]
+
+        def join(cells) -> str:
+            # название этапа выравнивается влево, числа - вправо
+            return "  ".join(cell.ljust(width) if column == 0
+                             else cell.rjust(width)
+                             for column, (cell, width)
+                             in enumerate(zip(cells, widths)))
+
+        text = [join(headers)] + [join(line) for line in lines]
+        return "\n".join(text)
+
+
+def measure(profiler: Profiler, name: str, consumes: bool = True,
+            bytes_read: Callable[[], int] = None):
+    """ Замер этапа или, без профилировщика, пустой контекст"""
+
+    if profiler is None:
+        return nullcontext()
+    return profiler.measure(name, consumes, bytes_read)
+
+
+def track(profiler: Profiler, name: str, produce: Callable[[], Iterable],
+          bytes_read: Callable[[], int] = None) -> Iterable:
+    """ Этап с замерами или, без профилировщика, просто его строки"""
+
+    if profiler is None:
+        return produce()
+    return profiler.track(name, produce, bytes_read)
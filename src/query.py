@@ -0,0 +1,190 @@
+import gzip
+import io
+import os
+from collections.abc import Sequence
+from contextlib import contextmanager
+from csv import DictReader
+from itertools import chain
+from types import MappingProxyType
+from typing import Iterable, Iterator
+
+from .aggregators import parse_aggregate
+from .csv_processing import FileValuesProcessor
+from .grouping import parse_group_by
+from .output import paginate
+from .predicates import parse_where
+from .sorting import parse_order_by
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _head(binary) -> bytes:
+    """ Первые байты потока без их потребления"""
+
+    if hasattr(binary, "peek"):
+        return binary.peek(4)[:4]
+    if binary.seekable():
+        position = binary.tell()
+        head = binary.read(4)
+        binary.seek(position)
+        return head
+    return b""
+
+
+def _decompressed(binary):
+    """ Поток несжатых байтов: сжатие gzip и zstd определяется по сигнатуре"""
+
+    head = _head(binary)
+    if head.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=binary, mode="rb")
+    if head.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError(
+                "Для чтения файлов zstd требуется пакет zstandard.")
+        return zstandard.ZstdDecompressor().stream_reader(binary,
+                                                          closefd=False)
+    return binary
+
+
+@contextmanager
+def _text(binary) -> Iterator[io.TextIOWrapper]:
+    text = io.TextIOWrapper(_decompressed(binary), encoding="utf-8",
+                            newline="")
+    try:
+        yield text
+    finally:
+        # поток вызывающего кода не закрывается вместе с обёрткой
+        text.detach()
+
+
+@contextmanager
+def open_rows(source) -> Iterator[Iterator[dict]]:
+    """ Строки-словари источника данных.
+
+    Источник - путь к CSV-файлу, файловый объект (текстовый или двоичный),
+    итерируемый объект строк CSV или итерируемый объект словарей.
+    Файлы и двоичные потоки, сжатые gzip или zstd, распаковываются
+    на лету.
+    """
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f, _text(f) as text:
+            yield DictReader(text)
+        return
+    if isinstance(source, io.TextIOBase):
+        yield DictReader(source)
+        return
+    if hasattr(source, "read"):
+        with _text(source) as text:
+            yield DictReader(text)
+        return
+    rows = iter(source)
+    first = next(rows, None)
+    if first is None:
+        yield iter(())
+        return
+    rows = chain([first], rows)
+    yield DictReader(rows) if isinstance(first, str) else rows
+
+
+class QueryResult(Sequence):
+    """ Неизменяемый результат запроса: кортеж строк только для чтения"""
+
+    def __init__(self, rows: Iterable[dict]):
+        self._rows = tuple(MappingProxyType(dict(row)) for row in rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return QueryResult(self._rows[item])
+        return self._rows[item]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __hash__(self):
+        return hash(tuple(tuple(row.items()) for row in self._rows))
+
+    def __repr__(self) -> str:
+        return f"QueryResult({[dict(row) for row in self._rows]!r})"
+
+    def to_list(self) -> list[dict]:
+        """ Изменяемые копии строк результата"""
+
+        return [dict(row) for row in self._rows]
+
+
+class Query:
+    """ План запроса без изменяемого состояния.
+
+    Условия разбираются и проверяются при создании; execute() хранит
+    всё состояние выполнения в локальных переменных, поэтому один
+    объект Query можно выполнять одновременно из нескольких потоков
+    над разными источниками.
+
+        Query(where="price>500", order_by="price=desc", limit=10)
+            .execute("products.csv.gz")
+    """
+
+    __slots__ = ('where', 'aggregate', 'order_by', 'group_by', 'limit',
+                 'offset', 'max_groups', 'sort_buffer', '_predicate')
+
+    def __init__(self,
+                 where: str = None,
+                 aggregate: str = None,
+                 order_by: str = None,
+                 group_by: str = None,
+                 limit: int = None,
+                 offset: int = 0,
+                 max_groups: int = 100_000,
+                 sort_buffer: int = None):
+        if group_by and not aggregate:
+            raise ValueError("Группировка требует условия агрегации.")
+        paginate([], offset, limit)
+        if aggregate:
+            parse_aggregate(aggregate)
+        if order_by:
+            parse_order_by(order_by)
+        if group_by:
+            parse_group_by(group_by)
+        predicate = parse_where(where).compile() if where else None
+        for name, value in (('where', where), ('aggregate', aggregate),
+                            ('order_by', order_by), ('group_by', group_by),
+                            ('limit', limit), ('offset', offset),
+                            ('max_groups', max_groups),
+                            ('sort_buffer', sort_buffer),
+                            ('_predicate', predicate)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("Запрос нельзя изменить после создания.")
+
+    def __repr__(self) -> str:
+        options = ', '.join(f"{name}={getattr(self, name)!r}"
+                            for name in self.__slots__[:-1]
+                            if getattr(self, name) is not None)
+        return f"Query({options})"
+
+    def execute(self, source) -> QueryResult:
+        """ Выполнение запроса над источником данных (см. open_rows)"""
+
+        fetch = None if self.limit is None else self.offset + self.limit
+        processor = FileValuesProcessor()
+        with open_rows(source) as rows:
+            if self._predicate is not None:
+                rows = processor.require_rows(filter(self._predicate, rows))
+            rows = processor.process_rows(
+                rows, self.aggregate, self.order_by, group_by=self.group_by,
+                max_groups=self.max_groups, limit=fetch,
+                sort_buffer=self.sort_buffer)
+            return QueryResult(paginate(rows, self.offset, self.limit))
@@ -0,0 +1,280 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import partial
+
+from .columnar import ColumnTable
+from .csv_processing import FileValuesProcessor
+from .index import TableIndex
+from .output import paginate
+
+# строковые поля запроса к таблице
+QUERY_FIELDS = ('where', 'aggregate', 'order_by', 'group_by')
+# целочисленные поля запроса
+INTEGER_FIELDS = ('limit', 'offset', 'max_groups')
+
+
+def check_request(request) -> None:
+    """ Проверка формы запроса и типов полей до выполнения"""
+
+    if not isinstance(request, dict):
+        raise ValueError("Запрос должен быть объектом JSON.")
+    if not request.get("file"):
+        raise ValueError("Не указан файл запроса.")
+    for field in ('file',) + QUERY_FIELDS:
+        if request.get(field) is not None and not isinstance(request[field],
+                                                             str):
+            raise ValueError(f"Поле '{field}' должно быть строкой.")
+    for field in INTEGER_FIELDS:
+        value = request.get(field)
+        # bool - подкласс int, но в запросе это ошибка
+        if value is not None and (not isinstance(value, int)
+                                  or isinstance(value, bool)):
+            raise ValueError(f"Поле '{field}' должно быть целым числом.")
+
+
+class TableCache:
+    """ LRU-кеш разобранных колоночных таблиц с ограничением памяти.
+
+    Запись действительна, пока у файла не изменились размер и mtime;
+    при изменении таблица загружается заново. Размер записи - оценка
+    памяти таблицы вместе с объектами строк и индексов, которые
+    строятся лениво при запросах, поэтому лимит проверяется и при
+    выдаче таблицы, и после запроса (trim). Когда суммарный размер
+    превышает memory_limit байт, вытесняются давно не использованные
+    таблицы. Одновременные запросы к ещё не загруженному файлу ждут
+    одну загрузку, а не читают файл каждый.
+    """
+
+    def __init__(self, memory_limit: int, index: bool = False):
+        self.memory_limit = memory_limit
+        self.index = index
+        self.entries = OrderedDict()
+        self.memory = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # загрузки в процессе: (путь, отпечаток) -> Future
+        self._loading = {}
+
+    @staticmethod
+    def _size(entry: tuple) -> int:
+        _, _, table_index, table_bytes = entry
+        return table_bytes + (table_index.nbytes if table_index else 0)
+
+    def _trim(self) -> None:
+        """ Пересчёт памяти и вытеснение; вызывается под блокировкой"""
+
+        self.memory = sum(map(self._size, self.entries.values()))
+        # последняя использованная таблица остаётся, даже если превышает
+        # лимит
+        while self.memory > self.memory_limit and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.memory -= self._size(evicted)
+
+    def trim(self) -> None:
+        """ Учёт индексов, построенных во время запроса"""
+
+        with self._lock:
+            self._trim()
+
+    def get(self, file: str) -> tuple:
+        """ Таблица файла и её индекс (или None)"""
+
+        path = os.path.abspath(file)
+        stat = os.stat(path)
+        fingerprint = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == fingerprint:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                self._trim()
+                return entry[1], entry[2]
+            loading = self._loading.get((path, fingerprint))
+            if loading is None:
+                self.misses += 1
+                loading = self._loading[(path, fingerprint)] = Future()
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+        if not owner:
+            return loading.result()
+        try:
+            table = ColumnTable.read_csv(path)
+            table_index = TableIndex(table) if self.index else None
+            table_bytes = table.nbytes
+        except BaseException as error:
+            with self._lock:
+                del self._loading[(path, fingerprint)]
+            loading.set_exception(error)
+            raise
+        with self._lock:
+            del self._loading[(path, fingerprint)]
+            self.entries.pop(path, None)
+            self.entries[path] = (fingerprint, table, table_index,
+                                  table_bytes)
+            self._trim()
+        loading.set_result((table, table_index))
+        return table, table_index
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"tables": len(self.entries), "memory": self.memory,
+                    "memory_limit": self.memory_limit, "hits": self.hits,
+                    "misses": self.misses}
+
+
+class QueryServer:
+    """ Сервер запросов к CSV-файлам.
+
+    Таблицы разбираются один раз и хранятся в TableCache, поэтому
+    повторный запрос к тому же файлу не читает его заново. Запросы
+    выполняются в пуле потоков, чтобы цикл событий принимал новые
+    соединения во время долгих запросов.
+
+    Через Unix-сокет запросы и ответы передаются JSON-строками
+    (по одной на строку), через TCP - HTTP POST /query с телом JSON;
+    GET /stats возвращает статистику кеша.
+    """
+
+    def __init__(self, memory_limit: int = 512 * 2 ** 20, index: bool = False):
+        self.cache = TableCache(memory_limit, index)
+
+    def execute(self, request: dict) -> dict:
+        """ Выполнение одного запроса; ошибки возвращаются в ответе"""
+
+        try:
+            check_request(request)
+            if request.get("group_by") and not request.get("aggregate"):
+                raise ValueError("Группировка требует условия агрегации.")
+            table, table_index = self.cache.get(request["file"])
+            offset = request.get("offset") or 0
+            limit = request.get("limit")
+            fetch = None if limit is None else offset + limit
+            rows = FileValuesProcessor().query_table(
+                table, request.get("where"), request.get("aggregate"),
+                request.get("order_by"), group_by=request.get("group_by"),
+                max_groups=request.get("max_groups", 100_000), limit=fetch,
+                index=table_index)
+            rows = list(paginate(rows, offset, limit))
+            if table_index is not None:
+                # индексы колонок строятся во время запроса
+                self.cache.trim()
+            return {"ok": True, "rows": rows}
+        except KeyError as e:
+            return {"ok": False, "error": f"Не найден столбец '{e.args[0]}'."}
+        except (ValueError, OSError) as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            # непредвиденная ошибка не должна обрывать соединение клиента
+            return {"ok": False, "error": f"Ошибка выполнения запроса: "
+                                          f"{type(e).__name__}: {e}"}
+
+    async def _execute(self, request: dict) -> dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self.execute, request))
+
+    async def handle_lines(self, reader: asyncio.StreamReader,
+                           writer: asyncio.StreamWriter) -> None:
+        """ Соединение через Unix-сокет: запрос и ответ - строки JSON"""
+
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {"ok": False, "error": "Неверный JSON запроса."}
+                else:
+                    response = await self._execute(request)
+                writer.write(json.dumps(response, ensure_ascii=False)
+                             .encode("utf-8") + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def handle_http(self, reader: asyncio.StreamReader,
+                          writer: asyncio.StreamWriter) -> None:
+        """ Соединение по HTTP: POST /query, GET /stats"""
+
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n",
+                                                            b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            method, target = (request_line + ["", ""])[:2]
+            status = "200 OK"
+            if method == "GET" and target == "/stats":
+                response = self.cache.stats()
+            elif method == "POST" and target == "/query":
+                try:
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError
+                    request = json.loads(await reader.readexactly(length)
+                                         or b"{}")
+                except (ValueError, asyncio.IncompleteReadError):
+                    status = "400 Bad Request"
+                    response = {"ok": False, "error": "Неверный HTTP-запрос "
+                                                      "или JSON запроса."}
+                else:
+                    response = await self._execute(request)
+            else:
+                status = "404 Not Found"
+                response = {"ok": False, "error": "Неизвестный адрес."}
+            payload = json.dumps(response, ensure_ascii=False).encode("utf-8")
+            writer.write(f"HTTP/1.1 {status}\r\n"
+                         "Content-Type: application/json; charset=utf-8\r\n"
+                         f"Content-Length: {len(payload)}\r\n"
+                         "Connection: close\r\n\r\n".encode("latin-1")
+                         + payload)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path: str = None, port: int = None) -> None:
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle_lines,
+                                                     path=socket_path)
+        else:
+            server = await asyncio.start_server(self.handle_http,
+                                                host="127.0.0.1", port=port)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Сервер запросов к CSV-файлам с кешем таблиц в памяти")
+    transport = parser.add_mutually_exclusive_group(required=True)
+    transport.add_argument("--socket", help="Путь Unix-сокета")
+    transport.add_argument("--port", type=int,
+                           help="Порт HTTP на 127.0.0.1")
+    parser.add_argument("--memory_limit", type=int, default=512,
+                        help="Объём памяти под кеш таблиц, МБ")
+    parser.add_argument("--index", action="store_true",
+                        help="Строить индексы для кешированных таблиц")
+    args = parser.parse_args(argv)
+    server = QueryServer(args.memory_limit * 2 ** 20, args.index)
+    # по SIGTERM сервер завершается так же, как по Ctrl+C, и удаляет сокет
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit())
+    try:
+        asyncio.run(server.serve(args.socket, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .columnar import ColumnTable, NumericColumn, StringColumn
+from .index import INDEX_KINDS, TableIndex
+
+MAGIC = b"WMCOL\x00\x01\x00"
+INDEX_MAGIC = b"WMIDX\x00\x01\x00"
+# длина заголовка: uint64, little-endian
+_LENGTH = struct.Struct("<Q")
+# начало каждой колонки выравнивается, чтобы буфер можно было
+# привести к array-типу без копирования
+_ALIGNMENT = 8
+
+
+def default_cache_dir() -> str:
+    """ Каталог кеша: $XDG_CACHE_HOME/workmate или ~/.cache/workmate"""
+
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "workmate")
+
+
+def sidecar_path(file: str, cache_dir: str = None) -> str:
+    """ Путь файла кеша для CSV: имя - хеш абсолютного пути источника"""
+
+    source = os.path.abspath(file)
+    name = hashlib.sha1(source.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir or default_cache_dir(), f"{name}.wmc")
+
+
+def _fingerprint(file: str) -> dict:
+    stat = os.stat(file)
+    return {"source": os.path.abspath(file), "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns}
+
+
+def _aligned(position: int) -> int:
+    return -position % _ALIGNMENT
+
+
+def write_sidecar(table: ColumnTable, path: str, fingerprint: dict) -> None:
+    """ Запись колоночной таблицы в бинарный файл.
+
+    Формат: MAGIC, длина заголовка, заголовок JSON (отпечаток источника,
+    число строк, описание колонок со смещениями и словарями строк),
+    затем выровненные буферы колонок: array('d') для чисел и array('I')
+    с кодами для строк. Файл записывается во временный и атомарно
+    переименовывается.
+    """
+
+    buffers = []
+    columns = []
+    offset = 0
+    for name in table.fieldnames:
+        column = table.column(name)
+        data = array('d', column.values) if column.kind == 'number' \
+            else array('I', column.codes)
+        description = {"name": name, "kind": column.kind,
+                       "typecode": data.typecode, "itemsize": data.itemsize,
+                       "offset": offset, "length": len(data)}
+        if column.kind == 'str':
+            description["dictionary"] = column.dictionary
+        elif column.texts:
+            description["texts"] = column.texts
+        columns.append(description)
+        payload = data.tobytes()
+        buffers.append(payload + b"\0" * _aligned(len(payload)))
+        offset += len(buffers[-1])
+    header = dict(fingerprint, rows=len(table), byteorder=sys.byteorder,
+                  columns=columns)
+    header = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    prefix = MAGIC + _LENGTH.pack(len(header)) + header
+    prefix += b"\0" * _aligned(len(prefix))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(prefix)
+        for payload in buffers:
+            f.write(payload)
+    os.replace(temporary, path)
+
+
+def read_sidecar(path: str, fingerprint: dict = None):
+    """ Колоночная таблица из бинарного файла или None, если файла нет,
+    он повреждён или не соответствует отпечатку источника.
+
+    Файл отображается в память, числовые колонки и коды строк
+    читаются из него через memoryview без копирования.
+    """
+
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # нет файла, нет доступа, каталог вместо файла или пустой файл
+        return None
+    try:
+        table = _read_columns(buffer, fingerprint)
+    except BaseException:
+        buffer.close()
+        raise
+    if table is None:
+        buffer.close()
+        return None
+    # отображение файла должно жить, пока используются колонки
+    table.buffer = buffer
+    return table
+
+
+def _read_columns(buffer: mmap.mmap, fingerprint: dict = None):
+    """ Таблица поверх отображённого файла или None, если файл
+    не подходит; колонки создаются только после всех проверок"""
+
+    try:
+        if buffer[:len(MAGIC)] != MAGIC:
+            return None
+        start = len(MAGIC) + _LENGTH.size
+        (length,) = _LENGTH.unpack(buffer[len(MAGIC):start])
+        header = json.loads(buffer[start:start + length].decode("utf-8"))
+    except (struct.error, ValueError):
+        return None
+    if not isinstance(header, dict) \
+            or header.get("byteorder") != sys.byteorder:
+        return None
+    if fingerprint is not None and any(
+            header.get(key) != value for key, value in fingerprint.items()):
+        return None
+    data_start = start + length
+    data_start += _aligned(data_start)
+    try:
+        layouts = [_column_layout(description, data_start, len(buffer))
+                   for description in header["columns"]]
+    except (KeyError, TypeError, ValueError):
+        # заголовок не описывает колонки этого формата
+        return None
+    if any(layout is None for layout in layouts):
+        return None
+
+    # срезы держат отображение открытым; при ошибке их нужно освободить,
+    # иначе отображение нельзя закрыть
+    views = [memoryview(buffer)]
+    try:
+        columns = {}
+        for name, kind, typecode, begin, end, extra in layouts:
+            views.append(views[0][begin:end])
+            views.append(views[-1].cast(typecode))
+            if kind == 'number':
+                columns[name] = NumericColumn.from_buffer(views[-1], extra)
+            else:
+                columns[name] = StringColumn.from_buffer(views[-1], extra)
+    except BaseException:
+        for view in reversed(views):
+            view.release()
+        raise
+    return ColumnTable([layout[0] for layout in layouts], columns)
+
+
+def _column_layout(description: dict, data_start: int, size: int):
+    """ Имя, тип, typecode, границы буфера колонки в файле и словарь
+    строк или тексты чисел; None, если колонка не помещается в файл
+    или записана с другим размером элемента"""
+
+    typecode = description["typecode"]
+    itemsize = description["itemsize"]
+    if array(typecode).itemsize != itemsize:
+        return None
+    offset, length = description["offset"], description["length"]
+    if not isinstance(offset, int) or not isinstance(length, int):
+        return None
+    begin = data_start + offset
+    end = begin + itemsize * length
+    if not data_start <= begin <= end <= size:
+        return None
+    if description["kind"] == 'number':
+        extra = {int(index): str(text) for index, text
+                 in description.get("texts", {}).items()}
+    else:
+        extra = list(description["dictionary"])
+    return description["name"], description["kind"], typecode, begin, end, \
+        extra
+
+
+def load_table(file: str, cache_dir: str = None) -> ColumnTable:
+    """ Колоночная таблица CSV-файла через кеш.
+
+    При первом обращении CSV разбирается и сохраняется в бинарный файл
+    кеша с отпечатком источника (путь, размер, mtime). Следующие
+    обращения читают кеш; при изменении источника отпечаток не совпадает
+    и кеш пересобирается.
+    """
+
+    fingerprint = _fingerprint(file)
+    path = sidecar_path(file, cache_dir)
+    table = read_sidecar(path, fingerprint)
+    if table is not None:
+        return table
+    table = ColumnTable.read_csv(file)
+    try:
+        write_sidecar(table, path, fingerprint)
+    except OSError:
+        # кеш необязателен: без записи запрос всё равно выполняется
+        pass
+    return table
+
+
+class IndexCache:
+    """ Индексы колонок в кеше: по файлу на колонку рядом с бинарным
+    файлом таблицы.
+
+    Формат файла: INDEX_MAGIC, длина заголовка, заголовок JSON
+    (отпечаток источника, вид индекса, typecode и длина каждого
+    массива), затем байты массивов подряд. Массивы читаются
+    целиком через array.frombytes, без разбора объектов.
+    """
+
+    def __init__(self, file: str, cache_dir: str = None):
+        self.fingerprint = _fingerprint(file)
+        self.prefix = os.path.splitext(sidecar_path(file, cache_dir))[0]
+
+    def path(self, name: str) -> str:
+        column = hashlib.sha1(name.encode("utf-8")).hexdigest()[:16]
+        return f"{self.prefix}.{column}.idx"
+
+    def load(self, name: str):
+        """ Индекс колонки или None, если его нет, файл повреждён
+        или источник изменился"""
+
+        try:
+            with open(self.path(name), "rb") as f:
+                if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                    return None
+                (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+                header = json.loads(f.read(length).decode("utf-8"))
+                if header["fingerprint"] != self.fingerprint \
+                        or header["byteorder"] != sys.byteorder:
+                    return None
+                arrays = {}
+                for description in header["arrays"]:
+                    data = array(description["typecode"])
+                    size = data.itemsize * description["length"]
+                    payload = f.read(size)
+                    if len(payload) != size:
+                        return None
+                    data.frombytes(payload)
+                    arrays[description["name"]] = data
+                return INDEX_KINDS[header["kind"]](**arrays)
+        except (OSError, struct.error, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, name: str, index) -> None:
+        arrays = index.arrays()
+        header = {"fingerprint": self.fingerprint, "kind": index.kind,
+                  "byteorder": sys.byteorder,
+                  "arrays": [{"name": key, "typecode": data.typecode,
+                              "length": len(data)}
+                             for key, data in arrays.items()]}
+        header = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        path = self.path(name)
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as f:
+                f.write(INDEX_MAGIC + _LENGTH.pack(len(header)) + header)
+                for data in arrays.values():
+                    data.tofile(f)
+            os.replace(temporary, path)
+        except OSError:
+            # кеш необязателен: индекс остаётся в памяти
+            pass
+
+
+def load_index(file: str, table: ColumnTable,
+               cache_dir: str = None) -> TableIndex:
+    """ Индекс таблицы через кеш.
+
+    Индексы колонок строятся при первом условии на колонку и
+    сохраняются в кеше по отдельности, поэтому запрос читает с диска
+    только индексы своих колонок. Индекс колонки пересобирается, если
+    источник изменился.
+    """
+
+    return TableIndex(table, IndexCache(file, cache_dir))
@@ -0,0 +1,172 @@
+import heapq
+import pickle
+from itertools import islice
+from tempfile import TemporaryDirectory
+from typing import Callable, Iterable, Iterator
+
+
+def parse_order_by(order_by: str) -> list[tuple[str, bool]]:
+    """ Разбор условия сортировки вида "price=desc,name=asc"
+    в список пар (колонка, по убыванию)"""
+
+    keys = []
+    for part in order_by.split(','):
+        if "=" not in part:
+            raise ValueError("Неверный оператор сортировки: используйте '='.")
+        column, _, direction = part.partition('=')
+        direction = direction.strip().lower()
+        if direction not in ('asc', 'desc'):
+            raise ValueError(
+                "Недопустимая функция сортировки. Используйте 'asc' для"
+                " сортировки по возрастанию или 'desc' для сортировки по убыванию.")
+        keys.append((column.strip(), direction == 'desc'))
+    return keys
+
+
+def value_key(value) -> tuple:
+    """ Ключ сортировки значения: числа по величине, затем строки.
+
+    Тип определяется для каждого значения отдельно, поэтому колонка
+    с числами сортируется как числа, а колонка с текстом - как текст,
+    независимо от того, что записано в первой строке.
+    """
+
+    try:
+        return 0, float(value)
+    except (ValueError, TypeError):
+        return 1, str(value)
+
+
+def descending_value_key(value) -> tuple:
+    """ Ключ value_key в обратном порядке без объектов-обёрток:
+    сначала строки по убыванию, затем числа по убыванию.
+
+    Число меняет знак, строка - на коды символов с обратным знаком
+    и завершающей 1, чтобы более длинная строка с тем же началом
+    шла раньше.
+    """
+
+    try:
+        return 1, -float(value)
+    except (ValueError, TypeError):
+        return 0, tuple(-ord(char) for char in str(value)) + (1,)
+
+
+def make_sort_key(keys: list[tuple[str, bool]]) -> tuple[Callable, bool]:
+    """ Функция ключа для строк-словарей и признак обратного порядка.
+
+    Нужна там, где строки приходят потоком (top-K, слияние
+    отсортированных частей). Если все колонки сортируются в одном
+    направлении, используется обычный ключ и reverse; при разных
+    направлениях ключ колонки по убыванию - descending_value_key.
+    """
+
+    directions = {descending for _, descending in keys}
+    if len(keys) == 1:
+        column, descending = keys[0]
+        return (lambda row: value_key(row[column])), descending
+    columns = [column for column, _ in keys]
+    if len(directions) == 1:
+        return ((lambda row: tuple(value_key(row[column])
+                                   for column in columns)),
+                directions.pop())
+    functions = [(column, descending_value_key if descending else value_key)
+                 for column, descending in keys]
+    return (lambda row: tuple(function(row[column])
+                              for column, function in functions)), False
+
+
+def _sort_pass(rows: list[dict], column: str,
+               descending: bool) -> list[dict]:
+    """ Стабильная сортировка по одной колонке.
+
+    Тип колонки определяется один раз: сначала ключ - просто float,
+    и только если какое-то значение не число, сортировка повторяется
+    с ключами value_key.
+    """
+
+    try:
+        return sorted(rows, key=lambda row: float(row[column]),
+                      reverse=descending)
+    except (ValueError, TypeError):
+        return sorted(rows, key=lambda row: value_key(row[column]),
+                      reverse=descending)
+
+
+def sort_list(rows: list[dict], keys: list[tuple[str, bool]]) -> list[dict]:
+    """ Сортировка списка строк в том же порядке, что и make_sort_key.
+
+    Строки сортируются стабильными проходами от последней колонки
+    к первой, каждый со своим направлением, поэтому разные направления
+    не требуют составных ключей.
+    """
+
+    for column, descending in reversed(keys):
+        rows = _sort_pass(rows, column, descending)
+    return rows
+
+
+def _write_run(path: str, rows: list[dict]) -> None:
+    with open(path, "wb") as f:
+        for row in rows:
+            pickle.dump(row, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _read_run(path: str) -> Iterator[dict]:
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def external_sort(rows: Iterable[dict], key: Callable, reverse: bool,
+                  max_rows_in_memory: int) -> Iterator[dict]:
+    """ Внешняя сортировка слиянием.
+
+    Строки читаются порциями по max_rows_in_memory, каждая порция
+    сортируется и записывается во временный файл, затем файлы сливаются
+    через heapq.merge. В памяти одновременно находится одна порция
+    при записи и по одной строке из каждого файла при слиянии.
+    """
+
+    if max_rows_in_memory < 1:
+        raise ValueError(
+            "Размер буфера сортировки должен быть положительным числом.")
+    rows = iter(rows)
+    chunk = list(islice(rows, max_rows_in_memory))
+    if len(chunk) < max_rows_in_memory:
+        # все строки поместились в память
+        yield from sorted(chunk, key=key, reverse=reverse)
+        return
+    with TemporaryDirectory(prefix="workmate-sort-") as directory:
+        runs = []
+        while chunk:
+            path = f"{directory}/run-{len(runs)}.pickle"
+            _write_run(path, sorted(chunk, key=key, reverse=reverse))
+            runs.append(path)
+            chunk = list(islice(rows, max_rows_in_memory))
+        yield from heapq.merge(*map(_read_run, runs), key=key,
+                               reverse=reverse)
+
+
+def sort_rows(rows: Iterable[dict],
+              order_by: str,
+              limit: int = None,
+              max_rows_in_memory: int = None) -> Iterator[dict]:
+    """ Сортировка строк по одной или нескольким колонкам.
+
+    С limit выбираются первые limit строк через кучу (top-K) без
+    сортировки всех данных, с max_rows_in_memory выполняется внешняя
+    сортировка с ограниченной памятью, иначе sort_list.
+    """
+
+    keys = parse_order_by(order_by)
+    if limit is None and max_rows_in_memory is None:
+        return iter(sort_list(list(rows), keys))
+    key, reverse = make_sort_key(keys)
+    if limit is not None:
+        select = heapq.nlargest if reverse else heapq.nsmallest
+        return iter(select(limit, rows, key=key))
+    return external_sort(rows, key, reverse, max_rows_in_memory)
@@ -0,0 +1,20 @@
+import csv
+import shutil
+
+import pytest
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    """ Копия tests/test.csv во временном каталоге теста"""
+    path = tmp_path / "products.csv"
+    shutil.copy('tests/test.csv', path)
+    return str(path)
+
+
+@pytest.fixture
+def csv_data():
+    """ Строки tests/test.csv, прочитанные csv.DictReader"""
+    with open('tests/test.csv', mode='r', encoding='utf-8',
+              newline='') as csvfile:
+        return list(csv.DictReader(csvfile))
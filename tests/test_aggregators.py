@@ -0,0 +1,95 @@
+import statistics
+
+import pytest
+from src.aggregators import (AggregateSet, QuantileSketch, RunningStats,
+                         parse_aggregate)
+
+
+class TestAggregators:
+
+    @pytest.fixture
+    def rows(self):
+        return [{"price": str(price), "rating": str(rating)}
+                for price, rating in [(100, 4.5), (250, 4.1), (75, 4.9),
+                                      (300, 3.8), (120, 4.4)]]
+
+    def test_parse_aggregate(self):
+        """ Тест разбора нескольких колонок и функций"""
+        assert parse_aggregate("price=avg,max;rating=min") == [
+            ("price", ["avg", "max"]), ("rating", ["min"])]
+
+    @pytest.mark.parametrize("aggregate", [
+        "price-avg", "price=unknown_func", "price=avg;rating=p101", ""])
+    def test_parse_aggregate_invalid(self, aggregate):
+        """ Тест ошибок в условии агрегации"""
+        with pytest.raises(ValueError):
+            parse_aggregate(aggregate)
+
+    def test_multi_aggregate_single_pass(self, rows):
+        """ Тест нескольких агрегатов по нескольким колонкам"""
+        prices = [float(row["price"]) for row in rows]
+        ratings = [float(row["rating"]) for row in rows]
+        result = AggregateSet.from_string(
+            "price=avg,max,var,median;rating=min,count").add_rows(
+            rows).result()
+        assert result["price_avg"] == pytest.approx(statistics.mean(prices))
+        assert result["price_max"] == 300
+        assert result["price_var"] == pytest.approx(
+            statistics.variance(prices))
+        assert result["price_median"] == statistics.median(prices)
+        assert result["rating_min"] == min(ratings)
+        assert result["rating_count"] == 5
+
+    def test_single_aggregate_key(self, rows):
+        """ Тест ключа результата для одной функции"""
+        assert AggregateSet.from_string("price=max").add_rows(
+            rows).result() == {"max": 300}
+
+    def test_non_numeric_value(self):
+        """ Тест агрегации по нечисловой колонке"""
+        with pytest.raises(ValueError):
+            AggregateSet.from_string("name=avg").add_row({"name": "Civic"})
+
+    def test_merge_matches_single_pass(self, rows):
+        """ Тест объединения частичных состояний"""
+        whole = AggregateSet.from_string("price=avg,std,min,p50")
+        whole.add_rows(rows)
+        left = AggregateSet.from_string("price=avg,std,min,p50")
+        left.add_rows(rows[:2])
+        right = AggregateSet.from_string("price=avg,std,min,p50")
+        right.add_rows(rows[2:])
+        left.merge(right)
+        assert left.result() == pytest.approx(whole.result())
+
+    def test_batches_match_row_by_row(self):
+        """ Тест агрегации пачками и по одной строке"""
+        rows = [{"price": str(price * 7 % 101 + 0.5)} for price in range(50)]
+        batched = AggregateSet(parse_aggregate("price=avg,sum,var,min,max"),
+                               batch_size=8).add_rows(rows)
+        single = AggregateSet(parse_aggregate("price=avg,sum,var,min,max"))
+        for row in rows:
+            single.add_row(row)
+        assert batched.result() == pytest.approx(single.result())
+        assert batched.result()["price_sum"] == sum(
+            float(row["price"]) for row in rows)
+
+    def test_only_requested_stats(self):
+        """ Тест обновления только нужных функциям значений"""
+        stats = AggregateSet.from_string("price=avg").add_rows(
+            [{"price": "10"}, {"price": "20"}]).stats["price"]
+        assert not stats.needs_values
+        assert (stats.count, stats.total, stats.min, stats.m2) == \
+            (2, 30.0, None, 0.0)
+
+    def test_running_stats_empty(self):
+        """ Тест агрегации без данных"""
+        with pytest.raises(ValueError):
+            RunningStats().result("avg")
+
+    def test_quantile_sketch_bounded(self):
+        """ Тест ограниченного размера выборки перцентилей"""
+        sketch = QuantileSketch(capacity=100)
+        for value in range(10000):
+            sketch.add(float(value))
+        assert len(sketch.sample) == 100
+        assert sketch.quantile(0.5) == pytest.approx(5000, rel=0.2)
@@ -0,0 +1,98 @@
+import pytest
+from src import batch
+from src.batch import BatchQuery, parse_batch, run_batch
+from src.csv_processing import FileValuesProcessor
+
+QUERIES = [
+    {"where": "price>30000"},
+    {"where": "price > 30000", "aggregate": "price=avg,max"},
+    {"aggregate": "rating=min"},
+    {"where": "rating>=4.5", "order_by": "price=desc", "limit": 2,
+     "offset": 1},
+    {"aggregate": "price=sum", "group_by": "brand", "order_by": "brand=asc"},
+    {"limit": 2},
+]
+
+
+class TestBatch:
+
+    def test_results_match_single_queries(self):
+        """ Тест совпадения результатов пакета с отдельными запросами"""
+        results = run_batch('tests/test.csv', QUERIES)
+        for query, result in zip(QUERIES, results):
+            expected = list(FileValuesProcessor().iter_file_csv(
+                'tests/test.csv', **query))
+            assert result.result() == expected
+
+    def test_single_scan_shares_predicates(self, monkeypatch):
+        """ Тест одного просмотра файла и общей проверки условий"""
+        calls = []
+        original = batch.DictReader
+
+        def reader(*args, **kwargs):
+            calls.append(args)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(batch, "DictReader", reader)
+        queries = [BatchQuery(where="price>30000"),
+                   BatchQuery(where="price > 30000", aggregate="price=avg")]
+        checked = []
+        compile_ = type(queries[0].node).compile
+
+        def counting_compile(node):
+            predicate = compile_(node)
+            return lambda row: checked.append(row) or predicate(row)
+
+        monkeypatch.setattr(type(queries[0].node), "compile",
+                            counting_compile)
+        run_batch('tests/test.csv', queries)
+        assert len(calls) == 1
+        assert len(checked) == 5
+
+    def test_top_k_buffer(self):
+        """ Тест ограничения буфера сортировки с limit"""
+        query = BatchQuery(order_by="price=asc", limit=1)
+        for price in range(10, 0, -1):
+            query.add_row({"price": str(price)})
+            assert len(query.state) <= 2
+        assert query.result() == [{"price": "1"}]
+
+    def test_empty_filter(self):
+        """ Тест ошибки запроса без подходящих строк"""
+        empty, full = run_batch('tests/test.csv',
+                                [{"where": "price>99999"}, {"limit": 1}])
+        with pytest.raises(ValueError):
+            empty.result()
+        assert len(full.result()) == 1
+
+    def test_failing_query_isolated(self):
+        """ Тест ошибки одного запроса при просмотре файла"""
+        queries = [{"aggregate": "price=avg"}, {"aggregate": "name=avg"},
+                   {"where": "brand>1"}, {"where": "brand=Ford"}]
+        good, bad, bad_where, filtered = run_batch('tests/test.csv', queries)
+        assert good.result() == list(FileValuesProcessor().iter_file_csv(
+            'tests/test.csv', aggregate="price=avg"))
+        assert [row["name"] for row in filtered.result()] == ["Mustang"]
+        for query in (bad, bad_where):
+            with pytest.raises(ValueError):
+                query.result()
+        assert bad.matched == 1
+
+    def test_unknown_column(self):
+        """ Тест ошибки при отсутствии столбца"""
+        with pytest.raises(KeyError):
+            run_batch('tests/test.csv', [{"aggregate": "weight=avg"}])
+
+    def test_parse_batch(self):
+        """ Тест чтения запросов пакета из строк"""
+        queries = parse_batch([
+            '# отчёт',
+            '--where "brand IN (Ford, Audi)" --aggregate price=avg',
+            '',
+            '--order_by price=desc --limit 3',
+        ])
+        assert [query.where for query in queries] == [
+            "brand IN (Ford, Audi)", None]
+        assert queries[1].limit == 3
+        with pytest.raises(ValueError):
+            parse_batch(['--unknown 1'])
@@ -0,0 +1,64 @@
+import csv
+
+from benchmarks.bench import STAGES, compare_results, run_benchmarks, run_stage
+from benchmarks.datagen import generate_csv
+from src.columnar import ColumnTable
+
+
+class TestBenchmarks:
+
+    def test_generate_csv(self, tmp_path):
+        """ Тест детерминированной генерации файла"""
+        first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+        generate_csv(str(first), 500, columns=6, cardinality=7, seed=3)
+        generate_csv(str(second), 500, columns=6, cardinality=7, seed=3)
+        assert first.read_bytes() == second.read_bytes()
+        with open(first, newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 500
+        assert list(rows[0]) == ["name", "brand", "price", "rating",
+                                 "metric_1", "metric_2"]
+        assert len({row["brand"] for row in rows}) == 7
+
+    def test_generated_columns_are_numeric(self, tmp_path):
+        """ Тест числовых колонок в колоночном формате"""
+        path = str(tmp_path / "products.csv")
+        generate_csv(path, 1000, columns=5)
+        table = ColumnTable.read_csv(path)
+        assert [table.column(name).kind for name in table.fieldnames] == [
+            "str", "str", "number", "number", "number"]
+
+    def test_run_stages(self, tmp_path):
+        """ Тест выполнения всех этапов"""
+        path = str(tmp_path / "products.csv")
+        generate_csv(path, 200)
+        for stage in STAGES:
+            result = run_stage(stage, path, repeat=1)
+            assert result["seconds"] >= 0
+            assert result["memory"] > 0
+        results = run_benchmarks(path, ["filter"], repeat=1)
+        assert results["rows"] == 200
+        assert list(results["stages"]) == ["filter"]
+
+    def test_stage_memory_excludes_setup(self, tmp_path):
+        """ Тест памяти этапа без данных подготовки"""
+        path = str(tmp_path / "products.csv")
+        generate_csv(path, 20_000)
+        parse = run_stage("parse", path, repeat=1)["memory"]
+        top_k = run_stage("top_k", path, repeat=1)["memory"]
+        assert top_k < parse / 10
+
+    def test_compare_results(self):
+        """ Тест поиска регрессий по порогу"""
+        baseline = {"stages": {"sort": {"seconds": 1.0, "memory": 10,
+                                        "peak_rss": 100},
+                               "parse": {"seconds": 1.0, "peak_rss": None}}}
+        current = {"stages": {"sort": {"seconds": 1.05, "memory": 20,
+                                       "peak_rss": 150},
+                              "parse": {"seconds": 2.0, "peak_rss": None},
+                              "filter": {"seconds": 1.0, "peak_rss": 1}}}
+        report = compare_results(baseline, current, threshold=0.1)
+        assert [(stage, metric, regression)
+                for stage, metric, _, _, _, regression in report] == [
+            ("sort", "seconds", False), ("sort", "memory", True),
+            ("sort", "peak_rss", True), ("parse", "seconds", True)]
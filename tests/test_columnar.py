@@ -0,0 +1,135 @@
+import csv
+
+import pytest
+from src.aggregators import AggregateSet, parse_aggregate
+from src.columnar import (ColumnTable, NumericColumn, StringColumn,
+                      parse_number)
+from src.csv_processing import FileValuesProcessor
+
+
+class TestColumnar:
+
+    @pytest.fixture
+    def table(self):
+        return ColumnTable.read_csv('tests/test.csv')
+
+    def test_schema_inference(self, table):
+        """ Тест определения типов колонок"""
+        assert isinstance(table.column("price"), NumericColumn)
+        assert isinstance(table.column("rating"), NumericColumn)
+        assert isinstance(table.column("brand"), StringColumn)
+        assert len(table) == 5
+
+    def test_rows_round_trip(self, table, csv_data):
+        """ Тест восстановления строк в исходном виде"""
+        assert list(table.rows()) == csv_data
+
+    @pytest.mark.parametrize("text, expected", [
+        ("24999", 24999.0), ("4.5", 4.5), ("4.50", None), ("007", None),
+        ("nan", None), ("Civic", None)])
+    def test_parse_number(self, text, expected):
+        """ Тест преобразования только обратимых чисел"""
+        assert parse_number(text) == expected
+
+    def test_column_demoted_to_string(self):
+        """ Тест смены типа колонки после выборки"""
+        rows = [{"code": "1"}, {"code": "2"}] + [
+            {"code": f"A{number}"} for number in range(40)]
+        table = ColumnTable.from_rows(rows, sample_size=2)
+        assert isinstance(table.column("code"), StringColumn)
+        assert list(table.rows()) == rows
+
+    def test_column_keeps_texts(self):
+        """ Тест хранения необратимых и нечисловых значений текстом"""
+        rows = [{"price": "3"}, {"price": "10.50"}, {"price": "N/A"},
+                {"price": "20.0"}]
+        table = ColumnTable.from_rows(rows, sample_size=1)
+        column = table.column("price")
+        assert isinstance(column, NumericColumn)
+        assert column.texts == {1: "10.50", 2: "N/A", 3: "20.0"}
+        assert list(table.rows()) == rows
+
+    def test_read_csv_matches_dict_reader(self, tmp_path):
+        """ Тест разбора файла порциями, как в DictReader"""
+        file = tmp_path / "rows.csv"
+        file.write_text("code,price\n1,10\n\n2\n3,7.50\nx,N/A\n",
+                        encoding="utf-8")
+        table = ColumnTable.read_csv(file, sample_size=2)
+        with open(file, encoding="utf-8", newline="") as f:
+            assert list(table.rows()) == list(csv.DictReader(f))
+
+    @pytest.mark.parametrize("engine, options", [
+        ("columnar", {}), ("columnar", {"index": True}),
+        ("stream", {"cache": True})])
+    @pytest.mark.parametrize("where, aggregate, order_by", [
+        ("brand=acme", "price=avg,max", None),
+        ("brand=acme AND price>5", "price=sum", None),
+        ("price=N/A", None, None),
+        ("price IN (N/A, 3)", None, "name=asc"),
+        (None, None, "price=desc"),
+    ])
+    def test_irregular_numbers_match_stream(self, tmp_path, engine, options,
+                                            where, aggregate, order_by):
+        """ Тест совпадения режимов на числах с необратимым текстом
+        и нечисловых значениях в строках, не прошедших фильтр"""
+        file = tmp_path / "edge.csv"
+        file.write_text("name,brand,price\na,acme,10.50\nb,acme,20.0\n"
+                        "c,acme,3\nd,other,N/A\n", encoding="utf-8")
+        stream = FileValuesProcessor()
+        stream.read_file_csv(str(file), where, aggregate, order_by)
+        columnar = FileValuesProcessor()
+        columnar.read_file_csv(str(file), where, aggregate, order_by,
+                               engine=engine,
+                               cache_dir=str(tmp_path / "cache"), **options)
+        assert list(columnar.filtered_data) == stream.filtered_data
+
+    def test_columnar_aggregate_selected_non_numeric(self, tmp_path):
+        """ Тест ошибки агрегации по выбранному нечисловому значению"""
+        file = tmp_path / "edge.csv"
+        file.write_text("brand,price\nacme,3\nother,N/A\n",
+                        encoding="utf-8")
+        with pytest.raises(ValueError):
+            FileValuesProcessor().read_file_csv(
+                str(file), aggregate="price=avg", engine='columnar')
+
+    def test_dictionary_encoding(self):
+        """ Тест словарного кодирования строк"""
+        column = StringColumn(["apple", "xiaomi", "apple"])
+        assert column.dictionary == ["apple", "xiaomi"]
+        assert list(column.codes) == [0, 1, 0]
+
+    @pytest.mark.parametrize("where, aggregate, order_by", [
+        ("price>30000", None, "price=asc"),
+        ("brand=Ford", None, None),
+        ("rating<4.5", None, "brand=desc"),
+        (None, None, "name=asc"),
+        ("price>10000", "price=avg,max;rating=min", None),
+        ("price=24999", None, None),
+    ])
+    def test_columnar_matches_stream(self, where, aggregate, order_by):
+        """ Тест совпадения результатов колоночного и потокового режимов"""
+        stream = FileValuesProcessor()
+        stream.read_file_csv('tests/test.csv', where, aggregate, order_by)
+        columnar = FileValuesProcessor()
+        columnar.read_file_csv('tests/test.csv', where, aggregate, order_by,
+                               engine='columnar')
+        assert list(columnar.filtered_data) == stream.filtered_data
+
+    def test_columnar_no_matching_records(self):
+        """ Тест пустого результата фильтрации"""
+        with pytest.raises(ValueError):
+            FileValuesProcessor().read_file_csv(
+                'tests/test.csv', where="brand=Lada", engine='columnar')
+
+    @pytest.mark.parametrize("indices", [range(5), [0, 2, 3], [4]])
+    def test_aggregate_matches_rows(self, table, csv_data, indices):
+        """ Тест агрегации по колонкам на всех и выбранных строках"""
+        specs = parse_aggregate("price=sum,count,avg;rating=min,max,var,p50")
+        expected = AggregateSet(specs).add_rows(
+            csv_data[index] for index in indices).result()
+        assert table.aggregate(indices, specs) == pytest.approx(expected)
+
+    def test_columnar_aggregate_non_numeric(self, table):
+        """ Тест агрегации по строковой колонке"""
+        with pytest.raises(ValueError):
+            table.aggregate(range(len(table)), [("brand", ["avg"])])
@@ -1,4 +1,7 @@
 import csv
+import os
+import subprocess
+import sys
 
 import pytest
 from src.csv_processing import FileValuesProcessor
@@ -206,3 +209,47 @@ class TestCsvProcessing:
         result = processor.parse_condition(data_operations,operator)
         assert result == expected
         assert isinstance(result,tuple)
+
+    def test_filter_rows_is_lazy(self, csv_data: list[dict[str, str]]):
+        """ Тест потоковой фильтрации: строки проверяются по мере чтения"""
+        consumed = []
+
+        def source():
+            for row in csv_data:
+                consumed.append(row)
+                yield row
+
+        rows = FileValuesProcessor.filter_rows(source(), "brand=Tesla")
+        assert next(rows)["name"] == "Model S"
+        assert len(consumed) == 1
+
+    @pytest.mark.parametrize("where, aggregate, order_by, expected", [
+        ("price>30000", "rating=avg", None, [{'avg': (4.8 + 4.6 + 4.3) / 3}]),
+        ("price>30000", "price=min", "price=desc", [{'min': 39999}]),
+        (None, "price=max", None, [{'max': 89999}]),
+        ("brand=Audi", None, None, [
+            {"name": "A4", "brand": "Audi", "price": "39999",
+             "rating": "4.3"}]),
+    ])
+    def test_read_file_csv_streaming(self, where, aggregate, order_by,
+                                     expected):
+        """ Тест потокового выполнения запроса по файлу"""
+        processor = FileValuesProcessor()
+        processor.read_file_csv('tests/test.csv', where, aggregate, order_by)
+        assert processor.filtered_data == expected
+
+    def test_read_file_csv_no_matching_records(self):
+        """ Тест пустого результата фильтрации при потоковой агрегации"""
+        processor = FileValuesProcessor()
+        with pytest.raises(ValueError):
+            processor.read_file_csv('tests/test.csv', "brand=Lada",
+                                    "price=avg")
+
+    def test_run_as_script(self):
+        """ Тест запуска скрипта из каталога src"""
+        test_file = os.path.abspath('tests/test.csv')
+        result = subprocess.run(
+            [sys.executable, "csv_processing.py", "--file", test_file,
+             "--aggregate", "price=max"],
+            cwd="src", capture_output=True, text=True, check=True)
+        assert "89999" in result.stdout
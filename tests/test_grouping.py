@@ -0,0 +1,77 @@
+import pytest
+from src.aggregators import parse_aggregate
+from src.csv_processing import FileValuesProcessor
+from src.grouping import HashAggregator, parse_group_by
+
+
+class TestGrouping:
+
+    @pytest.fixture
+    def rows(self):
+        return [{"brand": f"brand{i % 7}", "price": str(i)}
+                for i in range(100)]
+
+    def expected(self, rows):
+        groups = {}
+        for row in rows:
+            groups.setdefault(row["brand"], []).append(float(row["price"]))
+        return {brand: (sum(prices) / len(prices), max(prices))
+                for brand, prices in groups.items()}
+
+    def collect(self, grouping):
+        return {row["brand"]: (row["price_avg"], row["price_max"])
+                for row in grouping.results()}
+
+    def test_group_by_in_memory(self, rows):
+        """ Тест группировки без сброса на диск"""
+        grouping = HashAggregator(["brand"], parse_aggregate("price=avg,max"))
+        grouping.add_rows(rows)
+        assert grouping.spills == 0
+        assert self.collect(grouping) == pytest.approx(self.expected(rows))
+
+    def test_group_by_spills_to_disk(self, rows):
+        """ Тест группировки с превышением лимита групп в памяти"""
+        grouping = HashAggregator(["brand"], parse_aggregate("price=avg,max"),
+                                  max_groups=3, partitions=4)
+        grouping.add_rows(rows)
+        assert grouping.spills > 0
+        assert self.collect(grouping) == pytest.approx(self.expected(rows))
+
+    def test_merge_spilled(self, rows, tmp_path):
+        """ Тест объединения групп, сброшенных в заданный каталог"""
+        half = len(rows) // 2
+        first = HashAggregator(["brand"], parse_aggregate("price=avg,max"),
+                               max_groups=1, spill_dir=str(tmp_path / "a"))
+        first.add_rows(rows[:half])
+        assert first.spills > 0
+        grouping = HashAggregator(["brand"],
+                                  parse_aggregate("price=avg,max"))
+        grouping.add_rows(rows[half:])
+        for key, state in first.groups.items():
+            grouping.merge_state(key, state)
+        grouping.merge_spilled(first.spill_dir)
+        assert self.collect(grouping) == pytest.approx(self.expected(rows))
+
+    def test_parse_group_by(self):
+        """ Тест разбора колонок группировки"""
+        assert parse_group_by("brand, name") == ["brand", "name"]
+        with pytest.raises(ValueError):
+            parse_group_by("brand,")
+
+    def test_read_file_csv_group_by(self):
+        """ Тест группировки при чтении файла"""
+        processor = FileValuesProcessor()
+        processor.read_file_csv('tests/test.csv', where="price>30000",
+                                aggregate="price=max", group_by="brand",
+                                order_by="brand=asc")
+        assert processor.filtered_data == [
+            {"brand": "Audi", "max": 39999},
+            {"brand": "Ford", "max": 55999},
+            {"brand": "Tesla", "max": 89999},
+        ]
+
+    def test_group_by_requires_aggregate(self):
+        """ Тест группировки без агрегации"""
+        with pytest.raises(ValueError):
+            FileValuesProcessor().read_file_csv('tests/test.csv',
+                                                group_by="brand")
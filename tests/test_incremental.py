@@ -0,0 +1,94 @@
+import pytest
+from src.csv_processing import FileValuesProcessor
+from src.incremental import IncrementalQuery
+
+
+class TestIncremental:
+
+    @staticmethod
+    def expected(csv_file, **query):
+        return list(FileValuesProcessor().iter_file_csv(csv_file, **query))
+
+    def test_resume_from_checkpoint(self, csv_file, tmp_path):
+        """ Тест обработки только дописанных строк"""
+        query = dict(aggregate="price=avg,count", group_by="brand")
+        directory = str(tmp_path / "checkpoints")
+        tracker = IncrementalQuery(csv_file, directory, **query)
+        assert tracker.update() == 5
+        tracker.save()
+        with open(csv_file, "a") as f:
+            f.write("Corolla,Toyota,19999,4.2\n")
+        tracker = IncrementalQuery(csv_file, directory, **query)
+        assert tracker.update() == 1
+        assert tracker.result() == self.expected(csv_file, **query)
+
+    def test_filtered_rows(self, csv_file, tmp_path):
+        """ Тест сохранения отфильтрованных строк в контрольной точке"""
+        query = dict(where="price>30000", order_by="price=asc")
+        tracker = IncrementalQuery(csv_file, str(tmp_path), **query)
+        tracker.update()
+        assert tracker.save()
+        with open(csv_file, "a") as f:
+            f.write("Corolla,Toyota,19999,4.2\nX5,BMW,65999,4.7\n")
+        tracker = IncrementalQuery(csv_file, str(tmp_path), **query)
+        assert tracker.update() == 2
+        assert tracker.result() == self.expected(csv_file, **query)
+
+    def test_large_result_not_saved(self, csv_file, tmp_path):
+        """ Тест отказа от контрольной точки для большого результата"""
+        tracker = IncrementalQuery(csv_file, str(tmp_path), max_rows=2,
+                                   where="price>0")
+        tracker.update()
+        assert not tracker.save()
+
+    def test_rewritten_file(self, csv_file, tmp_path):
+        """ Тест повторного выполнения при перезаписи файла"""
+        tracker = IncrementalQuery(csv_file, str(tmp_path),
+                                   aggregate="price=sum")
+        tracker.update()
+        tracker.save()
+        with open(csv_file, "w") as f:
+            f.write("name,brand,price,rating\nCivic,Honda,24999,4.5\n")
+        tracker = IncrementalQuery(csv_file, str(tmp_path),
+                                   aggregate="price=sum")
+        assert tracker.update() == 1
+        assert tracker.result() == [{"sum": 24999.0}]
+
+    def test_unterminated_line(self, csv_file, tmp_path):
+        """ Тест строки без перевода строки в конце файла"""
+        with open(csv_file, "a") as f:
+            f.write("Corolla,Toyota,19999,4.2")
+        tracker = IncrementalQuery(csv_file, str(tmp_path),
+                                   aggregate="price=count")
+        assert tracker.update() == 5
+        assert tracker.result() == [{"count": 6.0}]
+        assert tracker.result(include_tail=False) == [{"count": 5.0}]
+        tracker.save()
+        with open(csv_file, "a") as f:
+            f.write("\n")
+        tracker = IncrementalQuery(csv_file, str(tmp_path),
+                                   aggregate="price=count")
+        assert tracker.update() == 1
+        assert tracker.result() == [{"count": 6.0}]
+
+    def test_follow(self, csv_file, tmp_path, monkeypatch):
+        """ Тест слежения за ростом файла"""
+        tracker = IncrementalQuery(csv_file, str(tmp_path),
+                                   aggregate="price=max")
+
+        def append(seconds):
+            with open(csv_file, "a") as f:
+                f.write("X5,BMW,99999,4.7\n")
+
+        monkeypatch.setattr("src.incremental.time.sleep", append)
+        updates = tracker.follow()
+        assert next(updates) == 5
+        assert tracker.result() == [{"max": 89999.0}]
+        assert next(updates) == 1
+        assert tracker.result() == [{"max": 99999.0}]
+
+    def test_unknown_column(self, csv_file, tmp_path):
+        """ Тест ошибки при отсутствии столбца"""
+        with pytest.raises(KeyError):
+            IncrementalQuery(csv_file, str(tmp_path),
+                             aggregate="weight=avg").update()
@@ -0,0 +1,99 @@
+import os
+import random
+
+import pytest
+from src.columnar import ColumnTable
+from src.csv_processing import FileValuesProcessor
+from src.index import TableIndex
+from src.predicates import filter_table, parse_where
+from src.sidecar import INDEX_MAGIC, IndexCache, load_index, load_table
+
+
+class TestIndex:
+
+    @pytest.fixture
+    def table(self):
+        generator = random.Random(3)
+        rows = [{"name": f"item {i}", "brand": generator.choice("abcdefgh"),
+                 "price": str(i * 10 if i % 50 else generator.randint(0, 9000)),
+                 "rating": str(generator.randint(1, 5))}
+                for i in range(1000)]
+        return ColumnTable.from_rows(rows)
+
+    @pytest.mark.parametrize("where", [
+        "price>8000", "price>=500 AND price<600", "price=4200",
+        "price BETWEEN 100 AND 200 OR brand=c", "brand=a", "brand IN (b, c)",
+        "brand=a AND rating>=4", "brand!=a AND price<300",
+        "NOT price>100", "name='item 7'", "rating IN (1, 5)",
+        "price>=9000.5", "brand=zzz"])
+    def test_index_matches_scan(self, table, where):
+        """ Тест совпадения индексной фильтрации с полным просмотром"""
+        index = TableIndex(table)
+        node = parse_where(where)
+        assert list(index.filter(node)) == list(filter_table(node, table))
+
+    def test_index_built_lazily(self, table):
+        """ Тест построения индексов только для колонок условия"""
+        index = TableIndex(table)
+        index.filter(parse_where("brand=a AND price>5000"))
+        assert set(index.indexes) == {"brand", "price"}
+
+    def test_candidates_exact_for_indexed_conditions(self, table):
+        """ Тест точного ответа индекса без проверки строк"""
+        index = TableIndex(table)
+        ids, exact = index.candidates(parse_where("brand=a AND price>5000"))
+        assert exact
+        _, exact = index.candidates(parse_where("brand=a AND NOT price>5000"))
+        assert not exact
+
+    def test_index_cached(self, csv_file, tmp_path):
+        """ Тест сохранения индексов колонок в кеше по отдельности"""
+        cache_dir = str(tmp_path / "cache")
+        table = load_table(csv_file, cache_dir)
+        load_index(csv_file, table, cache_dir).filter(
+            parse_where("brand=Ford"))
+        assert len([name for name in os.listdir(cache_dir)
+                    if name.endswith(".idx")]) == 1
+        index = load_index(csv_file, load_table(csv_file, cache_dir),
+                           cache_dir)
+        assert index.cache.load("brand") is not None
+        assert index.cache.load("price") is None
+        assert list(index.filter(parse_where("brand=Ford"))) == [1]
+
+    def test_postings_layout(self, table):
+        """ Тест номеров строк строковой колонки в двух массивах"""
+        index = TableIndex(table).column_index("brand")
+        column = table.column("brand")
+        assert len(index.offsets) == len(column.dictionary) + 1
+        assert len(index.ids) == len(table)
+        for code, text in enumerate(column.dictionary):
+            assert list(index[code]) == [
+                row for row in range(len(table))
+                if column.codes[row] == code]
+
+    def test_index_cache_round_trip(self, csv_file, tmp_path):
+        """ Тест чтения индексов из кеша без pickle"""
+        cache_dir = str(tmp_path / "cache")
+        table = load_table(csv_file, cache_dir)
+        built = load_index(csv_file, table, cache_dir)
+        built.filter(parse_where("brand=Ford AND price>30000"))
+        cache = IndexCache(csv_file, cache_dir)
+        with open(cache.path("brand"), "rb") as f:
+            assert f.read(len(INDEX_MAGIC)) == INDEX_MAGIC
+        for name in ("brand", "price"):
+            loaded = cache.load(name)
+            assert type(loaded) is type(built.indexes[name])
+            assert loaded.arrays() == built.indexes[name].arrays()
+        with open(cache.path("price"), "r+b") as f:
+            f.truncate(os.path.getsize(cache.path("price")) - 8)
+        assert cache.load("price") is None
+
+    @pytest.mark.parametrize("cache", [False, True])
+    def test_read_file_csv_index(self, tmp_path, cache):
+        """ Тест запроса с индексом"""
+        processor = FileValuesProcessor()
+        processor.read_file_csv('tests/test.csv', "price>30000 AND rating<4.7",
+                                index=True, cache=cache,
+                                cache_dir=str(tmp_path))
+        assert [row["name"] for row in processor.filtered_data] == [
+            "Mustang", "A4"]
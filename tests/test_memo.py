@@ -0,0 +1,118 @@
+from multiprocessing import Pool
+
+import pytest
+from src.csv_processing import FileValuesProcessor
+from src.memo import DiskResultCache, ResultCache, query_key, rows_nbytes
+
+
+def count_misses(directory: str) -> None:
+    cache = DiskResultCache(directory)
+    for _ in range(50):
+        cache.get("missing")
+
+
+class TestMemo:
+
+    def test_key_normalizes_query(self, csv_file):
+        """ Тест одинакового ключа для равносильных запросов"""
+        assert query_key(csv_file, "price>10000") == \
+            query_key(csv_file, "price > 10000")
+        assert query_key(csv_file, "price>10000") != \
+            query_key(csv_file, "price>10000", aggregate="price=avg")
+
+    def test_key_changes_with_file(self, csv_file):
+        """ Тест изменения ключа при изменении файла"""
+        key = query_key(csv_file, "price>10000")
+        with open(csv_file, "a") as f:
+            f.write("Corolla,Toyota,19999,4.2\n")
+        assert query_key(csv_file, "price>10000") != key
+
+    def test_memory_cache(self, csv_file, monkeypatch):
+        """ Тест повторного запроса из кеша без чтения файла"""
+        processor = FileValuesProcessor(result_cache=ResultCache())
+        first = list(processor.iter_file_csv(csv_file, "price>30000",
+                                             aggregate="price=avg"))
+        monkeypatch.setattr(processor, "run_query", None)
+        second = list(processor.iter_file_csv(csv_file, "price > 30000",
+                                              aggregate="price=avg"))
+        assert first == second
+        assert processor.result_cache.stats() == {
+            "hits": 1, "misses": 1, "entries": 1}
+
+    def test_cached_rows_are_copies(self, csv_file):
+        """ Тест независимости кеша от изменения строк результата"""
+        processor = FileValuesProcessor(result_cache=ResultCache())
+        rows = list(processor.iter_file_csv(csv_file, "brand=Ford"))
+        rows[0]["price"] = "0"
+        assert list(processor.iter_file_csv(csv_file, "brand=Ford"))[0][
+            "price"] == "55999"
+
+    def test_memory_cache_eviction(self):
+        """ Тест вытеснения давно не использованных результатов"""
+        cache = ResultCache(max_entries=2)
+        cache.put("a", [])
+        cache.put("b", [])
+        cache.get("a")
+        cache.put("c", [])
+        assert list(cache.entries) == ["a", "c"]
+
+    def test_memory_cache_byte_budget(self):
+        """ Тест вытеснения результатов по объёму памяти"""
+        rows = [{"name": "Kalina", "price": "9999"}]
+        cache = ResultCache(max_bytes=2 * rows_nbytes(rows))
+        cache.put("a", rows)
+        cache.put("b", rows)
+        cache.put("c", rows)
+        assert list(cache.entries) == ["b", "c"]
+        cache.put("d", rows * 3)
+        assert "d" not in cache.entries
+        assert cache.nbytes == 2 * rows_nbytes(rows)
+
+    @pytest.mark.parametrize("make_cache", [
+        lambda tmp_path: ResultCache(max_bytes=500),
+        lambda tmp_path: DiskResultCache(str(tmp_path), max_bytes=500),
+    ])
+    def test_large_result_not_cached(self, csv_file, tmp_path, make_cache):
+        """ Тест результата больше лимита кеша"""
+        processor = FileValuesProcessor(result_cache=make_cache(tmp_path))
+        expected = list(FileValuesProcessor().iter_file_csv(
+            csv_file, "price>0"))
+        assert list(processor.iter_file_csv(csv_file, "price>0")) == expected
+        assert processor.result_cache.stats()["entries"] == 0
+        rows = list(processor.iter_file_csv(csv_file, "brand=Ford"))
+        assert processor.result_cache.stats()["entries"] == 1
+        assert list(processor.iter_file_csv(csv_file, "brand=Ford")) == rows
+
+    def test_disk_cache(self, csv_file, tmp_path):
+        """ Тест кеша результатов на диске"""
+        directory = str(tmp_path / "results")
+        query = dict(where="price>30000", order_by="price=desc", limit=2)
+        first = list(FileValuesProcessor(DiskResultCache(directory))
+                     .iter_file_csv(csv_file, **query))
+        second = list(FileValuesProcessor(DiskResultCache(directory))
+                      .iter_file_csv(csv_file, **query))
+        assert first == second
+        stats = DiskResultCache(directory).stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    def test_disk_cache_eviction(self, tmp_path):
+        """ Тест ограничения размера кеша на диске"""
+        cache = DiskResultCache(str(tmp_path), max_bytes=1)
+        cache.put("a", [{"price": 1}])
+        cache.put("b", [{"price": 2}])
+        assert cache.get("a") is None
+        assert cache.get("b") == [{"price": 2}]
+
+    def test_disk_cache_counters_concurrent(self, tmp_path):
+        """ Тест счётчиков кеша при одновременных запусках"""
+        directory = str(tmp_path / "results")
+        with Pool(4) as pool:
+            pool.map(count_misses, [directory] * 4)
+        assert DiskResultCache(directory).stats()["misses"] == 200
+
+    def test_errors_not_cached(self, csv_file):
+        """ Тест отсутствия в кеше запросов с ошибкой"""
+        processor = FileValuesProcessor(result_cache=ResultCache())
+        with pytest.raises(ValueError):
+            list(processor.iter_file_csv(csv_file, "price>99999"))
+        assert not processor.result_cache.entries
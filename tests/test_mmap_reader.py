@@ -0,0 +1,59 @@
+import csv
+
+import pytest
+from src.csv_processing import FileValuesProcessor
+from src.mmap_reader import mmap_rows
+
+
+class TestMmapReader:
+
+    def test_rows_match_dict_reader(self, csv_data):
+        """ Тест совпадения строк с csv.DictReader"""
+        assert list(mmap_rows('tests/test.csv')) == csv_data
+
+    def test_only_requested_columns(self, csv_data):
+        """ Тест декодирования только нужных колонок"""
+        rows = list(mmap_rows('tests/test.csv', where="brand=Ford",
+                              columns={"price"}))
+        assert rows == [{"price": "55999"}]
+
+    def test_quoted_fields(self, tmp_path):
+        """ Тест полей в кавычках, с запятыми и переводами строк"""
+        path = tmp_path / "quoted.csv"
+        rows = [{"name": "a, b", "note": "line 1\nline 2", "price": "1"},
+                {"name": 'say "hi"', "note": "", "price": "2"},
+                {"name": "плюс", "note": "x", "price": "3"}]
+        with open(path, mode="w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["name", "note", "price"])
+            writer.writeheader()
+            writer.writerows(rows)
+        assert list(mmap_rows(str(path))) == rows
+        assert list(mmap_rows(str(path), where="price>=2",
+                              columns={"name"})) == [
+            {"name": 'say "hi"'}, {"name": "плюс"}]
+
+    def test_unknown_column(self):
+        """ Тест несуществующей колонки в условии"""
+        with pytest.raises(KeyError):
+            list(mmap_rows('tests/test.csv', where="color=red"))
+
+    def test_empty_file(self, tmp_path):
+        """ Тест пустого файла"""
+        path = tmp_path / "empty.csv"
+        path.write_bytes(b"")
+        assert list(mmap_rows(str(path))) == []
+
+    @pytest.mark.parametrize("where, aggregate, order_by, group_by", [
+        ("price>30000", None, "price=asc", None),
+        ("brand IN (Ford, Audi)", "price=avg;rating=max", None, None),
+        (None, "price=max", None, "brand"),
+    ])
+    def test_read_file_csv_mmap(self, where, aggregate, order_by, group_by):
+        """ Тест совпадения результатов с чтением через DictReader"""
+        expected = FileValuesProcessor()
+        expected.read_file_csv('tests/test.csv', where, aggregate, order_by,
+                               group_by=group_by)
+        processor = FileValuesProcessor()
+        processor.read_file_csv('tests/test.csv', where, aggregate, order_by,
+                                group_by=group_by, backend='mmap')
+        assert processor.filtered_data == expected.filtered_data
@@ -0,0 +1,112 @@
+import io
+import json
+
+import pytest
+from src.csv_processing import FileValuesProcessor
+from src.output import GridWriter, paginate, write_rows
+
+
+class TestOutput:
+
+    @pytest.fixture
+    def rows(self):
+        return [{"name": "Civic", "price": "24999"},
+                {"name": "Model S", "price": "89999"}]
+
+    def test_grid(self, rows):
+        """ Тест вывода таблицы в формате grid"""
+        stream = io.StringIO()
+        assert write_rows(rows, stream=stream) == 2
+        assert stream.getvalue() == (
+            "+---------+---------+\n"
+            "| name    |   price |\n"
+            "+=========+=========+\n"
+            "| Civic   |   24999 |\n"
+            "+---------+---------+\n"
+            "| Model S |   89999 |\n"
+            "+---------+---------+\n")
+
+    def test_grid_matches_tabulate(self):
+        """ Тест вывода чисел с выравниванием по десятичной точке,
+        как tabulate(rows, headers="keys", tablefmt="grid")"""
+        rows = [{"brand": "Tesla", "price_avg": 89999.0, "rating_avg": 4.8,
+                 "count": 1},
+                {"brand": " Ford ", "price_avg": 55999.5,
+                 "rating_avg": "4.650", "count": 2},
+                {"brand": "Audi", "price_avg": 39999.25, "rating_avg": 4.0,
+                 "count": 12}]
+        stream = io.StringIO()
+        GridWriter(stream).write(rows)
+        assert stream.getvalue() == (
+            "+---------+-------------+--------------+---------+\n"
+            "| brand   |   price_avg |   rating_avg |   count |\n"
+            "+=========+=============+==============+=========+\n"
+            "| Tesla   |     89999   |         4.8  |       1 |\n"
+            "+---------+-------------+--------------+---------+\n"
+            "| Ford    |     55999.5 |         4.65 |       2 |\n"
+            "+---------+-------------+--------------+---------+\n"
+            "| Audi    |     39999.2 |         4    |      12 |\n"
+            "+---------+-------------+--------------+---------+\n")
+
+    def test_grid_streams_after_sample(self):
+        """ Тест вывода строк после выборки по мере их поступления"""
+        produced = []
+        written = {}
+
+        def source():
+            for i in range(10):
+                produced.append(i)
+                yield {"id": str(i)}
+
+        class Stream(io.StringIO):
+            def write(self, text):
+                if text.startswith("|") and "5" in text:
+                    written["produced"] = len(produced)
+                return super().write(text)
+
+        GridWriter(Stream(), sample_size=3).write(source())
+        assert written["produced"] == 6
+
+    @pytest.mark.parametrize("output_format, expected", [
+        ("csv", "name,price\nCivic,24999\nModel S,89999\n"),
+        ("jsonl", '{"name": "Civic", "price": "24999"}\n'
+                  '{"name": "Model S", "price": "89999"}\n'),
+    ])
+    def test_machine_formats(self, rows, output_format, expected):
+        """ Тест вывода в CSV и JSON Lines"""
+        stream = io.StringIO()
+        write_rows(rows, output_format, stream)
+        assert stream.getvalue() == expected
+
+    def test_empty_result(self):
+        """ Тест вывода пустого результата"""
+        stream = io.StringIO()
+        assert write_rows([], stream=stream) == 0
+        assert stream.getvalue() == ""
+
+    def test_invalid_format(self, rows):
+        """ Тест неизвестного формата вывода"""
+        with pytest.raises(ValueError):
+            write_rows(rows, "xml", io.StringIO())
+
+    def test_paginate(self):
+        """ Тест постраничного вывода"""
+        assert list(paginate(range(10), 3, 4)) == [3, 4, 5, 6]
+        assert list(paginate(range(5), 3)) == [3, 4]
+        with pytest.raises(ValueError):
+            paginate(range(5), -1)
+
+    @pytest.mark.parametrize("engine", ["stream", "columnar"])
+    def test_iter_file_csv_page(self, engine):
+        """ Тест страницы отсортированного результата"""
+        rows = FileValuesProcessor().iter_file_csv(
+            'tests/test.csv', order_by="price=desc", limit=2, offset=1,
+            engine=engine)
+        assert [row["name"] for row in rows] == ["Mustang", "A4"]
+
+    def test_jsonl_aggregate(self):
+        """ Тест вывода результата агрегации в JSON Lines"""
+        stream = io.StringIO()
+        write_rows(FileValuesProcessor().iter_file_csv(
+            'tests/test.csv', aggregate="price=max"), "jsonl", stream)
+        assert json.loads(stream.getvalue()) == {"max": 89999.0}
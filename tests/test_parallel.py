@@ -0,0 +1,93 @@
+import csv
+import random
+
+import pytest
+from src.csv_processing import FileValuesProcessor
+from src.parallel import can_split, split_ranges
+
+
+class TestParallel:
+
+    @pytest.fixture
+    def products_file(self, tmp_path):
+        generator = random.Random(7)
+        path = tmp_path / "products.csv"
+        with open(path, mode="w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "brand", "price", "rating"])
+            for i in range(500):
+                writer.writerow([f"item {i}", generator.choice("abcdef"),
+                                 generator.randint(10, 1000),
+                                 round(generator.uniform(1, 5), 1)])
+        return str(path)
+
+    def test_split_ranges_cover_file(self, products_file):
+        """ Тест разбиения файла на диапазоны по границам строк"""
+        ranges = split_ranges(products_file, 7)
+        assert len(ranges) > 1
+        assert all(left[1] == right[0] for left, right in
+                   zip(ranges, ranges[1:]))
+        with open(products_file, "rb") as f:
+            data = f.read()
+        assert ranges[-1][1] == len(data)
+        assert all(data[start - 1:start] == b"\n" for start, _ in ranges)
+
+    @pytest.mark.parametrize("where, aggregate, order_by, group_by, limit", [
+        ("price>500", None, None, None, None),
+        ("brand IN (a, b)", "price=avg,max;rating=min", None, None, None),
+        (None, None, "price=desc,name=asc", None, None),
+        ("rating>=3", None, "price=asc", None, 5),
+        (None, None, None, None, 12),
+        (None, "price=sum,count", "brand=asc", "brand", None),
+    ])
+    def test_parallel_matches_sequential(self, products_file, where, aggregate,
+                                         order_by, group_by, limit):
+        """ Тест совпадения параллельного и последовательного режимов"""
+        sequential = FileValuesProcessor()
+        sequential.read_file_csv(products_file, where, aggregate, order_by,
+                                 group_by=group_by, limit=limit)
+        parallel = FileValuesProcessor()
+        parallel.read_file_csv(products_file, where, aggregate, order_by,
+                               group_by=group_by, limit=limit, jobs=3)
+        if aggregate and not group_by:
+            # порядок сложения частичных сумм отличается
+            assert parallel.filtered_data[0] == pytest.approx(
+                sequential.filtered_data[0])
+        else:
+            assert parallel.filtered_data == sequential.filtered_data
+
+    def test_parallel_group_by_spills(self, products_file):
+        """ Тест параллельной группировки с превышением лимита групп"""
+        sequential = FileValuesProcessor()
+        sequential.read_file_csv(products_file, "price>100", "price=sum,count",
+                                 "name=asc", group_by="name")
+        parallel = FileValuesProcessor()
+        parallel.read_file_csv(products_file, "price>100", "price=sum,count",
+                               "name=asc", group_by="name", max_groups=10,
+                               jobs=3)
+        assert len(parallel.filtered_data) > 100
+        assert parallel.filtered_data == sequential.filtered_data
+
+    def test_parallel_no_matching_records(self, products_file):
+        """ Тест пустого результата фильтрации"""
+        with pytest.raises(ValueError):
+            FileValuesProcessor().read_file_csv(products_file, "price>5000",
+                                                "price=avg", jobs=2)
+
+    def test_multiline_quoted_field(self, tmp_path):
+        """ Тест значения в кавычках с переводом строки"""
+        path = tmp_path / "notes.csv"
+        with open(path, mode="w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "brand", "price", "rating"])
+            for i in range(200):
+                writer.writerow([f"item {i}\nline 2\nline 3", "a", i, 4.5])
+        file = str(path)
+        assert not can_split(file)
+        sequential = FileValuesProcessor()
+        sequential.read_file_csv(file, "price>=0", order_by="price=desc")
+        assert len(sequential.filtered_data) == 200
+        parallel = FileValuesProcessor()
+        parallel.read_file_csv(file, "price>=0", order_by="price=desc",
+                               jobs=3)
+        assert parallel.filtered_data == sequential.filtered_data
@@ -0,0 +1,88 @@
+import csv
+import io
+
+import pytest
+from src.columnar import ColumnTable
+from src.predicates import compile_where, filter_table, parse_where
+
+
+class TestPredicates:
+
+    @pytest.mark.parametrize("where, expected", [
+        ("price>=39999", ["Model S", "Mustang", "A4"]),
+        ("rating<=4.4", ["Camry", "A4"]),
+        ("brand!=Ford", ["Model S", "Civic", "Camry", "A4"]),
+        ("brand IN (Audi, Honda)", ["Civic", "A4"]),
+        ("brand NOT IN (Audi, Honda)", ["Model S", "Mustang", "Camry"]),
+        ("price BETWEEN 25000 AND 56000", ["Mustang", "Camry", "A4"]),
+        ("price>30000 AND rating>4.5", ["Model S", "Mustang"]),
+        ("brand=Honda OR brand=Audi", ["Civic", "A4"]),
+        ("NOT (price>30000 OR brand=Honda)", ["Camry"]),
+        ("name=Model S", ["Model S"]),
+        ("name='Model S' and price=89999.0", ["Model S"]),
+    ])
+    def test_compound_filter(self, csv_data, where, expected):
+        """ Тест составных условий в построчном и колоночном режимах"""
+        predicate = compile_where(where)
+        assert [row["name"] for row in csv_data if predicate(row)] == expected
+        table = ColumnTable.from_rows(csv_data)
+        indices = filter_table(parse_where(where), table)
+        assert [row["name"] for row in table.rows(indices)] == expected
+
+    @pytest.mark.parametrize("where, expected", [
+        ("price=100", ["a"]),
+        ("price!=100", ["c", "e"]),
+        ("price IN (100, 200)", ["a", "e"]),
+    ])
+    def test_ragged_row(self, where, expected):
+        """ Тест строки, в которой не хватает значений"""
+        rows = list(csv.DictReader(io.StringIO(
+            "name,brand,price\na,b,100\nc,d\ne,f,200\n")))
+        predicate = compile_where(where)
+        assert [row["name"] for row in rows if predicate(row)] == expected
+
+    @pytest.mark.parametrize("where, expected", [
+        ("state=OR", ["Portland"]),
+        ("brand=in", ["Delhi"]),
+        ("name=Yahoo!", ["Sunnyvale"]),
+        ("tag=a,b", ["Portland", "Sunnyvale"]),
+        ("expr=x<y", ["Delhi"]),
+        ("tag=a,b AND state=OR", ["Portland"]),
+        ("name=Yahoo! OR brand=in", ["Delhi", "Sunnyvale"]),
+        ("tag IN ('a,b', c) AND NOT(state=OR)", ["Delhi", "Sunnyvale"]),
+    ])
+    def test_plain_values(self, where, expected):
+        """ Тест значений с ключевыми словами, '!' и запятыми"""
+        rows = list(csv.DictReader(io.StringIO(
+            "city,state,brand,name,tag,expr\n"
+            "Portland,OR,up,Intel,\"a,b\",x>y\n"
+            "Delhi,DL,in,Tata,c,x<y\n"
+            "Sunnyvale,CA,us,Yahoo!,\"a,b\",x=y\n")))
+        predicate = compile_where(where)
+        assert sorted(row["city"] for row in rows if predicate(row)) == \
+            expected
+
+    @pytest.mark.parametrize("where", [
+        "bran-Ford", "price>abc", "brand IN (Audi", "price BETWEEN 1",
+        "price>1 AND", "", "(brand=Ford", "brand=Ford)"])
+    def test_invalid_filter(self, where):
+        """ Тест ошибок разбора условия фильтрации"""
+        with pytest.raises(ValueError):
+            parse_where(where)
+
+    def test_normalized_form(self):
+        """ Тест канонической записи условия"""
+        assert str(parse_where("brand = Ford and (price>1 OR rating<2)")) == (
+            "(brand='Ford' AND (price>'1' OR rating<'2'))")
+
+    def test_columns(self):
+        """ Тест списка колонок, используемых в условии"""
+        assert parse_where(
+            "brand IN (a, b) OR NOT price BETWEEN 1 AND 2").columns == {
+            "brand", "price"}
+
+    def test_string_column_ordering_requires_numbers(self, csv_data):
+        """ Тест сравнения больше/меньше по строковой колонке"""
+        table = ColumnTable.from_rows(csv_data)
+        with pytest.raises(ValueError):
+            filter_table(parse_where("brand>1"), table)
@@ -0,0 +1,110 @@
+import json
+import os
+import time
+
+import pytest
+from src.csv_processing import FileValuesProcessor
+from src.profiling import Profiler, measure, peak_rss, track
+
+
+class TestProfiling:
+
+    @staticmethod
+    def run(profiler, **query):
+        processor = FileValuesProcessor(profiler=profiler)
+        rows = processor.iter_file_csv('tests/test.csv', **query)
+        with measure(profiler, "render"):
+            result = list(rows)
+        return result
+
+    def test_stream_stages(self):
+        """ Тест этапов потокового запроса"""
+        profiler = Profiler()
+        query = dict(where="price>30000", order_by="price=desc", limit=2)
+        result = self.run(profiler, **query)
+        assert result == list(FileValuesProcessor().iter_file_csv(
+            'tests/test.csv', **query))
+        report = profiler.report()
+        assert [stage["stage"] for stage in report] == [
+            "read", "filter", "top_k", "render"]
+        assert [(stage["rows_in"], stage["rows_out"])
+                for stage in report] == [(None, 5), (5, 3), (3, 2), (2, 2)]
+        assert report[0]["bytes_read"] == os.path.getsize('tests/test.csv')
+        assert all(stage["seconds"] <= stage["total_seconds"]
+                   for stage in report)
+
+    def test_columnar_load_not_counted_in_render(self):
+        """ Тест собственного времени этапов с загрузкой таблицы"""
+        profiler = Profiler()
+        self.run(profiler, engine="columnar", aggregate="price=avg")
+        report = {stage["stage"]: stage for stage in profiler.report()}
+        assert list(report) == ["load", "query+aggregate", "render"]
+        assert report["load"]["bytes_read"] == os.path.getsize(
+            'tests/test.csv')
+        assert report["query+aggregate"]["rows_in"] is None
+        assert report["render"]["seconds"] < report["render"]["total_seconds"]
+
+    def test_mmap_stages(self):
+        """ Тест этапов запроса через mmap"""
+        profiler = Profiler()
+        query = dict(where="price>30000", aggregate="price=max",
+                     group_by="brand", backend="mmap")
+        assert self.run(profiler, **query) == list(
+            FileValuesProcessor().iter_file_csv('tests/test.csv', **query))
+        assert [stage["stage"] for stage in profiler.report()] == [
+            "mmap_read+filter", "group_by", "render"]
+
+    def test_nested_self_time(self):
+        """ Тест вычитания времени вложенного этапа"""
+        profiler = Profiler()
+        profiler.reset()
+
+        def slow():
+            for number in range(3):
+                time.sleep(0.01)
+                yield number
+
+        numbers = track(profiler, "slow", slow)
+        doubled = track(profiler, "double",
+                        lambda: (number * 2 for number in numbers))
+        assert list(doubled) == [0, 2, 4]
+        slow_stage, double_stage = profiler.stages
+        assert slow_stage.self_seconds >= 0.03
+        assert double_stage.self_seconds < slow_stage.self_seconds
+        assert double_stage.seconds >= slow_stage.seconds
+
+    def test_trace_memory(self):
+        """ Тест замера памяти через tracemalloc"""
+        profiler = Profiler(trace_memory=True)
+        self.run(profiler, aggregate="price=avg", group_by="brand")
+        profiler.stop()
+        assert all(stage["peak_memory"] is not None
+                   for stage in profiler.report())
+
+    def test_formats(self):
+        """ Тест отчёта таблицей и в JSON"""
+        profiler = Profiler()
+        self.run(profiler, where="brand=Ford")
+        assert json.loads(profiler.format("json"))[0]["stage"] == "read"
+        lines = profiler.format().splitlines()
+        assert lines[0].startswith("этап")
+        assert [line.split()[0] for line in lines[1:]] == [
+            "read", "filter", "render"]
+        with pytest.raises(ValueError):
+            profiler.format("xml")
+
+    def test_disabled(self):
+        """ Тест выполнения без профилировщика"""
+        rows = [{"price": "1"}]
+        assert track(None, "read", lambda: rows) is rows
+        with measure(None, "render") as stage:
+            assert stage is None
+
+    def test_peak_memory_without_tracing(self):
+        """ Тест пиковой памяти этапа по RSS процесса"""
+        profiler = Profiler()
+        list(profiler.track("read", lambda: [{"price": "1"}]))
+        rss = peak_rss()
+        if rss is None:
+            pytest.skip("resource недоступен")
+        assert 0 < profiler.stages[0].peak_memory <= rss
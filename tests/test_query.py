@@ -0,0 +1,98 @@
+import gzip
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from src.csv_processing import FileValuesProcessor
+from src.query import Query, QueryResult, open_rows
+
+QUERY = dict(where="price>25000", order_by="price=desc", limit=2, offset=1)
+
+
+class TestQuery:
+
+    @pytest.fixture
+    def expected(self):
+        return list(FileValuesProcessor().iter_file_csv('tests/test.csv',
+                                                        **QUERY))
+
+    def test_path_source(self, expected):
+        """ Тест выполнения запроса над файлом"""
+        assert Query(**QUERY).execute('tests/test.csv') == expected
+
+    def test_gzip_source(self, expected, tmp_path):
+        """ Тест чтения файла, сжатого gzip"""
+        path = tmp_path / "test.csv.gz"
+        with open('tests/test.csv', 'rb') as f:
+            path.write_bytes(gzip.compress(f.read()))
+        assert Query(**QUERY).execute(str(path)) == expected
+        with open(path, 'rb') as f:
+            assert Query(**QUERY).execute(f) == expected
+            assert not f.closed
+
+    def test_zstd_source(self, expected, tmp_path):
+        """ Тест чтения файла, сжатого zstd"""
+        zstandard = pytest.importorskip("zstandard")
+        path = tmp_path / "test.csv.zst"
+        with open('tests/test.csv', 'rb') as f:
+            path.write_bytes(zstandard.ZstdCompressor().compress(f.read()))
+        assert Query(**QUERY).execute(path) == expected
+
+    def test_file_object_sources(self, expected):
+        """ Тест текстовых и двоичных файловых объектов"""
+        with open('tests/test.csv', encoding='utf-8', newline='') as f:
+            text = f.read()
+        assert Query(**QUERY).execute(io.StringIO(text)) == expected
+        assert Query(**QUERY).execute(
+            io.BytesIO(text.encode('utf-8'))) == expected
+
+    def test_iterable_sources(self, expected):
+        """ Тест строк CSV и словарей в качестве источника"""
+        with open('tests/test.csv', encoding='utf-8', newline='') as f:
+            lines = f.read().splitlines()
+        assert Query(**QUERY).execute(lines) == expected
+        with open_rows(lines) as rows:
+            dicts = list(rows)
+        assert Query(**QUERY).execute(iter(dicts)) == expected
+
+    def test_aggregate_and_group_by(self):
+        """ Тест агрегации и группировки"""
+        rows = [{"brand": "a", "price": "1"}, {"brand": "b", "price": "3"},
+                {"brand": "a", "price": "5"}]
+        assert Query(aggregate="price=avg").execute(rows) == [{"avg": 3.0}]
+        assert Query(aggregate="price=max", group_by="brand",
+                     order_by="brand=asc").execute(rows) == [
+            {"brand": "a", "max": 5.0}, {"brand": "b", "max": 3.0}]
+
+    def test_result_is_immutable(self):
+        """ Тест неизменяемости результата и запроса"""
+        query = Query(where="price>30000")
+        result = query.execute('tests/test.csv')
+        assert isinstance(result, QueryResult)
+        with pytest.raises(TypeError):
+            result[0]["price"] = "0"
+        with pytest.raises(AttributeError):
+            query.where = "price>0"
+        copies = result.to_list()
+        copies[0]["price"] = "0"
+        assert result[0]["price"] == "89999"
+
+    def test_empty_filter(self):
+        """ Тест ошибки вместо подстановки всех данных при пустом фильтре"""
+        with pytest.raises(ValueError):
+            Query(where="price>99999",
+                  aggregate="price=avg").execute('tests/test.csv')
+
+    def test_invalid_query(self):
+        """ Тест проверки условий при создании запроса"""
+        with pytest.raises(ValueError):
+            Query(order_by="price=up")
+        with pytest.raises(ValueError):
+            Query(group_by="brand")
+
+    def test_concurrent_execution(self, expected):
+        """ Тест одновременного выполнения одного запроса в потоках"""
+        query = Query(**QUERY)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(query.execute, ['tests/test.csv'] * 32))
+        assert all(result == expected for result in results)
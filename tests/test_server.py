@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from src.client import query
+from src.columnar import ColumnTable
+from src.csv_processing import FileValuesProcessor
+from src.server import QueryServer, TableCache
+
+
+class TestServer:
+
+    def test_cache_reuses_table(self, csv_file):
+        """ Тест повторного использования разобранной таблицы"""
+        cache = TableCache(2 ** 20)
+        table, _ = cache.get(csv_file)
+        assert cache.get(csv_file)[0] is table
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_cache_invalidated_on_change(self, csv_file):
+        """ Тест перезагрузки таблицы при изменении файла"""
+        cache = TableCache(2 ** 20)
+        table, _ = cache.get(csv_file)
+        with open(csv_file, "a") as f:
+            f.write("Corolla,Toyota,19999,4.2\n")
+        assert len(cache.get(csv_file)[0]) == len(table) + 1
+        assert cache.misses == 2
+
+    def test_cache_memory_limit(self, csv_file, tmp_path):
+        """ Тест вытеснения давно не использованных таблиц"""
+        other = str(tmp_path / "other.csv")
+        shutil.copy(csv_file, other)
+        cache = TableCache(1)
+        cache.get(csv_file)
+        cache.get(other)
+        assert list(cache.entries) == [os.path.abspath(other)]
+        assert cache.memory == cache.entries[os.path.abspath(other)][3]
+
+    def test_cache_counts_index_memory(self, csv_file):
+        """ Тест учёта памяти индексов, построенных запросом"""
+        server = QueryServer(2 ** 30, index=True)
+        server.execute({"file": csv_file, "where": "brand=Ford"})
+        table, table_index = server.cache.get(csv_file)
+        assert table_index.nbytes > 0
+        assert server.cache.memory == table.nbytes + table_index.nbytes
+        assert table.nbytes > sum(
+            len(text) for text in table.column("name").dictionary)
+
+    def test_concurrent_misses_load_once(self, csv_file, monkeypatch):
+        """ Тест одной загрузки файла при одновременных запросах"""
+        loads = []
+        read_csv = ColumnTable.read_csv
+
+        def slow_read_csv(path):
+            loads.append(path)
+            time.sleep(0.1)
+            return read_csv(path)
+
+        monkeypatch.setattr(ColumnTable, "read_csv", slow_read_csv)
+        cache = TableCache(2 ** 20)
+        with ThreadPoolExecutor(4) as pool:
+            tables = list(pool.map(lambda _: cache.get(csv_file)[0],
+                                   range(4)))
+        assert len(loads) == 1
+        assert all(table is tables[0] for table in tables)
+        assert (cache.hits, cache.misses) == (3, 1)
+
+    def test_execute_matches_processor(self, csv_file):
+        """ Тест совпадения ответа сервера с обычным запросом"""
+        server = QueryServer(index=True)
+        request = {"file": csv_file, "where": "price>500",
+                   "order_by": "price=desc", "limit": 2, "offset": 1}
+        expected = list(FileValuesProcessor().iter_file_csv(
+            csv_file, "price>500", order_by="price=desc", limit=2, offset=1))
+        assert server.execute(request) == {"ok": True, "rows": expected}
+
+    def test_execute_errors(self, csv_file):
+        """ Тест возврата ошибок запроса в ответе"""
+        server = QueryServer()
+        assert not server.execute({"file": csv_file, "where": "size>1"})["ok"]
+        response = server.execute({"file": csv_file, "where": "price>99999"})
+        assert response == {
+            "ok": False,
+            "error": "Не найдено записей, соответствующих условиям фильтрации."}
+        assert not server.execute({"file": csv_file + ".missing"})["ok"]
+
+    @pytest.mark.parametrize("request_", [
+        [1, 2], "price>500", {"file": 5}, {"file": ""},
+        {"limit": "3"}, {"offset": 1.5}, {"max_groups": True},
+        {"where": ["price>500"]}])
+    def test_execute_invalid_request(self, csv_file, request_):
+        """ Тест ответа с ошибкой на запрос неверной формы"""
+        if isinstance(request_, dict) and "file" not in request_:
+            request_ = dict(request_, file=csv_file)
+        response = QueryServer().execute(request_)
+        assert response["ok"] is False and response["error"]
+
+    def test_malformed_requests_get_response(self, csv_file, tmp_path):
+        """ Тест ответа вместо обрыва соединения на неверные запросы"""
+        path = str(tmp_path / "server.sock")
+        server = QueryServer()
+
+        async def scenario():
+            task = asyncio.create_task(server.serve(socket_path=path))
+            while not os.path.exists(path):
+                await asyncio.sleep(0.01)
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(b'[1, 2]\n{"file": "x", "limit": "3"}\n\xff\n')
+            lines = [json.loads(await reader.readline()) for _ in range(3)]
+            writer.close()
+            listener = await asyncio.start_server(server.handle_http,
+                                                  host="127.0.0.1", port=0)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /query HTTP/1.1\r\n"
+                         b"Content-Length: abc\r\n\r\n")
+            status = await reader.readline()
+            writer.close()
+            listener.close()
+            task.cancel()
+            return lines, status
+
+        lines, status = asyncio.run(scenario())
+        assert [line["ok"] for line in lines] == [False, False, False]
+        assert status.startswith(b"HTTP/1.1 400")
+
+    def test_unix_socket(self, csv_file, tmp_path):
+        """ Тест запросов через Unix-сокет"""
+        path = str(tmp_path / "server.sock")
+        server = QueryServer()
+
+        async def scenario():
+            task = asyncio.create_task(server.serve(socket_path=path))
+            while not os.path.exists(path):
+                await asyncio.sleep(0.01)
+            request = {"file": csv_file, "aggregate": "price=max"}
+            rows = await asyncio.to_thread(query, request, path)
+            await asyncio.to_thread(query, request, path)
+            task.cancel()
+            return rows
+
+        assert asyncio.run(scenario()) == [{"max": 89999.0}]
+        assert server.cache.hits == 1
+
+    def test_http(self, csv_file):
+        """ Тест запросов по HTTP"""
+        server = QueryServer()
+
+        async def scenario():
+            listener = await asyncio.start_server(server.handle_http,
+                                                  host="127.0.0.1", port=0)
+            port = listener.sockets[0].getsockname()[1]
+            address = f"http://127.0.0.1:{port}"
+            async with listener:
+                rows = await asyncio.to_thread(
+                    query, {"file": csv_file, "where": "brand=Toyota"},
+                    address)
+                with pytest.raises(ValueError):
+                    await asyncio.to_thread(query, {}, address)
+            return rows
+
+        rows = asyncio.run(scenario())
+        assert [row["brand"] for row in rows] == ["Toyota"]
@@ -0,0 +1,123 @@
+import json
+import mmap
+import os
+import struct
+import sys
+
+import pytest
+from src.columnar import ColumnTable
+from src.csv_processing import FileValuesProcessor
+from src.sidecar import (MAGIC, load_table, read_sidecar, sidecar_path,
+                        write_sidecar)
+
+
+class TestSidecar:
+
+    def test_round_trip(self, csv_file, tmp_path):
+        """ Тест записи и чтения бинарного файла"""
+        table = ColumnTable.read_csv(csv_file)
+        path = str(tmp_path / "table.wmc")
+        write_sidecar(table, path, {"source": csv_file})
+        cached = read_sidecar(path)
+        assert cached.fieldnames == table.fieldnames
+        assert list(cached.rows()) == list(table.rows())
+        assert isinstance(cached.column("price").values, memoryview)
+
+    def test_cache_created_and_reused(self, csv_file, tmp_path):
+        """ Тест создания кеша при первом обращении"""
+        cache_dir = str(tmp_path / "cache")
+        load_table(csv_file, cache_dir)
+        path = sidecar_path(csv_file, cache_dir)
+        assert os.path.exists(path)
+        mtime = os.stat(path).st_mtime_ns
+        assert len(load_table(csv_file, cache_dir)) == 5
+        assert os.stat(path).st_mtime_ns == mtime
+
+    def test_cache_invalidated_on_change(self, csv_file, tmp_path):
+        """ Тест пересборки кеша при изменении файла"""
+        cache_dir = str(tmp_path / "cache")
+        load_table(csv_file, cache_dir)
+        with open(csv_file, mode="a", encoding="utf-8") as f:
+            f.write("Golf,Volkswagen,25999,4.2\n")
+        table = load_table(csv_file, cache_dir)
+        assert len(table) == 6
+        assert table.row(5)["name"] == "Golf"
+
+    def test_corrupted_cache(self, tmp_path):
+        """ Тест повреждённого файла кеша"""
+        path = tmp_path / "broken.wmc"
+        path.write_bytes(b"not a cache")
+        assert read_sidecar(str(path)) is None
+
+    def test_truncated_cache(self, csv_file, tmp_path):
+        """ Тест файла кеша, запись которого оборвалась"""
+        path = tmp_path / "table.wmc"
+        write_sidecar(ColumnTable.read_csv(csv_file), str(path),
+                      {"source": csv_file})
+        path.write_bytes(path.read_bytes()[:-20])
+        assert read_sidecar(str(path)) is None
+
+    def test_truncated_cache_rebuilt(self, csv_file, tmp_path):
+        """ Тест пересборки оборванного файла кеша"""
+        cache_dir = str(tmp_path / "cache")
+        load_table(csv_file, cache_dir)
+        path = sidecar_path(csv_file, cache_dir)
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data[:len(data) // 2 + 64])
+        assert list(load_table(csv_file, cache_dir).rows()) == \
+            list(ColumnTable.read_csv(csv_file).rows())
+
+    @pytest.mark.parametrize("columns", [None, [{"name": "price"}], [1],
+                                         "price"])
+    def test_malformed_header(self, tmp_path, columns):
+        """ Тест заголовка с неверным описанием колонок"""
+        header = json.dumps({"byteorder": sys.byteorder,
+                             "columns": columns}).encode("utf-8")
+        path = tmp_path / "table.wmc"
+        path.write_bytes(MAGIC + struct.pack("<Q", len(header)) + header)
+        assert read_sidecar(str(path)) is None
+
+    def test_directory_instead_of_cache(self, csv_file, tmp_path):
+        """ Тест каталога на месте файла кеша"""
+        cache_dir = str(tmp_path / "cache")
+        os.makedirs(sidecar_path(csv_file, cache_dir))
+        assert read_sidecar(sidecar_path(csv_file, cache_dir)) is None
+        assert len(load_table(csv_file, cache_dir)) == 5
+
+    @pytest.mark.parametrize("fingerprint", [None, {"source": "other.csv"}])
+    def test_rejected_cache_closed(self, csv_file, tmp_path, monkeypatch,
+                                   fingerprint):
+        """ Тест закрытия отображения отвергнутого файла кеша"""
+        opened = []
+
+        class Mapping(mmap.mmap):
+            def __init__(self, *args, **kwargs):
+                opened.append(self)
+
+        path = tmp_path / "table.wmc"
+        if fingerprint is None:
+            path.write_bytes(b"not a cache")
+        else:
+            write_sidecar(ColumnTable.read_csv(csv_file), str(path),
+                          {"source": csv_file})
+        monkeypatch.setattr(mmap, "mmap", Mapping)
+        assert read_sidecar(str(path), fingerprint) is None
+        assert len(opened) == 1 and opened[0].closed
+
+    @pytest.mark.parametrize("where, aggregate, order_by", [
+        ("price>30000", None, "price=desc"),
+        ("brand IN (Ford, Audi)", "price=avg;rating=max", None),
+    ])
+    def test_read_file_csv_cache(self, csv_file, tmp_path, where, aggregate,
+                                 order_by):
+        """ Тест запросов через кеш"""
+        expected = FileValuesProcessor()
+        expected.read_file_csv(csv_file, where, aggregate, order_by)
+        for _ in range(2):
+            processor = FileValuesProcessor()
+            processor.read_file_csv(csv_file, where, aggregate, order_by,
+                                    cache=True,
+                                    cache_dir=str(tmp_path / "cache"))
+            assert list(processor.filtered_data) == expected.filtered_data
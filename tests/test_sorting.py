@@ -0,0 +1,85 @@
+import random
+
+import pytest
+from src.columnar import ColumnTable
+from src.csv_processing import FileValuesProcessor
+from src.sorting import external_sort, make_sort_key, parse_order_by, sort_rows
+
+
+class TestSorting:
+
+    @pytest.fixture
+    def rows(self):
+        generator = random.Random(1)
+        return [{"id": str(i), "brand": generator.choice("abcde"),
+                 "price": str(generator.randint(1, 50))}
+                for i in range(300)]
+
+    def test_parse_order_by(self):
+        """ Тест разбора нескольких колонок сортировки"""
+        assert parse_order_by("price=desc, name=asc") == [
+            ("price", True), ("name", False)]
+        with pytest.raises(ValueError):
+            parse_order_by("price=desc,name")
+
+    @pytest.mark.parametrize("order_by", [
+        "price=desc", "price=asc", "brand=asc,price=desc",
+        "brand=desc,price=desc"])
+    def test_top_k_matches_full_sort(self, rows, order_by):
+        """ Тест top-K через кучу"""
+        expected = list(sort_rows(rows, order_by))[:10]
+        assert list(sort_rows(rows, order_by, limit=10)) == expected
+
+    def test_multi_column_mixed_directions(self, rows):
+        """ Тест сортировки по колонкам в разных направлениях"""
+        result = list(sort_rows(rows, "brand=asc,price=desc"))
+        assert result == sorted(
+            rows, key=lambda row: (row["brand"], -int(row["price"])))
+
+    def test_numeric_detection_per_value(self):
+        """ Тест сортировки чисел по величине, а текста - как текст"""
+        data = [{"name": "iphone 15"}, {"name": "10"}, {"name": "9"}]
+        assert [row["name"] for row in sort_rows(data, "name=asc")] == [
+            "9", "10", "iphone 15"]
+
+    @pytest.mark.parametrize("order_by", [
+        "name=desc,price=asc", "price=asc,name=desc", "name=asc,price=desc"])
+    def test_mixed_types_and_directions(self, order_by):
+        """ Тест ключа потоковой сортировки для чисел и текста
+        в разных направлениях"""
+        generator = random.Random(2)
+        names = ["ab", "a", "b", "", "10", "9", "abc", "ä"]
+        rows = [{"name": generator.choice(names),
+                 "price": str(generator.randint(1, 5))} for _ in range(200)]
+        key, reverse = make_sort_key(parse_order_by(order_by))
+        assert sorted(rows, key=key, reverse=reverse) == list(
+            sort_rows(rows, order_by))
+        assert list(sort_rows(rows, order_by, limit=15)) == list(
+            sort_rows(rows, order_by))[:15]
+
+    @pytest.mark.parametrize("order_by", ["price=asc", "price=desc",
+                                          "brand=asc,price=desc"])
+    def test_external_sort(self, rows, order_by):
+        """ Тест внешней сортировки с несколькими временными файлами"""
+        key, reverse = make_sort_key(parse_order_by(order_by))
+        result = list(external_sort(rows, key, reverse, max_rows_in_memory=32))
+        assert result == list(sort_rows(rows, order_by))
+
+    def test_columnar_sort_matches_stream(self, rows):
+        """ Тест колоночной сортировки с несколькими ключами"""
+        table = ColumnTable.from_rows(rows)
+        for limit in (None, 7):
+            indices = table.sort_indices(
+                range(len(table)), parse_order_by("brand=desc,price=asc"),
+                limit=limit)
+            expected = list(sort_rows(rows, "brand=desc,price=asc"))
+            assert list(table.rows(indices)) == expected[:limit]
+
+    @pytest.mark.parametrize("engine", ["stream", "columnar"])
+    def test_read_file_csv_limit(self, engine):
+        """ Тест ограничения числа строк результата"""
+        processor = FileValuesProcessor()
+        processor.read_file_csv('tests/test.csv', order_by="price=desc",
+                                limit=2, engine=engine)
+        assert [row["name"] for row in processor.filtered_data] == [
+            "Model S", "Mustang"]